@@ -1,17 +1,27 @@
+import gzip
 import os
+import json
 import logging
-from flask import Flask, render_template, request, jsonify
-from langchain_core.messages import HumanMessage
 import threading
+import time
+from contextlib import ExitStack
+from functools import partial
+from flask import Flask, Response, g, render_template, request, jsonify, stream_with_context
+from langchain_core.messages import HumanMessage
 
 # Import components
-from core.config import setup_environment, DEFAULT_URLS
-from core.state import UIState
-from components.document_loader import DocumentLoader
-from components.embeddings import EmbeddingManager
-from components.vectorstore import VectorStoreManager
-from components.retriever import RetrieverToolFactory
-from graph.workflow import RAGWorkflow
+from core.config import (
+    setup_environment, DEFAULT_URLS, PROMPT_HUB_REFRESH, PROMPT_HUB_REFRESH_INTERVAL,
+    QUERY_MAX_CONCURRENCY, QUERY_MAX_QUEUE, QUERY_QUEUE_TIMEOUT,
+    UI_HISTORY_PAGE_SIZE, RESPONSE_GZIP, RESPONSE_GZIP_MIN_BYTES,
+    SESSION_COOKIE_NAME, SESSION_HEADER, SESSION_IDLE_TIMEOUT, SESSION_MAX_SESSIONS, SESSION_MAX_MEMORY_MB,
+)
+from core.admission import AdmissionController, AdmissionRejected
+from core.metrics import RequestMetrics, query_duration, registry as metrics_registry
+from core.pipeline import PipelineManager, RebuildInProgress
+from core.sessions import SessionStore
+from core.utils import chunk_sources, message_text, source_chunks, step_summary
+from nodes.prompt_registry import prompt_registry
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -20,51 +30,62 @@ logger = logging.getLogger(__name__)
 # Setup environment variables
 setup_environment()
 
+# Optionally keep hub prompts up to date in the background
+if PROMPT_HUB_REFRESH:
+    prompt_registry.start_refresh(PROMPT_HUB_REFRESH_INTERVAL)
+
 # Initialize Flask app
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.urandom(24)
 
-# Initialize global state
-ui_state = UIState()
-document_loader = None
-vector_store_manager = None
-retriever_factory = None
-workflow = None
-workflow_lock = threading.Lock()
+# Initialize global state; UI state is kept per session
+sessions = SessionStore(SESSION_IDLE_TIMEOUT, SESSION_MAX_SESSIONS, int(SESSION_MAX_MEMORY_MB * 2 ** 20))
+
+# Builds pipelines in the background; queries run on the current one, swapped in atomically
+pipelines = PipelineManager()
+
+# Bounds the number of queries in flight and queued
+admission = AdmissionController(QUERY_MAX_CONCURRENCY, QUERY_MAX_QUEUE, QUERY_QUEUE_TIMEOUT)
+
+# Bounds the answer-cache lookups, which embed the query before a query is admitted
+cache_lookups = threading.BoundedSemaphore(QUERY_MAX_CONCURRENCY)
 
-def initialize_pipeline(urls=None):
-    """Initialize the RAG pipeline with the given URLs."""
-    global document_loader, vector_store_manager, retriever_factory, workflow
+# Current load and index size, read when /metrics is scraped
+metrics_registry.gauge("rag_queries_in_flight", "Queries being processed.",
+                       lambda: admission.stats()["in_flight"])
+metrics_registry.gauge("rag_queries_queued", "Queries waiting for a processing slot.",
+                       lambda: admission.stats()["queued"])
+metrics_registry.gauge("rag_indexed_chunks", "Chunks in the vector store.",
+                       lambda: pipelines.current.vector_store_manager.count if pipelines.current else None)
+metrics_registry.gauge("rag_answer_cache_entries", "Answers in the semantic answer cache.",
+                       lambda: pipelines.answer_cache.stats()["entries"] if pipelines.answer_cache else None)
+metrics_registry.gauge("rag_sessions", "Browser sessions with UI state.", lambda: len(sessions))
+metrics_registry.gauge("rag_index_rebuilding", "Whether an index rebuild is running.",
+                       lambda: int(pipelines.status()["rebuilding"]))
+
+def initialize_pipeline(urls=None, loader=None, embedding_manager=None):
+    """
+    Build the RAG pipeline with the given URLs and wait for it.
+    
+    When no URLs are given and a persisted index exists, the index is opened
+    as-is instead of re-fetching and re-embedding the default URLs. Once the
+    pipeline is running, later calls sync the inactive index slot with the
+    URLs (only changed chunks are re-embedded) and swap it in. The /initialize
+    endpoint starts the same rebuild without waiting for it.
     
-    # Use default URLs if none provided
-    urls = urls or DEFAULT_URLS
+    The document loader and embedding manager can be passed in to run the
+    pipeline on local stand-ins, as the benchmarks do.
     
+    Returns:
+        True if the pipeline was built successfully
+    """
     try:
-        # Initialize document loader
-        document_loader = DocumentLoader()
-        
-        # Load and split documents
-        documents = document_loader.load_from_urls(urls)
-        
-        # Initialize embedding manager
-        embedding_manager = EmbeddingManager()
-        
-        # Initialize vector store
-        vector_store_manager = VectorStoreManager(embedding_manager=embedding_manager)
-        vector_store_manager.create_from_documents(documents)
-        
-        # Initialize retriever
-        retriever_factory = RetrieverToolFactory(vector_store_manager=vector_store_manager)
-        retriever_tool = retriever_factory.create_retriever_tool()
+        job, _ = pipelines.start_rebuild(urls, loader, embedding_manager)
+    except RebuildInProgress as e:
+        logger.warning(f"{e}, waiting for it instead")
+        return e.job.wait()
         
-        # Initialize workflow
-        workflow = RAGWorkflow(tools=[retriever_tool])
-        workflow.build_graph()
-        
-        return True
-    except Exception as e:
-        logger.error(f"Error initializing pipeline: {e}")
-        return False
+    return job.wait()
 
 @app.route('/')
 def index():
@@ -73,32 +94,165 @@ def index():
 
 @app.route('/initialize', methods=['POST'])
 def initialize():
-    """Initialize the RAG pipeline."""
-    data = request.json
-    urls = data.get('urls', DEFAULT_URLS)
+    """
+    Start (re)building the RAG pipeline in the background.
     
-    success = initialize_pipeline(urls)
+    Answers 202 with the rebuild job right away; its progress is reported by
+    /initialize/status. Queries keep running on the current pipeline until
+    the new one is swapped in. Requesting the rebuild that is already running
+    returns that job; a rebuild with other URLs is refused with 409.
+    """
+    data = request.json
+    urls = data.get('urls') or DEFAULT_URLS
     
-    if success:
-        return jsonify({'status': 'success', 'message': 'Pipeline initialized successfully'})
-    else:
-        return jsonify({'status': 'error', 'message': 'Failed to initialize pipeline'}), 500
+    try:
+        job, started = pipelines.start_rebuild(urls)
+    except RebuildInProgress as e:
+        return jsonify({'status': 'error', 'message': str(e), 'job': e.job.to_dict()}), 409
+        
+    message = 'Rebuild started' if started else 'Rebuild already running'
+    return jsonify({'status': 'accepted', 'message': message, 'job': job.to_dict()}), 202
+
+@app.route('/initialize/status', methods=['GET'])
+def initialize_status():
+    """Get the state of the current pipeline and the progress of the latest rebuild."""
+    return jsonify(pipelines.status())
 
 @app.route('/query', methods=['POST'])
 def query():
-    """Process a query using the RAG pipeline."""
-    global workflow, ui_state
+    """
+    Process a query using the RAG pipeline.
     
+    With "timings": true in the request, the response includes a per-request
+    breakdown of node wall times, token usage and grading decisions.
+    """
+    started = time.perf_counter()
     data = request.json
     query_text = data.get('query', '')
+    timings = bool(data.get('timings'))
     
     if not query_text:
         return jsonify({'status': 'error', 'message': 'Query text is required'}), 400
         
-    if not workflow:
-        initialize_success = initialize_pipeline()
-        if not initialize_success:
-            return jsonify({'status': 'error', 'message': 'Failed to initialize pipeline'}), 500
+    # Before the first build, wait for it; a build already running is joined, not repeated
+    if pipelines.ensure_ready() is None:
+        return jsonify({'status': 'error', 'message': 'Failed to initialize pipeline'}), 500
+        
+    # Answer repeated questions without running the workflow or waiting for a slot
+    ui_state = _session_state()
+    cached, store_answer = _check_answer_cache(query_text)
+    if cached is not None:
+        ui_state.add_message('user', query_text)
+        ui_state.add_message('assistant', cached.answer)
+        query_duration.observe(time.perf_counter() - started, endpoint='query', cached='true')
+        return jsonify({
+            'status': 'success',
+            'answer': cached.answer,
+            'sources': cached.sources,
+            'cached': True,
+            'steps': [{'step': 'answer_cache', 'content': _cache_hit_description(cached)}],
+            **_recent_history(ui_state)
+        })
+        
+    try:
+        # Holding the pipeline keeps a rebuild from syncing its index slot meanwhile;
+        # it is taken once admitted, so a query waiting in the queue holds none
+        with admission.admit(), pipelines.acquire() as pipeline:
+            response = _process_query(ui_state, pipeline, query_text, store_answer, timings)
+        query_duration.observe(time.perf_counter() - started, endpoint='query', cached='false')
+        return response
+    except AdmissionRejected as e:
+        response = jsonify({'status': 'error', 'message': str(e), 'queue_position': e.queue_position})
+        response.headers['Retry-After'] = str(int(e.retry_after))
+        return response, 429
+        
+def _check_answer_cache(query_text):
+    """
+    Look up a query in the answer cache.
+    
+    Returns:
+        Tuple of the cached answer, or None on a miss, and a callable storing
+        a newly generated answer and its sources for this query, or None if
+        the cache is disabled or too many lookups are running
+    """
+    cache = pipelines.answer_cache
+    if cache is None:
+        return None, None
+        
+    # Lookups run before admission, so under load they are skipped rather than
+    # queued, and the query is left to the admission queue
+    if not cache_lookups.acquire(blocking=False):
+        return None, None
+        
+    # Taken before the workflow runs, so answers racing a re-index are not stored
+    generation = cache.generation
+    
+    try:
+        vector = cache.embed(query_text)
+    except Exception as e:
+        logger.warning(f"Answer cache lookup failed: {e}")
+        return None, None
+    finally:
+        cache_lookups.release()
+        
+    return cache.lookup(vector), partial(cache.put, vector, query_text, generation=generation)
+
+def _session_id():
+    """Get the session ID sent with the current request, or None if it has none or a malformed one."""
+    session_id = request.headers.get(SESSION_HEADER) or request.cookies.get(SESSION_COOKIE_NAME)
+    return session_id if sessions.is_valid_session_id(session_id) else None
+
+def _session_state():
+    """Get the UI state of the session making the current request, starting a new session if needed."""
+    # Only sessions started here are resumed: an unknown ID, even a well-formed one, gets a
+    # new session with a new ID, so clients cannot choose the ID of a session
+    ui_state = sessions.resume(_session_id())
+    if ui_state is None:
+        session_id = g.new_session_id = sessions.new_session_id()
+        ui_state = sessions.get(session_id)
+    return ui_state
+
+@app.after_request
+def _send_new_session_id(response):
+    """Hand a newly started session's ID to the client as cookie and header."""
+    session_id = g.pop('new_session_id', None)
+    if session_id is not None:
+        response.set_cookie(SESSION_COOKIE_NAME, session_id, httponly=True, samesite='Lax')
+        response.headers[SESSION_HEADER] = session_id
+    return response
+
+@app.after_request
+def _compress_response(response):
+    """Gzip-compress larger JSON and text responses for clients that accept it."""
+    if (not RESPONSE_GZIP or response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in ('application/json', 'text/plain', 'text/html')
+            or 'gzip' not in request.accept_encodings):
+        return response
+        
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < RESPONSE_GZIP_MIN_BYTES:
+        return response
+        
+    response.set_data(gzip.compress(data, compresslevel=5))
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+def _recent_history(ui_state):
+    """Get the latest page of the chat history and its cursor for a query response."""
+    page = ui_state.history_page()
+    return {'history': page['history'], 'history_cursor': page['cursor']}
+
+def _cache_hit_description(cached):
+    """Describe a cache hit for the debug log."""
+    return f"Reused the answer to a similar question ({cached.similarity:.3f}): {cached.query}"
+
+def _process_query(ui_state, pipeline, query_text, store_answer=None, timings=False):
+    """Run the workflow for one query; all per-request state stays local."""
+    # The pipeline is immutable and shared, a reference is all we need
+    current_workflow = pipeline.workflow
     
     # Add query to UI state
     ui_state.add_message('user', query_text)
@@ -112,74 +266,250 @@ def query():
                             "messages": [
                                 HumanMessage(content=query_text)
                             ],
-                            "tools": retriever_factory.tools if retriever_factory else []
+                            "tools": current_workflow.tools
                         }
         
         # Process results
         results = []
+        final_answer = None
+        sources = []
+        request_metrics = RequestMetrics()
         
-        # Use lock to prevent concurrent workflow executions
-        with workflow_lock:
-            # Stream workflow execution
-            for output in workflow.stream(workflow_input):
-                for key, value in output.items():
-                    step_result = {
-                        'step': key,
-                        'content': str(value)
-                    }
-                    results.append(step_result)
-                    ui_state.add_debug_info(key, str(value))
+        # Stream workflow execution
+        for output in current_workflow.stream(workflow_input, request_metrics=request_metrics):
+            for key, value in output.items():
+                # The answer is generated from the chunks of the latest retrieval,
+                # narrowed down to the relevant ones when chunks are graded
+                if key == 'retrieve':
+                    sources = source_chunks(value.get('messages', []))
+                elif key in ('grade', 'best_effort'):
+                    sources = chunk_sources(value.get('documents', []))
+                elif key == 'generate' or (key == 'grade_and_generate' and value.get('messages')):
+                    final_answer = message_text(value['messages'][-1])
                     
-                    # Update current step
-                    ui_state.set_current_step(key)
+                # Steps are described compactly, referencing chunks by ID
+                step_result = step_summary(key, value, request_metrics.node_seconds(key))
+                results.append(step_result)
+                ui_state.add_debug_info(key, step_result['content'])
+                
+                # Update current step
+                ui_state.set_current_step(key)
         
-        # Get final answer from results
-        final_answer = "No answer generated"
-        for result in reversed(results):
-            if result['step'] == 'generate':
-                final_answer = result['content']
-                break
+        if final_answer is not None and store_answer is not None:
+            store_answer(final_answer, sources)
+            
+        final_answer = final_answer or "No answer generated"
         
         # Add response to UI state
         ui_state.add_message('assistant', final_answer)
         
-        # Reset processing state
-        ui_state.set_processing(False)
-        
-        return jsonify({
+        result = {
             'status': 'success',
             'answer': final_answer,
+            'sources': sources,
+            'cached': False,
             'steps': results,
-            'history': ui_state.history
-        })
+            **_recent_history(ui_state)
+        }
+        if timings:
+            result['timings'] = request_metrics.breakdown()
+        return jsonify(result)
         
     except Exception as e:
         logger.error(f"Error processing query: {e}")
-        ui_state.set_processing(False)
         return jsonify({'status': 'error', 'message': str(e)}), 500
+        
+    finally:
+        # Reset processing state
+        ui_state.set_processing(False)
+
+@app.route('/query/stream', methods=['POST'])
+def query_stream():
+    """
+    Process a query and stream its progress as Server-Sent Events.
+    
+    Emits a step event for each node transition, token events for the
+    answer as it is generated, then a done event with the full answer
+    (or an error event). With "timings": true in the request, the done
+    event includes the per-request timing breakdown.
+    """
+    started = time.perf_counter()
+    data = request.json
+    query_text = data.get('query', '')
+    timings = bool(data.get('timings'))
+    
+    if not query_text:
+        return jsonify({'status': 'error', 'message': 'Query text is required'}), 400
+        
+    # Before the first build, wait for it; a build already running is joined, not repeated
+    if pipelines.ensure_ready() is None:
+        return jsonify({'status': 'error', 'message': 'Failed to initialize pipeline'}), 500
+        
+    # Answer repeated questions without running the workflow or waiting for a slot
+    ui_state = _session_state()
+    cached, store_answer = _check_answer_cache(query_text)
+    if cached is not None:
+        query_duration.observe(time.perf_counter() - started, endpoint='query_stream', cached='true')
+        return Response(
+            _stream_cached_answer(ui_state, query_text, cached),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+        
+    # Take the slot before streaming so a saturated server can still answer 429;
+    # it is released when the response is closed, even if the client disconnects
+    slot = ExitStack()
+    try:
+        slot.enter_context(admission.admit())
+    except AdmissionRejected as e:
+        response = jsonify({'status': 'error', 'message': str(e), 'queue_position': e.queue_position})
+        response.headers['Retry-After'] = str(int(e.retry_after))
+        return response, 429
+        
+    # Likewise, hold the pipeline so a rebuild does not sync its index slot meanwhile
+    pipeline = slot.enter_context(pipelines.acquire())
+    
+    response = Response(
+        stream_with_context(_stream_query(ui_state, pipeline, query_text, store_answer, timings, started)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    response.call_on_close(slot.close)
+    return response
+
+def _format_sse(event, data):
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _stream_cached_answer(ui_state, query_text, cached):
+    """Yield the Server-Sent Events of an answer served from the cache."""
+    ui_state.add_message('user', query_text)
+    ui_state.add_message('assistant', cached.answer)
+    
+    yield _format_sse('step', {
+        'step': 'answer_cache',
+        'status': 'completed',
+        'content': _cache_hit_description(cached),
+    })
+    yield _format_sse('done', {'answer': cached.answer, 'sources': cached.sources, 'cached': True})
+
+def _stream_query(ui_state, pipeline, query_text, store_answer=None, timings=False, started=None):
+    """Run the workflow for one query, yielding Server-Sent Events."""
+    current_workflow = pipeline.workflow
+    started = started or time.perf_counter()
+    
+    ui_state.add_message('user', query_text)
+    ui_state.set_processing(True)
+    
+    try:
+        workflow_input = {
+            "messages": [HumanMessage(content=query_text)],
+            "tools": current_workflow.tools
+        }
+        
+        tokens = []
+        final_answer = None
+        sources = []
+        request_metrics = RequestMetrics()
+        
+        for event, data in current_workflow.stream_events(workflow_input, request_metrics=request_metrics):
+            if event == 'token':
+                tokens.append(data['content'])
+            elif event == 'sources':
+                # Kept for the done event, steps only reference the chunks by ID
+                sources = data['sources']
+                continue
+            elif event == 'answer':
+                final_answer = ''.join(tokens) or data['content']
+                continue
+            elif data['status'] == 'started':
+                ui_state.set_current_step(data['step'])
+            else:
+                ui_state.add_debug_info(data['step'], data.get('content', data.get('decision')))
+                
+            yield _format_sse(event, data)
+            
+        if final_answer is not None and store_answer is not None:
+            store_answer(final_answer, sources)
+            
+        final_answer = final_answer or "No answer generated"
+        ui_state.add_message('assistant', final_answer)
+        query_duration.observe(time.perf_counter() - started, endpoint='query_stream', cached='false')
+        
+        done = {'answer': final_answer, 'sources': sources, 'cached': False}
+        if timings:
+            done['timings'] = request_metrics.breakdown()
+        yield _format_sse('done', done)
+        
+    except Exception as e:
+        logger.error(f"Error processing query: {e}")
+        yield _format_sse('error', {'message': str(e)})
+        
+    finally:
+        ui_state.set_processing(False)
 
 @app.route('/history', methods=['GET'])
 def get_history():
-    """Get the conversation history."""
-    global ui_state
-    return jsonify({'history': ui_state.history})
+    """
+    Get a page of the conversation history.
+    
+    Without since, returns the latest limit messages. With since=<cursor>,
+    returns up to limit messages added after that cursor, oldest first.
+    Every response carries the cursor for the next call and an ETag, so
+    polling an unchanged history answers 304 Not Modified.
+    """
+    ui_state = _session_state()
+    return _paged_response(ui_state, 'history', ui_state.history_version, ui_state.history_page)
+
+@app.route('/debug', methods=['GET'])
+def get_debug_info():
+    """Get a page of the workflow debug log, paginated like /history."""
+    ui_state = _session_state()
+    return _paged_response(ui_state, 'debug', ui_state.debug_version, ui_state.debug_page)
+
+def _paged_response(ui_state, name, version, get_page):
+    """Answer a paginated UI state request, or 304 if the client's copy is current."""
+    since = request.args.get('since', type=int)
+    limit = min(max(request.args.get('limit', UI_HISTORY_PAGE_SIZE, type=int), 1), 1000)
+    
+    etag = f"{name}-{ui_state.instance_id}-{version[0]}-{version[1]}-{since}-{limit}"
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(get_page(since, limit))
+    # Weak, as the same ETag is sent for the gzip-compressed body
+    response.set_etag(etag, weak=True)
+    response.vary.update(('Cookie', SESSION_HEADER))
+    return response
 
 @app.route('/clear', methods=['POST'])
 def clear_history():
-    """Clear the conversation history."""
-    global ui_state
-    ui_state.clear_history()
+    """Clear the conversation history of the session."""
+    ui_state = sessions.peek(_session_id())
+    if ui_state is not None:
+        ui_state.clear_history()
     return jsonify({'status': 'success', 'message': 'History cleared'})
 
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Expose node timings, token usage and query metrics in the Prometheus text format."""
+    return Response(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/status', methods=['GET'])
 def get_status():
     """Get the status of the pipeline."""
-    global workflow, ui_state
+    pipeline = pipelines.current
+    ui_state = sessions.peek(_session_id())
     
     status = {
-        'initialized': workflow is not None,
-        'processing': ui_state.processing,
-        'current_step': ui_state.current_step
+        'initialized': pipeline is not None,
+        'processing': ui_state.processing if ui_state else False,
+        'current_step': ui_state.current_step if ui_state else None,
+        'embedding_cache': pipeline.vector_store_manager.embedding_manager.cache_stats if pipeline else None,
+        'answer_cache': pipelines.answer_cache.stats() if pipelines.answer_cache else None,
+        'index': pipelines.status(),
+        'queries': admission.stats(),
+        'sessions': sessions.stats()
     }
     
     return jsonify(status)
@@ -187,4 +517,4 @@ def get_status():
 if __name__ == '__main__':
     # Initialize the pipeline on startup
     initialize_pipeline()
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True, threaded=True)
\ No newline at end of file
@@ -0,0 +1,140 @@
+"""
+Compare the vector backends of VectorStoreManager.
+
+The fixture corpus is split into chunks and padded with synthetic chunks
+built from the corpus vocabulary, embedded once with the feature-hashing
+stand-in, and then inserted into each backend from the same vectors, so
+the numbers measure the backends alone. Reported per backend:
+
+    build     time to insert the vectors and persist the index
+    vectors   memory allocated for the vectors, spare capacity included (NumPy backends only)
+    rss       growth of the process's resident memory during the build
+    disk      size of the persisted index
+    p50/p99   latency of one top-k vector search
+    agree@k   share of the exact float32 top-k found by the backend
+
+Usage (from the Agentic_RAG directory):
+    python -m benchmarks.bench_backends --chunks 20000 --dimensions 1536
+    python -m benchmarks.bench_backends --backends numpy-float16,numpy-int8 --k 8
+"""
+import argparse
+import gc
+import os
+import random
+import statistics
+import tempfile
+import time
+import numpy as np
+from langchain_core.documents import Document
+from benchmarks.corpus import load_corpus, make_splitter
+from benchmarks.fakes import HashingEmbeddings
+from components.bm25 import tokenize
+from components.document_loader import DocumentLoader
+from components.embeddings import EmbeddingManager
+from components.ingest import batched
+from components.vectorstore import VectorStoreManager
+
+def rss_bytes() -> int:
+    # Current resident set size; ru_maxrss would only give the peak
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+def directory_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names)
+
+def synthetic_chunks(documents, count: int, words: int = 60):
+    rng = random.Random(0)
+    vocabulary = sorted({token for document in documents for token in tokenize(document.page_content)})
+    return [Document(page_content=" ".join(rng.choices(vocabulary, k=words)).capitalize() + ".",
+                     metadata={"source": f"synthetic-{i // 20}"})
+            for i in range(count)]
+
+def run_backend(spec: str, chunks, vectors, queries, query_vectors, exact, args):
+    backend, _, dtype = spec.partition("-")
+    embedding_manager = EmbeddingManager(model=f"hashing-{args.dimensions}", cache_path=None,
+                                         embeddings=HashingEmbeddings(args.dimensions))
+                                         
+    with tempfile.TemporaryDirectory() as directory:
+        gc.collect()
+        rss_before = rss_bytes()
+        start = time.perf_counter()
+        manager = VectorStoreManager(embedding_manager=embedding_manager, persist_directory=directory,
+                                     backend=backend, numpy_dtype=dtype or "float32").open()
+        for batch in batched(range(len(chunks)), 1000):
+            manager.add_embedded([chunks[i] for i in batch], [vectors[i] for i in batch])
+        manager.backend.persist()
+        build_time = time.perf_counter() - start
+        gc.collect()
+        rss = rss_bytes() - rss_before
+        
+        search = manager.backend.search
+        search(query_vectors[0], args.k)
+        latencies = []
+        agreement = []
+        for repeat in range(args.repeats):
+            for i, vector in enumerate(query_vectors):
+                start = time.perf_counter()
+                results = search(vector, args.k)
+                latencies.append((time.perf_counter() - start) * 1000)
+                if repeat == 0:
+                    found = {document.metadata["chunk_id"] for document, _ in results}
+                    agreement.append(len(found & exact[i]) / args.k)
+                    
+        latencies.sort()
+        nbytes = manager.backend.nbytes
+        return {
+            "chunks": manager.count,
+            "build": build_time,
+            "vectors": nbytes / 2 ** 20 if nbytes is not None else None,
+            "rss": rss / 2 ** 20,
+            "disk": directory_size(directory) / 2 ** 20,
+            "p50": statistics.median(latencies),
+            "p99": latencies[max(int(len(latencies) * 0.99) - 1, 0)],
+            "agree": statistics.mean(agreement),
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="chroma,numpy-float32,numpy-float16,numpy-int8",
+                        help="Comma-separated backends: chroma or numpy-<float32|float16|int8>")
+    parser.add_argument("--chunks", type=int, default=5000, help="Synthetic chunks added to the fixture corpus")
+    parser.add_argument("--dimensions", type=int, default=384, help="Embedding dimensions")
+    parser.add_argument("--queries", type=int, default=200, help="Number of search queries")
+    parser.add_argument("--k", type=int, default=4, help="Chunks returned per search")
+    parser.add_argument("--repeats", type=int, default=3, help="Passes over the queries for latency")
+    args = parser.parse_args()
+    
+    documents, questions = load_corpus()
+    chunks = DocumentLoader(text_splitter=make_splitter(250, 50, "estimate")).split_documents(documents)
+    chunks += synthetic_chunks(documents, args.chunks)
+    
+    # Embed once and key the chunks as VectorStoreManager would
+    embeddings = HashingEmbeddings(args.dimensions)
+    for i, chunk in enumerate(chunks):
+        chunk.metadata["chunk_id"] = f"chunk-{i}"
+    vectors = embeddings.embed_documents([chunk.page_content for chunk in chunks])
+    
+    rng = random.Random(1)
+    queries = [question["question"] for question in questions]
+    queries += [" ".join(chunk.page_content.split()[:12]) for chunk in rng.sample(chunks, max(args.queries - len(queries), 0))]
+    queries = queries[:args.queries]
+    query_vectors = embeddings.embed_documents(queries)
+    
+    # Exact top-k over the float32 vectors as reference
+    matrix = np.asarray(vectors, dtype=np.float32)
+    scores = np.asarray(query_vectors, dtype=np.float32) @ matrix.T
+    exact = [{chunks[i].metadata["chunk_id"] for i in np.argsort(-row)[:args.k]} for row in scores]
+    del matrix, scores
+    
+    print(f"{len(chunks)} chunks, {args.dimensions} dimensions, {len(queries)} queries, k={args.k}")
+    print(f"{'backend':>14} {'build s':>8} {'vectors MB':>10} {'rss MB':>7} {'disk MB':>8} "
+          f"{'p50 ms':>7} {'p99 ms':>7} {f'agree@{args.k}':>8}")
+    for spec in args.backends.split(","):
+        result = run_backend(spec, chunks, vectors, queries, query_vectors, exact, args)
+        vectors_mb = f"{result['vectors']:10.2f}" if result["vectors"] is not None else f"{'n/a':>10}"
+        print(f"{spec:>14} {result['build']:8.2f} {vectors_mb} {result['rss']:7.1f} {result['disk']:8.2f} "
+              f"{result['p50']:7.3f} {result['p99']:7.3f} {result['agree']:8.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Sweep chunk size and overlap over a local fixture corpus.
+
+For every (chunk_size, chunk_overlap) pair the corpus is split with
+DocumentLoader, indexed with VectorStoreManager into a temporary persistent
+collection and queried with a labeled question set. Embeddings come from a
+deterministic feature-hashing stand-in, so the sweep runs offline and its
+numbers are comparable between runs. Reported per setting:
+
+    chunks    number of indexed chunks
+    build     time to embed and index them
+    heap      Python memory held by the index after the build (BM25 index, metadata)
+    disk      size of the persisted collection
+    p50/p99   retrieval latency per question
+    recall@k  share of questions whose evidence is covered by a retrieved chunk
+
+A chunk covers the evidence of a question when it comes from the labeled
+source and contains at least half of the evidence text. Synthetic distractor
+pages built from the corpus vocabulary enlarge the index and make retrieval
+harder.
+
+Usage (from the Agentic_RAG directory):
+    python -m benchmarks.bench_chunking --sizes 100,250,500 --overlaps 0,50 --k 4
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+from langchain_core.documents import Document
+from benchmarks.corpus import load_corpus, make_splitter, resolve_tokenizer
+from benchmarks.fakes import HashingEmbeddings
+from components.bm25 import tokenize
+from components.document_loader import DocumentLoader
+from components.embeddings import EmbeddingManager
+from components.hybrid_retriever import HybridRetriever
+from components.vectorstore import VectorStoreManager
+from core.config import RETRIEVAL_FETCH_K
+
+def make_distractors(documents, count: int, words: int = 600):
+    rng = random.Random(0)
+    vocabulary = sorted({token for document in documents for token in tokenize(document.page_content)})
+    distractors = []
+    for i in range(count):
+        sentences = [" ".join(rng.choices(vocabulary, k=rng.randint(8, 20))).capitalize() + "."
+                     for _ in range(words // 14)]
+        paragraphs = [" ".join(sentences[j:j + 5]) for j in range(0, len(sentences), 5)]
+        distractors.append(Document(page_content="\n\n".join(paragraphs), metadata={"source": f"distractor-{i}"}))
+    return distractors
+
+def covers(chunk: Document, question, corpus_text) -> bool:
+    if chunk.metadata.get("source") != question["source"]:
+        return False
+        
+    start = chunk.metadata.get("start_index")
+    if start is None or start < 0:
+        return question["evidence"] in chunk.page_content
+        
+    evidence_start = corpus_text[question["source"]].index(question["evidence"])
+    evidence_end = evidence_start + len(question["evidence"])
+    overlap = min(evidence_end, start + len(chunk.page_content)) - max(evidence_start, start)
+    return overlap * 2 >= len(question["evidence"])
+
+def build_index(chunks, embedding_manager, chunk_size: int, chunk_overlap: int, directory: str):
+    manager = VectorStoreManager(
+        collection_name="bench-chunking",
+        embedding_manager=embedding_manager,
+        persist_directory=directory,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+    )
+    return manager.open().create_from_documents(chunks)
+
+def directory_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names)
+
+def run_setting(documents, questions, embedding_manager, args, chunk_size: int, chunk_overlap: int):
+    loader = DocumentLoader(chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+                            text_splitter=make_splitter(chunk_size, chunk_overlap, args.tokenizer))
+    chunks = loader.split_documents(documents)
+    corpus_text = {document.metadata["source"]: document.page_content for document in documents}
+    
+    with tempfile.TemporaryDirectory() as timed_dir, tempfile.TemporaryDirectory() as traced_dir:
+        start = time.perf_counter()
+        manager = build_index(chunks, embedding_manager, chunk_size, chunk_overlap, timed_dir)
+        build_time = time.perf_counter() - start
+        
+        # Build a second copy under tracemalloc so tracing does not skew the build time
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        traced = build_index(chunks, embedding_manager, chunk_size, chunk_overlap, traced_dir)
+        heap = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+        del traced
+        
+        retriever = HybridRetriever(vector_store_manager=manager, mode=args.mode, k=args.k,
+                                    fetch_k=max(args.k, RETRIEVAL_FETCH_K))
+        retriever.invoke(questions[0]["question"])
+        
+        latencies = []
+        hits = 0
+        for repeat in range(args.repeats):
+            for question in questions:
+                start = time.perf_counter()
+                results = retriever.invoke(question["question"])
+                latencies.append((time.perf_counter() - start) * 1000)
+                if repeat == 0:
+                    hits += any(covers(chunk, question, corpus_text) for chunk in results)
+                    
+        latencies.sort()
+        return {
+            "chunks": manager.count,
+            "build": build_time,
+            "heap": heap / 2 ** 20,
+            "disk": directory_size(timed_dir) / 2 ** 20,
+            "p50": statistics.median(latencies),
+            "p99": latencies[max(int(len(latencies) * 0.99) - 1, 0)],
+            "recall": hits / len(questions),
+        }
+
+def parse_ints(value: str):
+    return [int(item) for item in value.split(",") if item]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=parse_ints, default=[100, 250, 500, 1000], help="Comma-separated chunk sizes in tokens")
+    parser.add_argument("--overlaps", type=parse_ints, default=[0, 50, 100], help="Comma-separated chunk overlaps in tokens")
+    parser.add_argument("--k", type=int, default=4, help="Chunks retrieved per question")
+    parser.add_argument("--mode", choices=["hybrid", "vector", "keyword"], default="hybrid", help="Retrieval mode")
+    parser.add_argument("--repeats", type=int, default=5, help="Passes over the question set for latency")
+    parser.add_argument("--distractors", type=int, default=40, help="Number of synthetic distractor pages")
+    parser.add_argument("--tokenizer", choices=["auto", "tiktoken", "estimate"], default="auto",
+                        help="How chunk lengths are counted; auto uses tiktoken when its encoding is available")
+    args = parser.parse_args()
+    args.tokenizer = resolve_tokenizer(args.tokenizer)
+    
+    documents, questions = load_corpus()
+    documents += make_distractors(documents, args.distractors)
+    embedding_manager = EmbeddingManager(model="hashing-384", cache_path=None, embeddings=HashingEmbeddings())
+    
+    print(f"{len(documents)} pages ({args.distractors} distractors), {len(questions)} questions, "
+          f"{args.mode} retrieval, k={args.k}, {args.tokenizer} token counts")
+    print(f"{'size':>6} {'overlap':>7} {'chunks':>7} {'build s':>8} {'heap MB':>8} {'disk MB':>8} "
+          f"{'p50 ms':>7} {'p99 ms':>7} {f'recall@{args.k}':>9}")
+    for chunk_size in args.sizes:
+        for chunk_overlap in args.overlaps:
+            if chunk_overlap >= chunk_size:
+                continue
+            result = run_setting(documents, questions, embedding_manager, args, chunk_size, chunk_overlap)
+            print(f"{chunk_size:6} {chunk_overlap:7} {result['chunks']:7} {result['build']:8.2f} "
+                  f"{result['heap']:8.2f} {result['disk']:8.2f} {result['p50']:7.2f} {result['p99']:7.2f} "
+                  f"{result['recall']:9.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Benchmark serial vs concurrent URL fetching in DocumentLoader.
+
+Serves synthetic pages from a local stand-in server with per-page latency and
+compares a single-worker loader against the pooled, concurrent one.
+
+Usage (from the Agentic_RAG directory):
+    python -m benchmarks.bench_document_loader --pages 200 --delay 0.2
+"""
+import argparse
+import random
+import time
+from benchmarks.http_fixture import StandInServer, make_pages
+from components.document_loader import DocumentLoader
+
+def run(loader: DocumentLoader, urls):
+    start = time.perf_counter()
+    documents = loader.fetch_urls(urls)
+    return time.perf_counter() - start, len(documents)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200, help="Number of pages to serve")
+    parser.add_argument("--delay", type=float, default=0.2, help="Maximum per-page latency in seconds")
+    parser.add_argument("--workers", type=int, default=64, help="Worker pool size of the concurrent loader")
+    parser.add_argument("--per-host", type=int, default=64, help="Per-host concurrency limit of the concurrent loader")
+    parser.add_argument("--skip-serial", action="store_true", help="Only run the concurrent loader")
+    args = parser.parse_args()
+    
+    rng = random.Random(0)
+    delays = {f"/posts/{i}": rng.uniform(args.delay / 2, args.delay) for i in range(args.pages)}
+    pages = make_pages(args.pages)
+    
+    with StandInServer(pages, delay_for=lambda path: delays.get(path, 0.0)) as server:
+        # One missing page and one unreachable host must not abort the batch
+        urls = server.urls() + [server.base_url + "/missing", "http://127.0.0.1:9/unreachable"]
+        
+        print(f"{args.pages} pages, latency {args.delay / 2:.2f}-{args.delay:.2f}s, "
+              f"slowest page {max(delays.values()):.2f}s, sum of latencies {sum(delays.values()):.1f}s")
+              
+        if not args.skip_serial:
+            elapsed, count = run(DocumentLoader(max_workers=1, per_host_limit=1, timeout=5), urls)
+            print(f"serial      {elapsed:8.2f}s  {count} documents")
+            
+        loader = DocumentLoader(max_workers=args.workers, per_host_limit=args.per_host, timeout=5)
+        elapsed, count = run(loader, urls)
+        print(f"concurrent  {elapsed:8.2f}s  {count} documents "
+              f"({args.workers} workers, {args.per_host} per host)")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,67 @@
+"""
+Benchmark the per-query model setup overhead of the workflow nodes.
+
+"before" rebuilds the models the way the nodes used to on every step: a new
+ChatOpenAI per node, plus bind_tools for the agent and with_structured_output
+for the grader. "after" fetches the same models from the shared registry.
+No requests are sent, so this isolates client construction and schema
+generation from model latency.
+
+Usage (from the Agentic_RAG directory):
+    python -m benchmarks.bench_model_registry --queries 200
+"""
+import argparse
+import os
+import statistics
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from langchain_core.tools import tool
+from langchain_openai import ChatOpenAI
+from core.config import AGENT_MODEL, GRADER_MODEL, REWRITE_MODEL, GENERATOR_MODEL
+from nodes.grade_node import DocumentRelevanceGrade
+from nodes.model_registry import ModelRegistry
+
+@tool
+def retrieve_blog_posts(query: str) -> str:
+    """Search and return information about Lilian Weng blog posts."""
+    return query
+
+TOOLS = [retrieve_blog_posts]
+
+def setup_before():
+    ChatOpenAI(temperature=0, streaming=True, model=AGENT_MODEL).bind_tools(TOOLS)
+    ChatOpenAI(temperature=0, model=GRADER_MODEL, streaming=True).with_structured_output(DocumentRelevanceGrade)
+    ChatOpenAI(temperature=0, model=REWRITE_MODEL, streaming=True)
+    ChatOpenAI(model_name=GENERATOR_MODEL, temperature=0, streaming=True)
+
+def setup_after(registry: ModelRegistry):
+    registry.tool_model(AGENT_MODEL, TOOLS, temperature=0, streaming=True)
+    registry.structured_model(GRADER_MODEL, DocumentRelevanceGrade, temperature=0, streaming=True)
+    registry.chat_model(REWRITE_MODEL, temperature=0, streaming=True)
+    registry.chat_model(GENERATOR_MODEL, temperature=0, streaming=True)
+
+def measure(fn, queries: int):
+    samples = []
+    for _ in range(queries):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.mean(samples), samples[len(samples) // 2], samples[int(len(samples) * 0.99) - 1]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200, help="Number of simulated queries")
+    args = parser.parse_args()
+    
+    registry = ModelRegistry()
+    print(f"model setup per query over {args.queries} queries (ms)")
+    print(f"{'':8} {'mean':>8} {'p50':>8} {'p99':>8}")
+    for name, fn in (("before", setup_before), ("after", lambda: setup_after(registry))):
+        mean, p50, p99 = measure(fn, args.queries)
+        print(f"{name:8} {mean:8.3f} {p50:8.3f} {p99:8.3f}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,132 @@
+"""
+Compare the per-process cost of opening the index in several worker processes.
+
+The fixture corpus, padded with synthetic chunks, is indexed once into a
+persisted Chroma collection and a persisted NumPy index, and the NumPy index
+is exported for the mmap backend. Then, for each backend, --workers processes
+open the index at the same time, as app workers would, and answer --queries
+hybrid retrievals. Reported per backend:
+
+    open ms    time to open the index (VectorStoreManager.load_existing)
+    query ms   median hybrid retrieval latency
+    rss MB     resident memory added by opening and querying, per worker
+    pss MB     the same, with pages shared between workers divided among them
+    total MB   pss summed over all workers
+
+Usage (from the Agentic_RAG directory):
+    python -m benchmarks.bench_workers --workers 4 --chunks 20000
+    python -m benchmarks.bench_workers --backends numpy,mmap --dtype int8
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+from benchmarks.bench_backends import rss_bytes, synthetic_chunks
+from benchmarks.corpus import load_corpus, make_splitter
+from benchmarks.fakes import HashingEmbeddings
+from components.document_loader import DocumentLoader
+from components.embeddings import EmbeddingManager
+from components.hybrid_retriever import HybridRetriever
+from components.ingest import batched
+from components.vectorstore import VectorStoreManager
+
+def pss_bytes() -> int:
+    # Proportional set size: shared pages count 1/n for each of the n processes mapping them
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Pss:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+def make_manager(backend: str, directory: str, dtype: str, dimensions: int) -> VectorStoreManager:
+    embedding_manager = EmbeddingManager(model=f"hashing-{dimensions}", cache_path=None,
+                                         embeddings=HashingEmbeddings(dimensions))
+    return VectorStoreManager(embedding_manager=embedding_manager, persist_directory=directory,
+                              backend=backend, numpy_dtype=dtype,
+                              mmap_directory=os.path.join(directory, "export"))
+
+def worker(backend: str, directory: str, args, queries, barrier, results):
+    manager = make_manager(backend, directory, args.dtype, args.dimensions)
+    rss_before, pss_before = rss_bytes(), pss_bytes()
+    
+    start = time.perf_counter()
+    manager.load_existing()
+    open_time = time.perf_counter() - start
+    
+    retriever = HybridRetriever(vector_store_manager=manager)
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        retriever.invoke(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+        
+    # Measure once every worker has the index open, so shared pages are divided among them
+    barrier.wait()
+    results.put({
+        "open": open_time * 1000,
+        "query": statistics.median(latencies),
+        "rss": (rss_bytes() - rss_before) / 2 ** 20,
+        "pss": (pss_bytes() - pss_before) / 2 ** 20,
+    })
+    barrier.wait()
+
+def build_indexes(directory: str, backends, args):
+    documents, questions = load_corpus()
+    chunks = DocumentLoader(text_splitter=make_splitter(250, 50, "estimate")).split_documents(documents)
+    chunks += synthetic_chunks(documents, args.chunks)
+    
+    embeddings = HashingEmbeddings(args.dimensions)
+    for i, chunk in enumerate(chunks):
+        chunk.metadata["chunk_id"] = f"chunk-{i}"
+    vectors = embeddings.embed_documents([chunk.page_content for chunk in chunks])
+    
+    for backend in ("chroma", "numpy"):
+        if backend not in backends and not (backend == "numpy" and "mmap" in backends):
+            continue
+        manager = make_manager(backend, directory, args.dtype, args.dimensions).open()
+        for batch in batched(range(len(chunks)), 1000):
+            manager.add_embedded([chunks[i] for i in batch], [vectors[i] for i in batch])
+        manager.backend.persist()
+        if backend == "numpy" and "mmap" in backends:
+            manager.export_mmap()
+            
+    return len(chunks), [question["question"] for question in questions]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="chroma,numpy,mmap", help="Comma-separated backends: chroma, numpy, mmap")
+    parser.add_argument("--workers", type=int, default=4, help="Worker processes opening the index")
+    parser.add_argument("--chunks", type=int, default=10000, help="Synthetic chunks added to the fixture corpus")
+    parser.add_argument("--dimensions", type=int, default=384, help="Embedding dimensions")
+    parser.add_argument("--dtype", default="float16", help="Vector storage type of the numpy and mmap backends")
+    parser.add_argument("--queries", type=int, default=30, help="Retrievals per worker")
+    args = parser.parse_args()
+    
+    backends = args.backends.split(",")
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as directory:
+        count, questions = build_indexes(directory, backends, args)
+        queries = [questions[i % len(questions)] for i in range(args.queries)]
+        
+        print(f"{count} chunks, {args.dimensions} dimensions, {args.workers} workers, {args.dtype} vectors")
+        print(f"{'backend':>8} {'open ms':>9} {'query ms':>9} {'rss MB':>8} {'pss MB':>8} {'total MB':>9}")
+        for backend in backends:
+            barrier = context.Barrier(args.workers)
+            results = context.Queue()
+            processes = [context.Process(target=worker, args=(backend, directory, args, queries, barrier, results))
+                         for _ in range(args.workers)]
+            for process in processes:
+                process.start()
+            samples = [results.get() for _ in processes]
+            for process in processes:
+                process.join()
+                
+            print(f"{backend:>8} {statistics.mean(s['open'] for s in samples):9.1f} "
+                  f"{statistics.median(s['query'] for s in samples):9.3f} "
+                  f"{statistics.mean(s['rss'] for s in samples):8.1f} {statistics.mean(s['pss'] for s in samples):8.1f} "
+                  f"{sum(s['pss'] for s in samples):9.1f}")
+
+if __name__ == "__main__":
+    main()
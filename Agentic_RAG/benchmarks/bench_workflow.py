@@ -0,0 +1,202 @@
+"""
+Benchmark the query path end to end with local stand-ins for OpenAI.
+
+The fixture corpus is served by a local stand-in server and indexed with
+feature-hashing embeddings; the agent, grader, rewrite and generate models
+are replaced by fake chat models with configurable latency. Queries are then
+sent to the Flask app by concurrent clients, so everything measured besides
+the simulated latency is our own code: graph stepping, state handling,
+retrieval, event serialization and the HTTP layer. With --latency 0 the
+numbers are pure overhead.
+
+Reported: throughput, query latency and time to first answer token, the
+duration of each node (from the step events of /query/stream), response
+size, rejected (429) and failed queries, and peak memory.
+
+Usage (from the Agentic_RAG directory):
+    python -m benchmarks.bench_workflow --queries 200 --concurrency 8 --latency 0
+    python -m benchmarks.bench_workflow --endpoint query --latency 0.2 --token-latency 0.01
+    python -m benchmarks.bench_workflow --latency 0.2 --embedding-latency 0.05 --speculative --paraphrase 0.5
+    python -m benchmarks.bench_workflow --latency 0.2 --token-latency 0.01 --topology fused
+"""
+import argparse
+import json
+import logging
+import os
+import resource
+import statistics
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[max(int(len(ordered) * fraction + 0.5) - 1, 0)]
+
+def summarize(samples):
+    return statistics.mean(samples), percentile(samples, 0.5), percentile(samples, 0.99)
+
+def read_events(response, result):
+    buffer = ""
+    for chunk in response.response:
+        chunk = chunk.decode("utf-8") if isinstance(chunk, bytes) else chunk
+        result["bytes"] += len(chunk.encode("utf-8"))
+        buffer += chunk
+        while "\n\n" in buffer:
+            block, buffer = buffer.split("\n\n", 1)
+            fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line)
+            yield fields.get("event"), json.loads(fields.get("data", "null"))
+
+def run_stream_query(client, question: str):
+    start = time.perf_counter()
+    response = client.post("/query/stream", json={"query": question}, buffered=False)
+    result = {"status": response.status_code, "nodes": [], "first_token": None, "ok": False, "bytes": 0}
+    if response.status_code != 200:
+        response.close()
+        result["latency"] = time.perf_counter() - start
+        return result
+        
+    started = {}
+    try:
+        for event, data in read_events(response, result):
+            now = time.perf_counter()
+            if event == "token" and result["first_token"] is None:
+                result["first_token"] = now - start
+            elif event == "step" and data["status"] == "started":
+                started[data["step"]] = now
+            elif event == "step" and data["step"] in started:
+                result["nodes"].append((data["step"], now - started.pop(data["step"])))
+            elif event == "done":
+                result["ok"] = True
+    finally:
+        response.close()
+        
+    result["latency"] = time.perf_counter() - start
+    return result
+
+def run_json_query(client, question: str):
+    start = time.perf_counter()
+    response = client.post("/query", json={"query": question})
+    ok = response.status_code == 200 and response.get_json().get("status") == "success"
+    return {"status": response.status_code, "nodes": [], "first_token": None, "ok": ok,
+            "bytes": len(response.data), "latency": time.perf_counter() - start}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries to send")
+    parser.add_argument("--concurrency", type=int, default=8, help="Number of concurrent clients")
+    parser.add_argument("--endpoint", choices=["stream", "query"], default="stream",
+                        help="POST /query/stream (with per-node timings) or POST /query")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated seconds before each model response")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Simulated seconds per generated token")
+    parser.add_argument("--embedding-latency", type=float, default=0.0, help="Simulated seconds per embedding request")
+    parser.add_argument("--relevance", type=float, default=0.75, help="Share of chunks the fake grader finds relevant")
+    parser.add_argument("--answer-cache", action="store_true", help="Keep the answer cache enabled")
+    parser.add_argument("--speculative", action="store_true", help="Retrieve speculatively during the agent call")
+    parser.add_argument("--paraphrase", type=float, default=0.0,
+                        help="Share of questions the fake agent rephrases in its tool call")
+    parser.add_argument("--topology", choices=["standard", "fused"], default="standard",
+                        help="Graph topology; fused grades and generates in one model call")
+    parser.add_argument("--trace-memory", action="store_true", help="Also report the tracemalloc peak (slows the run)")
+    parser.add_argument("--tokenizer", choices=["auto", "tiktoken", "estimate"], default="auto",
+                        help="How chunk lengths are counted; auto uses tiktoken when its encoding is available")
+    args = parser.parse_args()
+    
+    # Configure the app before it is imported: in-memory index, no tracing,
+    # and by default every query runs the workflow instead of hitting the cache
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    os.environ.setdefault("LANGSMITH_TRACING", "false")
+    os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
+    os.environ["VECTOR_DB_PERSIST_DIR"] = ""
+    os.environ["ANSWER_CACHE_ENABLED"] = "true" if args.answer_cache else "false"
+    os.environ["SPECULATIVE_RETRIEVAL"] = "true" if args.speculative else "false"
+    os.environ["GRAPH_TOPOLOGY"] = args.topology
+    
+    import app as rag_app
+    from benchmarks.corpus import corpus_pages, load_corpus, make_splitter, resolve_tokenizer
+    from benchmarks.fakes import HashingEmbeddings, fake_model_factory
+    from benchmarks.http_fixture import StandInServer
+    from components.document_loader import DocumentLoader
+    from components.embeddings import EmbeddingManager
+    from core.config import CHUNK_SIZE, CHUNK_OVERLAP
+    from core.metrics import speculative_retrievals
+    from nodes.model_registry import model_registry
+    
+    # The app logs every step at INFO level, which would dominate the timings
+    logging.getLogger().setLevel(logging.WARNING)
+    model_registry.set_factory(fake_model_factory(
+        latency=args.latency, token_latency=args.token_latency, relevance=args.relevance,
+        paraphrase=args.paraphrase))
+        
+    documents, questions = load_corpus()
+    tokenizer = resolve_tokenizer(args.tokenizer)
+    loader = DocumentLoader(text_splitter=make_splitter(CHUNK_SIZE, CHUNK_OVERLAP, tokenizer))
+    embedding_manager = EmbeddingManager(model="hashing-384", cache_path=None,
+                                         embeddings=HashingEmbeddings(latency=args.embedding_latency))
+                                         
+    with StandInServer(corpus_pages(documents)) as server:
+        if not rag_app.initialize_pipeline(server.urls(), loader=loader, embedding_manager=embedding_manager):
+            raise SystemExit("Pipeline initialization failed")
+    # Read while the in-memory collection is certainly alive; its connections are per thread
+    chunk_count = rag_app.pipelines.current.vector_store_manager.count
+    
+    run_query = run_stream_query if args.endpoint == "stream" else run_json_query
+    local = threading.local()
+    
+    def send(i: int):
+        # One test client per worker thread
+        if not hasattr(local, "client"):
+            local.client = rag_app.app.test_client()
+        return run_query(local.client, questions[i % len(questions)]["question"])
+        
+    # Warm up lazily built models and prompts outside the measurement
+    send(0)
+    
+    if args.trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(send, range(args.queries)))
+    elapsed = time.perf_counter() - start
+    traced_peak = tracemalloc.get_traced_memory()[1] if args.trace_memory else None
+    tracemalloc.stop()
+    
+    completed = [result for result in results if result["ok"]]
+    rejected = sum(result["status"] == 429 for result in results)
+    print(f"{args.queries} queries, {args.concurrency} clients, POST /{'query/stream' if args.endpoint == 'stream' else 'query'}, "
+          f"{chunk_count} chunks, model latency {args.latency:.3f}s "
+          f"+ {args.token_latency:.3f}s/token, {tokenizer} token counts")
+    print(f"throughput  {len(completed) / elapsed:8.1f} queries/s over {elapsed:.2f}s "
+          f"({len(completed)} completed, {rejected} rejected, {len(results) - len(completed) - rejected} failed)")
+          
+    if not completed:
+        return
+        
+    print(f"{'(ms)':24} {'count':>6} {'mean':>9} {'p50':>9} {'p99':>9}")
+    rows = [("query", [result["latency"] for result in completed])]
+    first_tokens = [result["first_token"] for result in completed if result["first_token"] is not None]
+    if first_tokens:
+        rows.append(("first token", first_tokens))
+    nodes = {}
+    for result in completed:
+        for node, duration in result["nodes"]:
+            nodes.setdefault(node, []).append(duration)
+    rows.extend((f"node {node}", durations) for node, durations in nodes.items())
+    
+    for name, samples in rows:
+        mean, p50, p99 = summarize(samples)
+        print(f"{name:24} {len(samples):6} {mean * 1000:9.2f} {p50 * 1000:9.2f} {p99 * 1000:9.2f}")
+        
+    print(f"response    {statistics.mean(result['bytes'] for result in completed) / 1024:8.1f} KB per query")
+    # ru_maxrss is reported in kilobytes on Linux
+    print(f"peak RSS    {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:8.1f} MB")
+    if args.speculative:
+        outcomes = {outcome: int(speculative_retrievals.value(outcome=outcome))
+                    for outcome in ("used", "missed", "discarded")}
+        print("speculation " + ", ".join(f"{count} {outcome}" for outcome, count in outcomes.items()))
+    if traced_peak is not None:
+        print(f"traced peak {traced_peak / 2 ** 20:8.1f} MB (Python allocations during the run)")
+
+if __name__ == "__main__":
+    main()
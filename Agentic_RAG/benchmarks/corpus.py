@@ -0,0 +1,52 @@
+"""
+Fixture corpus and text splitting shared by the offline benchmarks.
+"""
+import json
+import os
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from benchmarks.http_fixture import PAGE_TEMPLATE
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+def load_corpus():
+    corpus_dir = os.path.join(FIXTURES, "corpus")
+    documents = []
+    for name in sorted(os.listdir(corpus_dir)):
+        with open(os.path.join(corpus_dir, name), encoding="utf-8") as f:
+            documents.append(Document(page_content=f.read(), metadata={"source": name}))
+            
+    with open(os.path.join(FIXTURES, "questions.json"), encoding="utf-8") as f:
+        questions = json.load(f)
+    return documents, questions
+
+def corpus_pages(documents):
+    # Serve each fixture document as an HTML page, one paragraph per block of text
+    pages = {}
+    for document in documents:
+        title, _, body = document.page_content.partition("\n")
+        paragraphs = "".join(f"<p>{paragraph}</p>" for paragraph in body.split("\n\n") if paragraph.strip())
+        pages["/corpus/" + os.path.splitext(document.metadata["source"])[0]] = PAGE_TEMPLATE.format(
+            title=title, body=paragraphs)
+    return pages
+
+def make_splitter(chunk_size: int, chunk_overlap: int, tokenizer: str):
+    # Same splitter as DocumentLoader; "estimate" counts four characters per
+    # token for machines that cannot download the tiktoken encoding
+    if tokenizer == "tiktoken":
+        return RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+            chunk_size=chunk_size, chunk_overlap=chunk_overlap, add_start_index=True)
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap, add_start_index=True,
+        length_function=lambda text: (len(text) + 3) // 4)
+
+def resolve_tokenizer(tokenizer: str) -> str:
+    if tokenizer != "auto":
+        return tokenizer
+    try:
+        import tiktoken
+        tiktoken.get_encoding("gpt2")
+        return "tiktoken"
+    except Exception as e:
+        print(f"tiktoken encoding unavailable ({e.__class__.__name__}), estimating tokens from characters")
+        return "estimate"
@@ -0,0 +1,173 @@
+"""
+Deterministic local stand-ins for the OpenAI models used by the benchmarks.
+"""
+import hashlib
+import json
+import time
+import uuid
+from functools import lru_cache
+from typing import Any, Callable, Iterator, List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+from components.bm25 import tokenize
+
+def _share(text: str, salt: str) -> float:
+    """Map a text to a deterministic number in [0, 1)"""
+    digest = hashlib.blake2b(f"{salt}:{text}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") / 2 ** 64
+
+@lru_cache(maxsize=100_000)
+def _bucket(term: str, dimensions: int):
+    digest = hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest()
+    value = int.from_bytes(digest, "little")
+    return value % dimensions, 1.0 if value >> 63 else -1.0
+
+class HashingEmbeddings(Embeddings):
+    """
+    Offline embedding model based on feature hashing.
+    
+    Each text is embedded as a signed, hashed bag of its words and word
+    bigrams and normalized to unit length, so texts sharing terms are close
+    in cosine similarity. Vectors are deterministic across runs, which makes
+    retrieval quality comparable between benchmark settings without calling
+    the embedding API.
+    """
+    
+    def __init__(self, dimensions: int = 384, latency: float = 0.0):
+        """
+        Initialize the embedding model.
+        
+        Args:
+            dimensions: Length of the embedding vectors
+            latency: Simulated seconds per embedding request
+        """
+        self.dimensions = dimensions
+        self.latency = latency
+        
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        tokens = tokenize(text)
+        for term in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+            index, sign = _bucket(term, self.dimensions)
+            vector[index] += sign
+            
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+        
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+        
+    def embed_query(self, text: str) -> List[float]:
+        time.sleep(self.latency)
+        return self._embed(text)
+
+def _usage(prompt_tokens: int, completion_tokens: int):
+    return {"input_tokens": prompt_tokens, "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+class FakeChatModel(BaseChatModel):
+    """
+    Offline chat model with simulated latency.
+    
+    A plain model answers with a fixed text, streamed word by word. With
+    tools bound it calls the first tool with the content of the latest
+    message as query, rewording a deterministic paraphrase share of the
+    queries as real agents do. With structured output it grades a
+    deterministic share of its inputs as relevant, answering those when the
+    schema has an answer field. Every call waits latency seconds before the
+    first token and token_latency seconds per further token.
+    """
+    
+    answer: str = "Agents plan their tasks, keep memory across steps and call external tools."
+    latency: float = 0.0
+    token_latency: float = 0.0
+    relevance: float = 0.75
+    paraphrase: float = 0.0
+    tool_name: Optional[str] = None
+    
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+        
+    def _message(self, messages: List[BaseMessage]) -> AIMessage:
+        # Report one token per word, like a model returning its usage
+        prompt_tokens = sum(len(str(message.content).split()) for message in messages)
+        if self.tool_name:
+            return AIMessage(content="", tool_calls=[{
+                "name": self.tool_name,
+                "args": {"query": self._tool_query(messages[-1].content)},
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+            }], usage_metadata=_usage(prompt_tokens, 8))
+        return AIMessage(content=self.answer, usage_metadata=_usage(prompt_tokens, len(self.answer.split())))
+        
+    def _tool_query(self, question: str) -> str:
+        if _share(question, "paraphrase") >= self.paraphrase:
+            return question
+        # Rephrase as a search instruction, as tool-calling models often do
+        return f"Find information on: {question.rstrip('?.! ')}"
+        
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = self._message(messages)
+        time.sleep(self.latency + self.token_latency * len(message.content.split()))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+        
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        message = self._message(messages)
+        time.sleep(self.latency)
+        
+        if message.tool_calls:
+            call = message.tool_calls[0]
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[{
+                "name": call["name"],
+                "args": f'{{"query": {json.dumps(call["args"]["query"])}}}',
+                "id": call["id"],
+                "index": 0,
+            }], usage_metadata=message.usage_metadata))
+            return
+            
+        words = message.content.split(" ")
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.token_latency)
+            # Usage arrives with the last chunk, as with stream_usage=True
+            usage = message.usage_metadata if i == len(words) - 1 else None
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=f" {word}" if i else word, usage_metadata=usage))
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+            
+    def bind_tools(self, tools, **kwargs) -> "FakeChatModel":
+        return self.model_copy(update={"tool_name": tools[0].name})
+        
+    def with_structured_output(self, schema, **kwargs) -> RunnableLambda:
+        def grade(prompt: Any):
+            text = prompt.to_string() if hasattr(prompt, "to_string") else str(prompt)
+            time.sleep(self.latency)
+            digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+            relevant = int.from_bytes(digest, "little") / 2 ** 64 < self.relevance
+            if "answer" not in schema.model_fields:
+                return schema(binary_score="yes" if relevant else "no")
+                
+            # Graded answers also take the time to generate their answer
+            answer = self.answer if relevant else ""
+            time.sleep(self.token_latency * len(answer.split()))
+            return schema(binary_score="yes" if relevant else "no", answer=answer)
+            
+        return RunnableLambda(grade)
+
+def fake_model_factory(**settings) -> Callable[..., FakeChatModel]:
+    """
+    Build a model registry factory returning fake chat models.
+    
+    Args:
+        **settings: FakeChatModel fields such as latency and relevance
+        
+    Returns:
+        Callable for ModelRegistry.set_factory
+    """
+    return lambda model, **kwargs: FakeChatModel(**settings)
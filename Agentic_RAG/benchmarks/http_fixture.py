@@ -0,0 +1,106 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+PAGE_TEMPLATE = """<html lang="en">
+<head><title>{title}</title><meta name="description" content="{title}"></head>
+<body><h1>{title}</h1>{body}</body>
+</html>"""
+
+class StandInServer:
+    """
+    Local HTTP server standing in for the blog hosts during benchmarks.
+    
+    Pages are served from memory after an optional artificial delay, so
+    fetching behaviour can be measured without network access.
+    """
+    
+    def __init__(self, pages: Dict[str, str], delay: float = 0.0,
+                 delay_for: Optional[Callable[[str], float]] = None):
+        """
+        Initialize the stand-in server.
+        
+        Args:
+            pages: Mapping of URL path (e.g. "/posts/1") to HTML body
+            delay: Seconds to wait before answering each request
+            delay_for: Optional function returning a per-path delay, overriding delay
+        """
+        self.pages = pages
+        self.delay = delay
+        self.delay_for = delay_for
+        self.requests = 0
+        self._server = None
+        self._thread = None
+        
+    def _handler(self):
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            
+            def do_GET(self):
+                server.requests += 1
+                time.sleep(server.delay_for(self.path) if server.delay_for else server.delay)
+                
+                body = server.pages.get(self.path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                    
+                payload = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                
+            def log_message(self, format, *args):
+                pass
+                
+        return Handler
+        
+    def __enter__(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+        
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+        
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+        
+    def urls(self) -> List[str]:
+        """
+        Get the absolute URLs of all served pages.
+        
+        Returns:
+            List of URLs
+        """
+        return [self.base_url + path for path in self.pages]
+
+def make_pages(count: int, paragraphs: int = 20) -> Dict[str, str]:
+    """
+    Generate synthetic HTML pages.
+    
+    Args:
+        count: Number of pages
+        paragraphs: Number of paragraphs per page
+        
+    Returns:
+        Mapping of URL path to HTML body
+    """
+    pages = {}
+    for i in range(count):
+        body = "".join(
+            f"<p>Post {i} paragraph {j}: agents plan, use tools and keep memory across steps.</p>"
+            for j in range(paragraphs)
+        )
+        pages[f"/posts/{i}"] = PAGE_TEMPLATE.format(title=f"Post {i}", body=body)
+    return pages
\ No newline at end of file
@@ -0,0 +1,234 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Set
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class CachedAnswer(NamedTuple):
+    """Answer served from the cache."""
+    query: str
+    answer: str
+    sources: List[Dict[str, Any]]
+    similarity: float
+
+class _Entry(NamedTuple):
+    query: str
+    answer: str
+    sources: List[Dict[str, Any]]
+    chunk_ids: Set[str]
+    created_at: float
+
+class SemanticAnswerCache:
+    """
+    Cache of generated answers looked up by query similarity.
+    
+    A query is answered from the cache when a previous query's embedding has
+    a cosine similarity of at least the threshold with it. Each entry records
+    the chunks its answer was generated from and is dropped when any of them
+    leaves the index, so re-indexing never serves answers built on stale
+    content. Entries also expire after a TTL, and the least recently used
+    entries are evicted once the cache is full.
+    
+    Vectors are kept normalized in a preallocated matrix, one row per slot,
+    so a lookup is a single matrix-vector product.
+    """
+    
+    def __init__(self, embedding_manager, threshold: float, ttl: float, max_entries: int,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the answer cache.
+        
+        Args:
+            embedding_manager: Embedding manager used to embed queries
+            threshold: Minimum cosine similarity for a cached answer to be reused
+            ttl: Seconds an answer stays valid, 0 to keep answers until invalidated
+            max_entries: Maximum number of cached answers
+            clock: Time source, monotonic seconds
+        """
+        self.embedding_manager = embedding_manager
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._vectors = None
+        self._used = np.zeros(max_entries, dtype=bool)
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()  # slot -> entry, least recently used first
+        self._free = list(range(max_entries - 1, -1, -1))
+        self._by_chunk: Dict[str, Set[int]] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "invalidations": 0,
+                          "expirations": 0, "evictions": 0}
+    
+    @property
+    def generation(self) -> int:
+        """
+        Get the invalidation generation.
+        
+        Take it before running the workflow and pass it to put(), so an answer
+        computed while the index changed underneath it is not cached.
+        
+        Returns:
+            Number of invalidations so far
+        """
+        return self._generation
+        
+    def embed(self, query: str) -> np.ndarray:
+        """
+        Embed and normalize a query.
+        
+        Args:
+            query: Query text
+            
+        Returns:
+            Unit-length query vector
+        """
+        vector = np.asarray(self.embedding_manager.embeddings.embed_query(query), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+        
+    def lookup(self, vector: np.ndarray) -> Optional[CachedAnswer]:
+        """
+        Find the cached answer of the most similar previous query.
+        
+        Args:
+            vector: Normalized query vector from embed()
+            
+        Returns:
+            Cached answer, or None if no entry is similar enough
+        """
+        with self._lock:
+            self._expire()
+            
+            if self._entries and self._vectors.shape[1] == vector.shape[0]:
+                similarities = self._vectors @ vector
+                similarities[~self._used] = -np.inf
+                slot = int(np.argmax(similarities))
+                similarity = float(similarities[slot])
+                
+                if similarity >= self.threshold:
+                    self._entries.move_to_end(slot)
+                    self._counters["hits"] += 1
+                    entry = self._entries[slot]
+                    return CachedAnswer(entry.query, entry.answer, entry.sources, similarity)
+                    
+            self._counters["misses"] += 1
+            return None
+            
+    def put(self, vector: np.ndarray, query: str, answer: str, sources: List[Dict[str, Any]],
+            generation: Optional[int] = None):
+        """
+        Cache an answer together with the chunks it was generated from.
+        
+        Args:
+            vector: Normalized query vector from embed()
+            query: Query text
+            answer: Generated answer
+            sources: Source chunks, each a dictionary with at least a chunk_id
+            generation: Value of generation when the answer was started; the
+                answer is not cached if chunks were invalidated since
+        """
+        chunk_ids = {source["chunk_id"] for source in sources if source.get("chunk_id")}
+        if not chunk_ids:
+            # Without sources there is nothing to invalidate the answer on
+            return
+            
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+                
+            if self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+                self._clear()
+                
+            if not self._free:
+                self._remove(next(iter(self._entries)))
+                self._counters["evictions"] += 1
+                
+            slot = self._free.pop()
+            self._vectors[slot] = vector
+            self._used[slot] = True
+            self._entries[slot] = _Entry(query, answer, sources, chunk_ids, self.clock())
+            for chunk_id in chunk_ids:
+                self._by_chunk.setdefault(chunk_id, set()).add(slot)
+            self._counters["stores"] += 1
+            
+    def invalidate_chunks(self, chunk_ids: Iterable[str]) -> int:
+        """
+        Drop every answer that was generated from one of the given chunks.
+        
+        Args:
+            chunk_ids: IDs of chunks removed from the index
+            
+        Returns:
+            Number of answers dropped
+        """
+        with self._lock:
+            self._generation += 1
+            
+            slots = set()
+            for chunk_id in chunk_ids:
+                slots.update(self._by_chunk.get(chunk_id, ()))
+                
+            for slot in slots:
+                self._remove(slot)
+            self._counters["invalidations"] += len(slots)
+            
+        if slots:
+            logger.info(f"Invalidated {len(slots)} cached answers")
+        return len(slots)
+        
+    def clear(self):
+        """Drop all cached answers."""
+        with self._lock:
+            self._generation += 1
+            self._clear()
+            
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache usage statistics.
+        
+        Returns:
+            Dictionary with the number of entries, hit rate and event counters
+        """
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hit_rate": self._counters["hits"] / lookups if lookups else 0.0,
+                **self._counters,
+            }
+            
+    def _expire(self):
+        """Remove expired entries; must be called with the lock held."""
+        if not self.ttl:
+            return
+            
+        cutoff = self.clock() - self.ttl
+        expired = [slot for slot, entry in self._entries.items() if entry.created_at < cutoff]
+        for slot in expired:
+            self._remove(slot)
+        self._counters["expirations"] += len(expired)
+        
+    def _remove(self, slot: int):
+        """Free a slot; must be called with the lock held."""
+        entry = self._entries.pop(slot)
+        self._used[slot] = False
+        self._free.append(slot)
+        for chunk_id in entry.chunk_ids:
+            slots = self._by_chunk.get(chunk_id)
+            if slots is not None:
+                slots.discard(slot)
+                if not slots:
+                    del self._by_chunk[chunk_id]
+                    
+    def _clear(self):
+        """Free all slots; must be called with the lock held."""
+        self._entries.clear()
+        self._by_chunk.clear()
+        self._used[:] = False
+        self._free = list(range(self.max_entries - 1, -1, -1))
@@ -0,0 +1,265 @@
+import hashlib
+import math
+import os
+import re
+import threading
+from array import array
+from collections import Counter
+from heapq import nlargest
+from operator import itemgetter
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase word tokens.
+    
+    Args:
+        text: Text to tokenize
+        
+    Returns:
+        List of tokens
+    """
+    return _TOKEN_PATTERN.findall(text.lower())
+
+def term_hash(term: str) -> int:
+    """
+    Hash a term to the 64-bit key used by the memory-mapped keyword index.
+    
+    Args:
+        term: Token as returned by tokenize
+        
+    Returns:
+        Unsigned 64-bit hash
+    """
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+class BM25Index:
+    """
+    In-memory inverted index scoring chunks with Okapi BM25.
+    
+    Only postings and document lengths are kept; the chunk texts stay in the
+    vector store and are looked up by ID. The index is safe to update while
+    other threads search it.
+    """
+    
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """
+        Initialize an empty index.
+        
+        Args:
+            k1: Term frequency saturation
+            b: Document length normalization
+        """
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = {}  # term -> {chunk ID: term frequency}
+        self._terms: Dict[str, List[str]] = {}           # chunk ID -> distinct terms
+        self._lengths: Dict[str, int] = {}               # chunk ID -> number of tokens
+        self._total_length = 0
+        self._lock = threading.RLock()
+        
+    def __len__(self) -> int:
+        return len(self._lengths)
+        
+    def add(self, ids: Iterable[str], texts: Iterable[str]):
+        """
+        Index chunks; chunks that are already indexed are skipped.
+        
+        Args:
+            ids: Chunk IDs
+            texts: Chunk texts
+        """
+        with self._lock:
+            for chunk_id, text in zip(ids, texts):
+                if chunk_id in self._lengths:
+                    continue
+                    
+                tokens = tokenize(text)
+                counts = Counter(tokens)
+                for term, frequency in counts.items():
+                    self._postings.setdefault(term, {})[chunk_id] = frequency
+                self._terms[chunk_id] = list(counts)
+                self._lengths[chunk_id] = len(tokens)
+                self._total_length += len(tokens)
+                
+    def remove(self, ids: Iterable[str]):
+        """
+        Remove chunks from the index.
+        
+        Args:
+            ids: Chunk IDs
+        """
+        with self._lock:
+            for chunk_id in ids:
+                if chunk_id not in self._lengths:
+                    continue
+                    
+                for term in self._terms.pop(chunk_id):
+                    postings = self._postings[term]
+                    del postings[chunk_id]
+                    if not postings:
+                        del self._postings[term]
+                self._total_length -= self._lengths.pop(chunk_id)
+                
+    def clear(self):
+        """Remove all chunks from the index."""
+        with self._lock:
+            self._postings = {}
+            self._terms = {}
+            self._lengths = {}
+            self._total_length = 0
+            
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """
+        Find the chunks scoring highest for a query.
+        
+        Args:
+            query: Query text
+            k: Number of chunks to return
+            
+        Returns:
+            List of (chunk ID, score) pairs, best first
+        """
+        with self._lock:
+            count = len(self._lengths)
+            if not count:
+                return []
+                
+            average_length = self._total_length / count
+            scores: Dict[str, float] = {}
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                    
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_id, frequency in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[chunk_id] / average_length)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+                    
+        return nlargest(k, scores.items(), key=itemgetter(1))
+
+class BM25ArrayWriter:
+    """
+    Collects the postings of chunks and writes them as arrays for MmapBM25Index.
+    
+    Chunks are added in row order. Terms are keyed by their 64-bit hash, so
+    the written index needs no term dictionary.
+    """
+    
+    def __init__(self):
+        self._postings: Dict[int, array] = {}  # term hash -> interleaved (row, term frequency)
+        self._lengths = array("i")
+        
+    def add(self, text: str):
+        """
+        Index the next chunk.
+        
+        Args:
+            text: Chunk text
+        """
+        row = len(self._lengths)
+        tokens = tokenize(text)
+        for term, frequency in Counter(tokens).items():
+            self._postings.setdefault(term_hash(term), array("i")).extend((row, frequency))
+        self._lengths.append(len(tokens))
+        
+    def save(self, directory: str):
+        """
+        Write the postings to keyword_*.npy files.
+        
+        Args:
+            directory: Directory of the index export
+        """
+        terms = np.array(sorted(self._postings), dtype=np.uint64)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        for i, term in enumerate(terms.tolist()):
+            offsets[i + 1] = offsets[i] + len(self._postings[term]) // 2
+            
+        postings = np.empty((int(offsets[-1]), 2), dtype=np.int32)
+        for i, term in enumerate(terms.tolist()):
+            postings[offsets[i]:offsets[i + 1]] = np.frombuffer(self._postings[term], dtype=np.int32).reshape(-1, 2)
+            
+        np.save(os.path.join(directory, "keyword_terms.npy"), terms)
+        np.save(os.path.join(directory, "keyword_offsets.npy"), offsets)
+        np.save(os.path.join(directory, "keyword_rows.npy"), np.ascontiguousarray(postings[:, 0]))
+        np.save(os.path.join(directory, "keyword_frequencies.npy"), np.ascontiguousarray(postings[:, 1]))
+        np.save(os.path.join(directory, "keyword_lengths.npy"), np.frombuffer(self._lengths, dtype=np.int32))
+
+class MmapBM25Index:
+    """
+    Read-only BM25 index over memory-mapped posting arrays.
+    
+    Scores like BM25Index, but the postings written by BM25ArrayWriter are
+    mapped instead of loaded, so opening is immediate and processes opening
+    the same files share their pages. A query only reads the postings of its
+    own terms.
+    """
+    
+    def __init__(self, directory: str, ids: np.ndarray, k1: float = 1.5, b: float = 0.75):
+        """
+        Open the index.
+        
+        Args:
+            directory: Directory of the index export
+            ids: Chunk IDs by row, as bytes
+            k1: Term frequency saturation
+            b: Document length normalization
+        """
+        self.k1 = k1
+        self.b = b
+        self._ids = ids
+        self._terms = np.load(os.path.join(directory, "keyword_terms.npy"), mmap_mode="r")
+        self._offsets = np.load(os.path.join(directory, "keyword_offsets.npy"), mmap_mode="r")
+        self._rows = np.load(os.path.join(directory, "keyword_rows.npy"), mmap_mode="r")
+        self._frequencies = np.load(os.path.join(directory, "keyword_frequencies.npy"), mmap_mode="r")
+        self._lengths = np.load(os.path.join(directory, "keyword_lengths.npy"), mmap_mode="r")
+        self._average_length = float(self._lengths.mean()) if len(self._lengths) else 0.0
+        
+    def __len__(self) -> int:
+        return len(self._lengths)
+        
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """
+        Find the chunks scoring highest for a query.
+        
+        Args:
+            query: Query text
+            k: Number of chunks to return
+            
+        Returns:
+            List of (chunk ID, score) pairs, best first
+        """
+        count = len(self._lengths)
+        if not count or not len(self._terms):
+            return []
+            
+        hashes = np.array([term_hash(term) for term in set(tokenize(query))], dtype=np.uint64)
+        positions = np.searchsorted(self._terms, hashes)
+        rows = []
+        scores = []
+        for term, position in zip(hashes, positions):
+            if position >= len(self._terms) or self._terms[position] != term:
+                continue
+                
+            start, end = int(self._offsets[position]), int(self._offsets[position + 1])
+            term_rows = np.asarray(self._rows[start:end])
+            frequencies = self._frequencies[start:end].astype(np.float32)
+            idf = math.log(1 + (count - (end - start) + 0.5) / (end - start + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self._lengths[term_rows] / self._average_length)
+            rows.append(term_rows)
+            scores.append(idf * frequencies * (self.k1 + 1) / (frequencies + norm))
+            
+        if not rows:
+            return []
+            
+        # Sum the scores of each chunk over the query terms
+        chunk_rows, inverse = np.unique(np.concatenate(rows), return_inverse=True)
+        totals = np.bincount(inverse, weights=np.concatenate(scores))
+        k = min(k, len(chunk_rows))
+        top = np.argpartition(-totals, k - 1)[:k] if k < len(chunk_rows) else np.arange(len(chunk_rows))
+        top = top[np.argsort(-totals[top])]
+        return [(self._ids[chunk_rows[i]].decode("utf-8"), float(totals[i])) for i in top]
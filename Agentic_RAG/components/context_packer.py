@@ -0,0 +1,210 @@
+import logging
+from typing import Callable, Dict, List, Optional
+from langchain_core.documents import Document
+from core.config import CONTEXT_TOKEN_BUDGET
+
+logger = logging.getLogger(__name__)
+
+# Chunks from the same source whose offsets are at most this many characters
+# apart (the whitespace stripped at chunk boundaries) are treated as adjacent
+_MAX_GAP = 2
+
+# Shortest shared text accepted as an overlap for chunks without offsets
+_MIN_TEXT_OVERLAP = 20
+
+class _Span:
+    """Contiguous text of one source assembled from one or more chunks."""
+    
+    def __init__(self, document: Document, rank: int):
+        self.source = document.metadata.get("source", "")
+        self.start = document.metadata.get("start_index")
+        self.text = document.page_content
+        self.rank = rank
+        self.chunk_ids = [document.metadata.get("chunk_id")]
+        
+    @property
+    def end(self) -> Optional[int]:
+        return None if self.start is None else self.start + len(self.text)
+        
+    def merge(self, other: "_Span") -> bool:
+        """
+        Join a span that overlaps or touches this one.
+        
+        Args:
+            other: Span of the same source
+            
+        Returns:
+            True if the spans were contiguous and have been merged
+        """
+        if self.start is not None and other.start is not None:
+            first, second = (self, other) if self.start <= other.start else (other, self)
+            gap = second.start - first.end
+            if gap > _MAX_GAP:
+                return False
+                
+            text = first.text
+            if second.end > first.end:
+                text += " " * max(gap, 0) + second.text[max(-gap, 0):]
+            self.text, self.start = text, first.start
+        else:
+            # Without offsets the order of the two chunks is unknown
+            overlap = _text_overlap(self.text, other.text)
+            if overlap is not None:
+                self.text += other.text[overlap:]
+            else:
+                overlap = _text_overlap(other.text, self.text)
+                if overlap is None:
+                    return False
+                self.text = other.text + self.text[overlap:]
+                self.start = None
+            
+        self.rank = min(self.rank, other.rank)
+        self.chunk_ids.extend(other.chunk_ids)
+        return True
+
+def _text_overlap(first: str, second: str) -> Optional[int]:
+    """
+    Find how much of the start of second repeats the end of first.
+    
+    Args:
+        first: Preceding text
+        second: Following text
+        
+    Returns:
+        Length of the shared text, len(second) if second is contained in
+        first, or None if the texts do not overlap
+    """
+    if second in first:
+        return len(second)
+        
+    for size in range(min(len(first), len(second)) - 1, _MIN_TEXT_OVERLAP - 1, -1):
+        if first.endswith(second[:size]):
+            return size
+            
+    return None
+
+class ContextPacker:
+    """
+    Pack retrieved chunks into a compact, token-budgeted context.
+    
+    Neighbouring chunks of the same source share up to chunk_overlap tokens.
+    The packer stitches chunks that overlap or touch into contiguous spans
+    (using the start_index recorded by the splitter, or the shared text for
+    chunks indexed without it), drops duplicates, and then adds spans in
+    relevance order, a span ranking as high as its best chunk, until the
+    token budget is used up.
+    """
+    
+    def __init__(self, token_budget: int = CONTEXT_TOKEN_BUDGET,
+                 count_tokens: Optional[Callable[[str], int]] = None):
+        """
+        Initialize the context packer.
+        
+        Args:
+            token_budget: Maximum number of tokens in the packed context
+            count_tokens: Callable counting the tokens of a text; defaults to tiktoken
+        """
+        self.token_budget = token_budget
+        self._count_tokens = count_tokens
+        
+    def count_tokens(self, text: str) -> int:
+        """
+        Count the tokens of a text.
+        
+        Args:
+            text: Text to measure
+            
+        Returns:
+            Number of tokens
+        """
+        if self._count_tokens is None:
+            try:
+                import tiktoken
+                encoding = tiktoken.get_encoding("cl100k_base")
+                self._count_tokens = lambda text: len(encoding.encode(text, disallowed_special=()))
+            except Exception as e:
+                logger.warning(f"Could not load tiktoken encoding, estimating tokens from characters: {e}")
+                self._count_tokens = lambda text: (len(text) + 3) // 4
+                
+        return self._count_tokens(text)
+        
+    def pack(self, documents: List[Document]) -> List[Document]:
+        """
+        Merge, deduplicate and budget retrieved chunks.
+        
+        Args:
+            documents: Retrieved chunks, most relevant first
+            
+        Returns:
+            Packed spans, most relevant first, each with the IDs of the chunks it covers
+        """
+        # Group the distinct chunks by source, keeping their relevance rank
+        by_source: Dict[str, List[_Span]] = {}
+        seen = set()
+        for rank, document in enumerate(documents):
+            key = document.metadata.get("chunk_id") or document.page_content
+            if key in seen:
+                continue
+            seen.add(key)
+            span = _Span(document, rank)
+            by_source.setdefault(span.source, []).append(span)
+            
+        # Stitch the chunks of each source into contiguous spans
+        spans: List[_Span] = []
+        for source_spans in by_source.values():
+            if all(span.start is not None for span in source_spans):
+                source_spans.sort(key=lambda span: span.start)
+                
+            merged: List[_Span] = []
+            for span in source_spans:
+                # A span grown by a merge may now bridge to another one
+                while True:
+                    target = next((existing for existing in merged if existing.merge(span)), None)
+                    if target is None:
+                        merged.append(span)
+                        break
+                    merged.remove(target)
+                    span = target
+            spans.extend(merged)
+            
+        # Fill the budget in relevance order
+        packed = []
+        used = 0
+        for span in sorted(spans, key=lambda span: span.rank):
+            tokens = self.count_tokens(span.text)
+            if used + tokens > self.token_budget:
+                continue
+            used += tokens
+            packed.append(Document(
+                page_content=span.text,
+                metadata={"source": span.source, "start_index": span.start, "chunk_ids": span.chunk_ids},
+            ))
+            
+        # Never return an empty context, cut the most relevant span to the budget instead
+        if not packed and spans:
+            best = min(spans, key=lambda span: span.rank)
+            text = best.text[:len(best.text) * self.token_budget // max(self.count_tokens(best.text), 1)]
+            packed.append(Document(
+                page_content=text,
+                metadata={"source": best.source, "start_index": best.start, "chunk_ids": best.chunk_ids},
+            ))
+            
+        if len(packed) < len(spans):
+            logger.info(f"Context budget of {self.token_budget} tokens kept {len(packed)} of {len(spans)} spans")
+            
+        return packed
+        
+    def pack_text(self, documents: List[Document]) -> str:
+        """
+        Pack retrieved chunks into a single context string.
+        
+        Args:
+            documents: Retrieved chunks, most relevant first
+            
+        Returns:
+            Packed spans separated by blank lines
+        """
+        return "\n\n".join(document.page_content for document in self.pack(documents))
+
+# Packer shared by the retriever tool and the generate node
+context_packer = ContextPacker()
@@ -1,28 +1,222 @@
-from typing import List, Optional
+from typing import Dict, Iterator, List, NamedTuple, Optional
 import logging
-from langchain_community.document_loaders import WebBaseLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from core.config import CHUNK_SIZE, CHUNK_OVERLAP
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter, TextSplitter
+from core.config import CHUNK_SIZE, CHUNK_OVERLAP, FETCH_MAX_WORKERS, FETCH_PER_HOST_LIMIT, FETCH_TIMEOUT
 
 logger = logging.getLogger(__name__)
 
+USER_AGENT = "Mozilla/5.0 (compatible; AgenticRAG/1.0)"
+
+class FetchedPage(NamedTuple):
+    """Result of fetching a single URL."""
+    url: str
+    documents: List[Document]
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    not_modified: bool = False  # The server answered 304, documents is empty
+
 class DocumentLoader:
     """Document loader for retrieving and splitting web documents."""
     
-    def __init__(self, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP):
+    def __init__(self,
+                 chunk_size: int = CHUNK_SIZE,
+                 chunk_overlap: int = CHUNK_OVERLAP,
+                 max_workers: int = FETCH_MAX_WORKERS,
+                 per_host_limit: int = FETCH_PER_HOST_LIMIT,
+                 timeout: float = FETCH_TIMEOUT,
+                 text_splitter: Optional[TextSplitter] = None):
         """
         Initialize the document loader.
         
         Args:
             chunk_size: Size of document chunks
             chunk_overlap: Overlap between document chunks
+            max_workers: Maximum number of URLs fetched concurrently
+            per_host_limit: Maximum number of concurrent requests to a single host
+            timeout: Seconds allowed for fetching each URL, connecting and reading
+                the whole body included
+            text_splitter: Splitter to use instead of the tiktoken-based one built
+                from chunk_size and chunk_overlap on first use
         """
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-        self.text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
-            chunk_size=self.chunk_size, 
-            chunk_overlap=self.chunk_overlap
-        )
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self._text_splitter = text_splitter
+        self.session = self._create_session()
+        self._host_limits: Dict[str, threading.BoundedSemaphore] = {}
+        self._host_limits_lock = threading.Lock()
+        
+    @property
+    def text_splitter(self) -> TextSplitter:
+        """
+        Get the splitter of the loader.
+        
+        The default tiktoken-based splitter is built on first use, since
+        loading its encoding may need a download, which fetching alone
+        should not.
+        """
+        if self._text_splitter is None:
+            # Record each chunk's offset in its page so overlapping chunks can be merged
+            self._text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+                chunk_size=self.chunk_size,
+                chunk_overlap=self.chunk_overlap,
+                add_start_index=True
+            )
+        return self._text_splitter
+        
+    def _create_session(self) -> requests.Session:
+        """
+        Create the keep-alive session shared by all fetches.
+        
+        Returns:
+            Session with a connection pool sized for the worker pool
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update({"User-Agent": USER_AGENT})
+        return session
+        
+    def _host_limit(self, url: str) -> threading.BoundedSemaphore:
+        """
+        Get the semaphore bounding concurrent requests to the host of a URL.
+        
+        Args:
+            url: URL about to be fetched
+            
+        Returns:
+            Semaphore shared by all URLs of the same host
+        """
+        host = urlparse(url).netloc
+        with self._host_limits_lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_limits[host]
+            
+    def fetch_url(self, url: str, validators: Optional[Dict[str, Optional[str]]] = None) -> FetchedPage:
+        """
+        Fetch a single URL and extract its text.
+        
+        Args:
+            url: URL to fetch
+            validators: Optional "etag" and "last_modified" of a previous fetch,
+                sent as a conditional request
+            
+        Returns:
+            Fetched page with the document extracted from it
+        """
+        headers = {}
+        if validators:
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+                
+        # The socket timeout bounds each read; the deadline bounds the whole fetch,
+        # so a server trickling its response cannot hold a worker indefinitely
+        deadline = time.monotonic() + self.timeout
+        with self._host_limit(url):
+            with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+                if response.status_code == 304:
+                    return FetchedPage(url, [], etag or validators.get("etag"),
+                                       last_modified or validators.get("last_modified"), not_modified=True)
+                    
+                response.raise_for_status()
+                # read1 returns after a single socket read, so the deadline is checked
+                # however slowly the body arrives (urllib3 < 2.3 only has read)
+                read = getattr(response.raw, "read1", response.raw.read)
+                body = bytearray()
+                while block := read(64 * 1024, decode_content=True):
+                    body += block
+                    if time.monotonic() > deadline:
+                        raise requests.Timeout(f"Fetching {url} took longer than {self.timeout}s")
+                        
+        # Decoded like response.apparent_encoding would, from the content itself
+        soup = BeautifulSoup(bytes(body), "html.parser")
+        
+        # Same metadata as langchain's WebBaseLoader
+        metadata = {"source": url}
+        if title := soup.find("title"):
+            metadata["title"] = title.get_text()
+        if description := soup.find("meta", attrs={"name": "description"}):
+            metadata["description"] = description.get("content", "No description found.")
+        if html := soup.find("html"):
+            metadata["language"] = html.get("lang", "No language found.")
+            
+        return FetchedPage(url, [Document(page_content=soup.get_text(), metadata=metadata)], etag, last_modified)
+        
+    def iter_fetch(self, urls: List[str],
+                   validators: Optional[Dict[str, Dict[str, Optional[str]]]] = None) -> Iterator[FetchedPage]:
+        """
+        Fetch URLs concurrently, yielding each page as soon as it is loaded.
+        
+        At most twice the worker count of pages are in flight or waiting to be
+        consumed, so a slow consumer holds back fetching instead of letting
+        loaded pages pile up in memory. A URL that fails or times out is
+        logged and skipped without affecting the rest of the batch.
+        
+        Args:
+            urls: List of URLs to fetch
+            validators: Optional validators of previous fetches, keyed by URL
+            
+        Returns:
+            Generator of fetched pages in completion order
+        """
+        if not urls:
+            return
+            
+        validators = validators or {}
+        workers = min(self.max_workers, len(urls))
+        remaining = iter(urls)
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = {}
+            
+            def submit_next():
+                url = next(remaining, None)
+                if url is not None:
+                    pending[executor.submit(self.fetch_url, url, validators.get(url))] = url
+                    
+            for _ in range(workers * 2):
+                submit_next()
+                
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = pending.pop(future)
+                    submit_next()
+                    try:
+                        page = future.result()
+                    except Exception as e:
+                        logger.warning(f"Error loading {url}: {e}")
+                        continue
+                    yield page
+                    
+    def fetch_urls(self, urls: List[str]) -> List[Document]:
+        """
+        Fetch URLs concurrently without splitting them.
+        
+        Args:
+            urls: List of URLs to fetch
+            
+        Returns:
+            List of loaded documents, in the order of the URLs
+        """
+        loaded = {page.url: page.documents for page in self.iter_fetch(urls)}
+        return [doc for url in urls for doc in loaded.get(url, [])]
         
     def load_from_urls(self, urls: List[str]) -> List:
         """
@@ -36,19 +230,27 @@ class DocumentLoader:
         """
         logger.info(f"Loading documents from {len(urls)} URLs...")
         
-        try:
-            # Load documents from URLs
-            docs = [WebBaseLoader(url).load() for url in urls]
-            # Flatten the list of lists
-            docs_list = [item for sublist in docs for item in sublist]
-            logger.info(f"Loaded {len(docs_list)} documents")
-            
-            # Split documents
-            return self.split_documents(docs_list)
+        docs_list = self.fetch_urls(urls)
+        logger.info(f"Loaded {len(docs_list)} documents")
+        
+        # Split documents
+        return self.split_documents(docs_list)
+        
+    def iter_load(self, urls: List[str]) -> Iterator[Document]:
+        """
+        Stream the chunks of a list of URLs while they are being fetched.
+        
+        Each page is split as soon as it arrives, so chunks of early pages are
+        available before slow pages have finished loading.
+        
+        Args:
+            urls: List of URLs to load documents from
             
-        except Exception as e:
-            logger.error(f"Error loading documents: {e}")
-            return []
+        Returns:
+            Generator of document chunks
+        """
+        for page in self.iter_fetch(urls):
+            yield from self.split_documents(page.documents)
             
     def split_documents(self, documents: List) -> List:
         """
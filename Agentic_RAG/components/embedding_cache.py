@@ -0,0 +1,244 @@
+import atexit
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+# SQLite limits the number of bound parameters per statement
+_SQL_BATCH_SIZE = 500
+
+class EmbeddingCache:
+    """
+    SQLite-backed key/vector store with a size cap and LRU eviction.
+    
+    Vectors are stored as float32 blobs. Recency is tracked with a logical
+    clock so that eviction removes the least recently used entries first.
+    Lookups only read: the recency of the entries they hit is kept in memory
+    and written in batches, with the next insert, once flush_size entries
+    are pending or after flush_interval seconds, so cache hits do not each
+    cost a write transaction; pending updates are also written at exit.
+    
+    Several processes may share the database file: each insert re-reads the
+    entry count and the highest recency under the write lock, so eviction
+    and the logical clock account for the entries other processes wrote.
+    """
+    
+    def __init__(self, path: str, max_entries: int, flush_size: int = 1000, flush_interval: float = 30.0):
+        """
+        Initialize the embedding cache.
+        
+        Args:
+            path: Path of the SQLite database file, or ":memory:"
+            max_entries: Maximum number of vectors kept in the cache
+            flush_size: Number of pending recency updates that triggers a write
+            flush_interval: Maximum seconds recency updates stay pending while lookups hit
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._touched: Dict[str, int] = {}  # key -> clock of its latest hit, not written yet
+        self._flushed_at = time.monotonic()
+        
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, accessed_at INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_accessed_at ON embeddings (accessed_at)")
+        self._conn.commit()
+        
+        self._size, clock = self._conn.execute("SELECT COUNT(*), MAX(accessed_at) FROM embeddings").fetchone()
+        self._clock = clock or 0
+        logger.info(f"Opened embedding cache at {path} with {self._size} entries")
+        atexit.register(self.flush)
+        
+    def get_many(self, keys: List[str]) -> List[Optional[List[float]]]:
+        """
+        Look up vectors by key, marking the found entries as recently used.
+        
+        Args:
+            keys: Cache keys
+            
+        Returns:
+            Vectors in the order of the keys, None for keys that are not cached
+        """
+        found = {}
+        with self._lock:
+            unique_keys = list(dict.fromkeys(keys))
+            for start in range(0, len(unique_keys), _SQL_BATCH_SIZE):
+                batch = unique_keys[start:start + _SQL_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+                    
+            if found:
+                self._clock += 1
+                for key in found:
+                    self._touched[key] = self._clock
+                if (len(self._touched) >= self.flush_size
+                        or time.monotonic() - self._flushed_at >= self.flush_interval):
+                    self._write_touched()
+                    self._conn.commit()
+                    
+            results = [found.get(key) for key in keys]
+            hits = sum(1 for vector in results if vector is not None)
+            self.hits += hits
+            self.misses += len(keys) - hits
+            
+        return results
+        
+    def set_many(self, items: List[Tuple[str, List[float]]]):
+        """
+        Store vectors, evicting the least recently used entries beyond the cap.
+        
+        Args:
+            items: (key, vector) pairs to store
+        """
+        if not items:
+            return
+            
+        with self._lock:
+            # Hold the write lock from here on, so the count and clock read below
+            # stay current when other processes share the file
+            if not self._conn.in_transaction:
+                self._conn.execute("BEGIN IMMEDIATE")
+                
+            # Eviction must see the recency of recent hits
+            self._write_touched()
+            size, clock = self._conn.execute("SELECT COUNT(*), MAX(accessed_at) FROM embeddings").fetchone()
+            self._clock = max(self._clock, clock or 0) + 1
+            cursor = self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, accessed_at) VALUES (?, ?, ?)",
+                [(key, array("f", vector).tobytes(), self._clock) for key, vector in items],
+            )
+            self._size = size + max(cursor.rowcount, 0)
+            
+            overflow = self._size - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY accessed_at LIMIT ?)",
+                    (overflow,),
+                )
+                self._size -= overflow
+                self.evictions += overflow
+                
+            self._conn.commit()
+            
+    def flush(self):
+        """Write the pending recency updates of cache hits"""
+        with self._lock:
+            if self._touched:
+                self._write_touched()
+                self._conn.commit()
+                
+    def _write_touched(self):
+        """Write the pending recency updates in the current transaction; the caller commits"""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE embeddings SET accessed_at = ? WHERE key = ?",
+                [(clock, key) for key, clock in self._touched.items()],
+            )
+            self._touched.clear()
+        self._flushed_at = time.monotonic()
+        
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters.
+        
+        Returns:
+            Dictionary with hits, misses, hit rate, size and evictions
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": self._size,
+                "max_entries": self.max_entries,
+                "evictions": self.evictions,
+            }
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that memoizes vectors by (model, text hash)."""
+    
+    def __init__(self, underlying: Embeddings, cache: EmbeddingCache, model: str):
+        """
+        Initialize the cached embeddings.
+        
+        Args:
+            underlying: Embeddings used to compute vectors on a cache miss
+            cache: Cache to read and write vectors
+            model: Name of the embedding model, part of every cache key
+        """
+        self.underlying = underlying
+        self.cache = cache
+        self.model = model
+        
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\x00{text}".encode("utf-8")).hexdigest()
+        
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed documents, only calling the underlying model for uncached texts.
+        
+        Args:
+            texts: Texts to embed
+            
+        Returns:
+            List of embeddings
+        """
+        keys = [self._key(text) for text in texts]
+        vectors = self.cache.get_many(keys)
+        
+        # Embed every missing text once, even if it occurs several times
+        missing = {}
+        for key, text, vector in zip(keys, texts, vectors):
+            if vector is None:
+                missing.setdefault(key, text)
+                
+        if missing:
+            fresh = dict(zip(missing, self.underlying.embed_documents(list(missing.values()))))
+            self.cache.set_many(list(fresh.items()))
+            vectors = [vector if vector is not None else fresh[key] for key, vector in zip(keys, vectors)]
+            
+        return vectors
+        
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embed a query, only calling the underlying model if it is uncached.
+        
+        Args:
+            text: Query text
+            
+        Returns:
+            Embedding
+        """
+        key = self._key(text)
+        vector = self.cache.get_many([key])[0]
+        
+        if vector is None:
+            vector = self.underlying.embed_query(text)
+            self.cache.set_many([(key, vector)])
+            
+        return vector
\ No newline at end of file
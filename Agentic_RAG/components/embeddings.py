@@ -1,43 +1,110 @@
 import logging
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from langchain_core.embeddings import Embeddings
 from langchain_openai import OpenAIEmbeddings
-from core.config import OPENAI_API_KEY
+from components.embedding_cache import EmbeddingCache, CachedEmbeddings
+from core.config import OPENAI_API_KEY, EMBEDDING_MODEL, EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES
 
 logger = logging.getLogger(__name__)
 
 class EmbeddingManager:
     """Manager for embeddings operations."""
     
-    def __init__(self, api_key: str = OPENAI_API_KEY, model: str = None):
+    def __init__(self,
+                 api_key: str = OPENAI_API_KEY,
+                 model: str = EMBEDDING_MODEL,
+                 cache_path: Optional[str] = EMBEDDING_CACHE_PATH,
+                 cache_max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES,
+                 embeddings: Optional[Embeddings] = None):
         """
         Initialize the embeddings manager.
         
         Args:
             api_key: OpenAI API key
             model: OpenAI embedding model to use
+            cache_path: Path of the embedding cache database, or None to disable caching
+            cache_max_entries: Maximum number of cached vectors
+            embeddings: Embeddings to use instead of OpenAI, e.g. a local stand-in for benchmarks
         """
         self.api_key = api_key
         self.model = model
+        self.cache_path = cache_path or None
+        self.cache_max_entries = cache_max_entries
+        self._base_embeddings = embeddings
         self._embeddings = None
+        self._cache = None
         
     @property
     def embeddings(self):
         """
         Get or create OpenAI embeddings instance.
         
+        Embeddings passed to the constructor are used instead of OpenAI. When
+        caching is enabled the instance is wrapped so that every text is only
+        sent to the embedding API once.
+        
         Returns:
-            OpenAIEmbeddings instance
+            Embeddings instance, or CachedEmbeddings wrapping it
         """
         if self._embeddings is None:
-            logger.info("Initializing OpenAI embeddings")
-            
-            if self.model:
-                self._embeddings = OpenAIEmbeddings(
-                    openai_api_key=self.api_key,
-                    model=self.model
-                )
+            if self._base_embeddings is not None:
+                self._embeddings = self._base_embeddings
             else:
-                self._embeddings = OpenAIEmbeddings(
-                    openai_api_key=self.api_key
+                logger.info("Initializing OpenAI embeddings")
+                
+                if self.model:
+                    self._embeddings = OpenAIEmbeddings(
+                        openai_api_key=self.api_key,
+                        model=self.model
+                    )
+                else:
+                    self._embeddings = OpenAIEmbeddings(
+                        openai_api_key=self.api_key
+                    )
+                    
+            if self.cache_path:
+                self._cache = EmbeddingCache(self.cache_path, self.cache_max_entries)
+                self._embeddings = CachedEmbeddings(
+                    self._embeddings,
+                    self._cache,
+                    self.model or self._embeddings.model,
                 )
                 
-        return self._embeddings
\ No newline at end of file
+        return self._embeddings
+        
+    @property
+    def model_name(self) -> str:
+        """
+        Get the name of the embedding model in use.
+        
+        Returns:
+            Embedding model name
+        """
+        return self.model or self.embeddings.model
+        
+        
+    def embed_batches(self, batches: Iterable[List]) -> Iterator[Tuple[List, List[List[float]]]]:
+        """
+        Embed a stream of document batches, one embedding request per batch.
+        
+        Args:
+            batches: Iterable of document lists
+            
+        Returns:
+            Generator of (documents, vectors) pairs
+        """
+        for documents in batches:
+            yield documents, self.embeddings.embed_documents([doc.page_content for doc in documents])
+            
+    @property
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        Get hit/miss counters of the embedding cache.
+        
+        Returns:
+            Cache statistics, or None if caching is disabled or not yet in use
+        """
+        if self._cache is None:
+            return None
+            
+        return self._cache.stats()
\ No newline at end of file
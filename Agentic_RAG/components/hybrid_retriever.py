@@ -0,0 +1,70 @@
+import logging
+from typing import Any, Dict, List, Sequence
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from core.config import RETRIEVAL_K, RETRIEVAL_FETCH_K, RRF_K
+
+logger = logging.getLogger(__name__)
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = RRF_K) -> List[str]:
+    """
+    Merge rankings with reciprocal rank fusion.
+    
+    Each item scores the sum of 1 / (k + rank) over the rankings it appears
+    in, so items ranked well by several retrievers rise to the top without
+    having to calibrate their scores against each other.
+    
+    Args:
+        rankings: Lists of item IDs, best first
+        k: Damping constant; larger values flatten the contribution of top ranks
+        
+    Returns:
+        Item IDs ordered by fused score, best first
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+            
+    return sorted(scores, key=scores.get, reverse=True)
+
+class HybridRetriever(BaseRetriever):
+    """
+    Retriever combining dense vector search with BM25 keyword search.
+    
+    "hybrid" fuses both rankings with reciprocal rank fusion, so exact terms
+    such as paper or attack names are found even when their embedding is not
+    close to the query; "keyword" uses BM25 only and "vector" dense search only.
+    """
+    
+    vector_store_manager: Any
+    mode: str = "hybrid"
+    k: int = RETRIEVAL_K
+    fetch_k: int = RETRIEVAL_FETCH_K
+    rrf_k: int = RRF_K
+    
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        manager = self.vector_store_manager
+        documents: Dict[str, Document] = {}
+        rankings = []
+        
+        if self.mode != "keyword":
+            ranking = []
+            for document in manager.similarity_search(query, self.fetch_k):
+                chunk_id = document.metadata.get("chunk_id", document.page_content)
+                documents.setdefault(chunk_id, document)
+                ranking.append(chunk_id)
+            rankings.append(ranking)
+            
+        if self.mode != "vector":
+            rankings.append([chunk_id for chunk_id, _ in manager.keyword_index.search(query, self.fetch_k)])
+            
+        top_ids = reciprocal_rank_fusion(rankings, self.rrf_k)[:self.k]
+        
+        # Chunks only found by keyword search are loaded from the vector store
+        missing = [chunk_id for chunk_id in top_ids if chunk_id not in documents]
+        if missing:
+            documents.update(manager.get_documents(missing))
+            
+        return [documents[chunk_id] for chunk_id in top_ids if chunk_id in documents]
@@ -0,0 +1,113 @@
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+class IndexManifest:
+    """
+    Record of which sources are indexed and what they contributed.
+    
+    For every source URL the manifest keeps the HTTP validators (ETag and
+    Last-Modified), a hash of the page content, the chunking configuration
+    and the IDs of the chunks the page was split into. This lets a re-index
+    skip unchanged pages and delete exactly the chunks a page no longer has.
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initialize the manifest.
+        
+        Args:
+            path: JSON file the manifest is persisted to, or None to keep it in memory
+        """
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.is_new = True
+        
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f).get("sources", {})
+                self.is_new = False
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable index manifest {path}: {e}")
+                
+    @property
+    def sources(self) -> List[str]:
+        """
+        Get the indexed source URLs.
+        
+        Returns:
+            List of source URLs
+        """
+        return list(self.entries)
+        
+    def get(self, source: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the entry of a source.
+        
+        Args:
+            source: Source URL
+            
+        Returns:
+            Manifest entry, or None if the source is not indexed
+        """
+        return self.entries.get(source)
+        
+    def set(self, source: str, chunk_ids: List[str], config: str,
+            content_hash: Optional[str] = None, etag: Optional[str] = None,
+            last_modified: Optional[str] = None):
+        """
+        Record the indexed state of a source.
+        
+        Args:
+            source: Source URL
+            chunk_ids: IDs of the chunks the source was split into
+            config: Digest of the chunking configuration and embedding model
+            content_hash: Hash of the page content
+            etag: ETag returned by the server
+            last_modified: Last-Modified returned by the server
+        """
+        self.entries[source] = {
+            "chunk_ids": chunk_ids,
+            "config": config,
+            "content_hash": content_hash,
+            "etag": etag,
+            "last_modified": last_modified,
+        }
+        
+    def remove(self, source: str):
+        """
+        Forget a source.
+        
+        Args:
+            source: Source URL
+        """
+        self.entries.pop(source, None)
+        
+    def clear(self):
+        """Forget all sources."""
+        self.entries = {}
+        
+    def referenced_ids(self) -> Set[str]:
+        """
+        Get the IDs of all chunks referenced by at least one source.
+        
+        Returns:
+            Set of chunk IDs
+        """
+        return {chunk_id for entry in self.entries.values() for chunk_id in entry["chunk_ids"]}
+        
+    def save(self):
+        """Write the manifest to disk, replacing the previous file atomically."""
+        self.is_new = False
+        if not self.path:
+            return
+            
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"sources": self.entries}, f)
+        os.replace(tmp_path, self.path)
\ No newline at end of file
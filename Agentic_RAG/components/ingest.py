@@ -0,0 +1,90 @@
+import queue
+import threading
+from typing import Iterable, Iterator, List, TypeVar
+
+T = TypeVar("T")
+
+_DONE = object()
+
+class _Failure:
+    """Exception raised by a background stage, re-raised in the consumer."""
+    
+    def __init__(self, error: BaseException):
+        self.error = error
+
+def batched(iterable: Iterable[T], size: int) -> Iterator[List[T]]:
+    """
+    Group items into lists of a fixed size; the last list may be shorter.
+    
+    Args:
+        iterable: Items to group
+        size: Number of items per batch
+        
+    Returns:
+        Generator of batches
+    """
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def run_in_background(iterable: Iterable[T], max_pending: int) -> Iterator[T]:
+    """
+    Drive an iterable on a background thread, buffering at most max_pending items.
+    
+    This turns a chain of generators into overlapping pipeline stages: the
+    producer runs ahead of the consumer, but blocks once max_pending items
+    are waiting, which bounds memory (backpressure). Exceptions raised by the
+    producer are re-raised in the consumer; closing the returned generator
+    stops the producer and closes the iterable.
+    
+    Args:
+        iterable: Upstream stage
+        max_pending: Maximum number of items buffered between the stages
+        
+    Returns:
+        Generator yielding the items of the iterable
+    """
+    items = queue.Queue(maxsize=max_pending)
+    stop = threading.Event()
+    
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+        
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    break
+        except BaseException as e:
+            put(_Failure(e))
+        finally:
+            close = getattr(iterable, "close", None)
+            if close is not None:
+                close()
+            put(_DONE)
+            
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                break
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        producer.join()
\ No newline at end of file
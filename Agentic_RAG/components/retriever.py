@@ -1,32 +1,48 @@
 import logging
+import time
 from typing import List, Optional
-from langchain.tools.retriever import create_retriever_tool
+from langchain_core.tools import Tool
+from pydantic import BaseModel, Field
+from components.context_packer import ContextPacker, context_packer
+from components.hybrid_retriever import HybridRetriever
 from components.vectorstore import VectorStoreManager
+from core.config import RETRIEVAL_MODE
+from core.metrics import retrieval_duration, retrieved_chunks
 
 logger = logging.getLogger(__name__)
 
+class RetrieverInput(BaseModel):
+    """Input to the retriever tool."""
+    query: str = Field(description="query to look up in retriever")
+
 class RetrieverToolFactory:
     """Factory for creating retriever tools."""
     
-    def __init__(self, vector_store_manager: Optional[VectorStoreManager] = None):
+    def __init__(self, vector_store_manager: Optional[VectorStoreManager] = None,
+                 packer: Optional[ContextPacker] = None):
         """
         Initialize the retriever tool factory.
         
         Args:
             vector_store_manager: Vector store manager to use
+            packer: Context packer turning retrieved chunks into the tool output
         """
         self.vector_store_manager = vector_store_manager or VectorStoreManager()
+        self.packer = packer or context_packer
         self._tools = []
         
     def create_retriever_tool(self, 
                              name: str = "retrieve_blog_posts", 
-                             description: str = "Search and return information about Lilian Weng blog posts on LLM agents, prompt engineering, and adversarial attacks on LLMs."):
+                             description: str = "Search and return information about Lilian Weng blog posts on LLM agents, prompt engineering, and adversarial attacks on LLMs.",
+                             mode: str = RETRIEVAL_MODE):
         """
         Create a retriever tool.
         
         Args:
             name: Name of the retriever tool
             description: Description of the retriever tool
+            mode: Retrieval mode, "hybrid" (BM25 and vector search fused),
+                "vector" or "keyword"
             
         Returns:
             Retriever tool
@@ -35,12 +51,33 @@ class RetrieverToolFactory:
             logger.warning("Retriever not available, cannot create retriever tool")
             return None
             
-        logger.info(f"Creating retriever tool: {name}")
+        logger.info(f"Creating retriever tool: {name} ({mode} retrieval)")
+        
+        if mode == "vector":
+            retriever = self.vector_store_manager.retriever
+        else:
+            retriever = HybridRetriever(vector_store_manager=self.vector_store_manager, mode=mode)
         
-        retriever_tool = create_retriever_tool(
-            self.vector_store_manager.retriever,
-            name,
-            description,
+        packer = self.packer
+        
+        def retrieve(query: str, callbacks=None):
+            start = time.perf_counter()
+            documents = retriever.invoke(query, config={"callbacks": callbacks})
+            context = packer.pack_text(documents)
+            retrieval_duration.observe(time.perf_counter() - start, mode=mode)
+            retrieved_chunks.observe(len(documents), mode=mode)
+            return context, documents
+            
+        # The tool output is the packed context (overlapping chunks merged,
+        # duplicates dropped, fitted to the token budget). The retrieved chunks
+        # travel with the tool message as its artifact, so callers know which
+        # chunks an answer was generated from
+        retriever_tool = Tool(
+            name=name,
+            description=description,
+            func=retrieve,
+            args_schema=RetrieverInput,
+            response_format="content_and_artifact",
         )
         
         # Add to tools list
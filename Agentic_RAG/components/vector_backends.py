@@ -0,0 +1,686 @@
+import json
+import logging
+import mmap
+import os
+import shutil
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
+from numpy.lib.format import open_memmap
+from components.bm25 import BM25ArrayWriter, MmapBM25Index
+
+logger = logging.getLogger(__name__)
+
+class VectorBackend(ABC):
+    """
+    Storage and nearest-neighbour search of chunk vectors.
+    
+    A backend keeps each chunk's vector together with its text and metadata
+    under the chunk ID. Scores returned by search are higher for closer
+    vectors; they are only comparable within one backend.
+    """
+    
+    read_only = False
+    
+    @abstractmethod
+    def load(self):
+        """Open the stored index, or start an empty one if there is none"""
+        
+    @abstractmethod
+    def add(self, ids: List[str], vectors: List[List[float]], texts: List[str],
+            metadatas: List[Dict[str, Any]]):
+        """Insert chunks, replacing chunks with the same ID"""
+        
+    @abstractmethod
+    def delete(self, ids: List[str]):
+        """Remove chunks; unknown IDs are ignored"""
+        
+    @abstractmethod
+    def search(self, vector: List[float], k: int) -> List[Tuple[Document, float]]:
+        """Get the k chunks closest to a query vector with their scores, best first"""
+        
+    @abstractmethod
+    def get(self, ids: Optional[List[str]] = None, include_text: bool = True,
+            limit: Optional[int] = None, offset: int = 0) -> Dict[str, List]:
+        """
+        Read stored chunks.
+        
+        Args:
+            ids: IDs to read (unknown ones are skipped), or None for all chunks
+            include_text: Whether to return texts and metadata or only IDs
+            limit: Maximum number of chunks when reading all chunks
+            offset: Number of chunks to skip when reading all chunks
+            
+        Returns:
+            Dictionary with "ids", "documents" and "metadatas" lists, the
+            latter two empty without include_text
+        """
+        
+    @abstractmethod
+    def get_vectors(self, ids: List[str]) -> np.ndarray:
+        """Read the vectors of stored chunks as float32 rows, in the order of ids"""
+        
+    @property
+    @abstractmethod
+    def count(self) -> int:
+        """Number of stored chunks"""
+        
+    def persist(self):
+        """Write pending changes to disk; a no-op for backends that persist on write"""
+        
+    @property
+    def nbytes(self) -> Optional[int]:
+        """Memory allocated for the vectors, including unused capacity, or None if the backend cannot tell"""
+        return None
+        
+    @property
+    def keyword_index(self):
+        """Keyword index stored with the vectors, or None to build one from the chunk texts"""
+        return None
+
+class ReadOnlyIndexError(RuntimeError):
+    """Raised when writing to an index that is opened read-only."""
+
+class ChromaBackend(VectorBackend):
+    """Chroma collection, persisted by Chroma itself on every write."""
+    
+    def __init__(self, collection_name: str, embeddings: Any, persist_directory: Optional[str] = None):
+        """
+        Initialize the backend.
+        
+        Args:
+            collection_name: Name of the Chroma collection
+            embeddings: Embedding function registered with the collection
+            persist_directory: Directory of the persistent client, or None to keep the collection in memory
+        """
+        self.collection_name = collection_name
+        self.embeddings = embeddings
+        self.persist_directory = persist_directory
+        self.store = None
+        
+    def load(self):
+        self.store = Chroma(
+            collection_name=self.collection_name,
+            embedding_function=self.embeddings,
+            persist_directory=self.persist_directory,
+        )
+        
+    def add(self, ids, vectors, texts, metadatas):
+        self.store._collection.upsert(ids=ids, embeddings=vectors, documents=texts, metadatas=metadatas)
+        
+    def delete(self, ids):
+        self.store.delete(ids=ids)
+        
+    def search(self, vector, k):
+        count = self.count
+        if not count:
+            return []
+            
+        result = self.store._collection.query(
+            query_embeddings=[vector],
+            n_results=min(k, count),
+            include=["documents", "metadatas", "distances"],
+        )
+        return [
+            (Document(page_content=text, metadata=metadata or {}), -distance)
+            for text, metadata, distance in zip(result["documents"][0], result["metadatas"][0], result["distances"][0])
+        ]
+        
+    def get(self, ids=None, include_text=True, limit=None, offset=0):
+        include = ["documents", "metadatas"] if include_text else []
+        if ids is not None:
+            result = self.store._collection.get(ids=ids, include=include)
+        else:
+            result = self.store._collection.get(include=include, limit=limit, offset=offset or None)
+        return {
+            "ids": result["ids"],
+            "documents": result.get("documents") or [],
+            "metadatas": [metadata or {} for metadata in result.get("metadatas") or []],
+        }
+        
+    def get_vectors(self, ids):
+        result = self.store._collection.get(ids=ids, include=["embeddings"])
+        vectors = dict(zip(result["ids"], result["embeddings"]))
+        return np.asarray([vectors[chunk_id] for chunk_id in ids], dtype=np.float32)
+        
+    @property
+    def count(self) -> int:
+        return self.store._collection.count()
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Scale the rows of a float32 matrix to unit length, leaving zero rows as they are"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def quantize(matrix: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Convert normalized float32 rows to a storage type.
+    
+    Args:
+        matrix: Normalized float32 rows
+        dtype: "float32", "float16" or "int8"
+        
+    Returns:
+        Converted rows, and for int8 the float32 scale of each row (None otherwise)
+    """
+    if dtype != "int8":
+        return matrix.astype(dtype), None
+        
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    return np.round(matrix / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+def top_k(vectors: np.ndarray, scales: Optional[np.ndarray], count: int, vector: List[float], k: int,
+          block_rows: int) -> Tuple[List[int], List[float]]:
+    """
+    Find the rows closest to a query vector by exhaustive inner product.
+    
+    Rows are scored block by block, so only block_rows rows are ever held as
+    float32, whatever the storage type; the matrix may be memory-mapped.
+    
+    Args:
+        vectors: Normalized rows in their storage type
+        scales: Per-row scales of int8 rows, or None
+        count: Number of rows in use
+        vector: Query vector
+        k: Number of rows to return
+        block_rows: Rows converted to float32 at a time
+        
+    Returns:
+        Row numbers and their cosine similarities, best first
+    """
+    if not count or k <= 0:
+        return [], []
+        
+    query = np.asarray(vector, dtype=np.float32)
+    query /= np.linalg.norm(query) or 1.0
+    
+    scores = np.empty(count, dtype=np.float32)
+    for start in range(0, count, block_rows):
+        end = min(start + block_rows, count)
+        block = vectors[start:end]
+        scores[start:end] = (block if block.dtype == np.float32 else block.astype(np.float32)) @ query
+    if scales is not None:
+        scores *= scales[:count]
+        
+    k = min(k, count)
+    top = np.argpartition(-scores, k - 1)[:k] if k < count else np.arange(count)
+    top = top[np.argsort(-scores[top])]
+    return top.tolist(), scores[top].tolist()
+
+class NumpyFlatBackend(VectorBackend):
+    """
+    Flat index of normalized vectors in one NumPy matrix, searched exhaustively.
+    
+    Vectors are stored as float16 (half the memory of float32) or as int8
+    with a float32 scale per row (a quarter, plus 4 bytes per chunk), and a
+    query is scored against all of them with matrix-vector products over
+    blocks of rows, so exact top-k needs no graph index. Rows are kept
+    contiguous: a deleted row is filled with the last one. The whole index,
+    texts and metadata included, is persisted to a single file on persist().
+    
+    Writes are serialized; searches run concurrently with each other and are
+    not meant to overlap with writes to the same index (re-indexing writes
+    to the inactive slot).
+    """
+    
+    DTYPES = ("float32", "float16", "int8")
+    
+    def __init__(self, collection_name: str, persist_directory: Optional[str] = None,
+                 dtype: str = "float16", block_rows: int = 4096):
+        """
+        Initialize the backend.
+        
+        Args:
+            collection_name: Name of the index; the file is <name>.npz in persist_directory
+            persist_directory: Directory of the index file, or None to keep the index in memory
+            dtype: Storage type of the vectors, "float32", "float16" or "int8"
+            block_rows: Rows converted to float32 at a time while searching
+        """
+        if dtype not in self.DTYPES:
+            raise ValueError(f"Unsupported vector dtype: {dtype}")
+            
+        self.collection_name = collection_name
+        self.dtype = dtype
+        self.block_rows = block_rows
+        self.path = os.path.join(persist_directory, f"{collection_name}.npz") if persist_directory else None
+        self._vectors: Optional[np.ndarray] = None  # capacity x dimensions, rows [0, count) in use
+        self._scales: Optional[np.ndarray] = None   # per-row dequantization factor for int8
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._texts: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._dirty = False
+        self._lock = threading.Lock()
+        
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+            
+        with np.load(self.path) as data:
+            vectors = data["vectors"]
+            scales = data["scales"] if "scales" in data else None
+            chunks = json.loads(data["chunks"].tobytes().decode("utf-8"))
+            
+        if vectors.dtype != np.dtype(self.dtype):
+            raise ValueError(f"{self.path} stores {vectors.dtype} vectors, expected {self.dtype}")
+            
+        with self._lock:
+            # An empty index is saved without dimensions, the first add sets them
+            self._vectors = vectors if len(vectors) else None
+            self._scales = scales if len(vectors) else None
+            self._ids = chunks["ids"]
+            self._texts = chunks["texts"]
+            self._metadatas = chunks["metadatas"]
+            self._rows = {chunk_id: row for row, chunk_id in enumerate(self._ids)}
+            self._dirty = False
+        logger.info(f"Loaded {len(self._ids)} {self.dtype} vectors from {self.path}")
+        
+    def _reserve(self, rows: int, dimensions: int):
+        """Grow the matrix to hold at least rows rows, doubling its capacity"""
+        if self._vectors is None:
+            capacity = max(rows, 1024)
+            self._vectors = np.zeros((capacity, dimensions), dtype=self.dtype)
+            if self.dtype == "int8":
+                self._scales = np.ones(capacity, dtype=np.float32)
+            return
+            
+        if self._vectors.shape[1] != dimensions:
+            raise ValueError(f"Expected {self._vectors.shape[1]}-dimensional vectors, got {dimensions}")
+            
+        capacity = len(self._vectors)
+        if rows <= capacity:
+            return
+        while capacity < rows:
+            capacity *= 2
+        vectors = np.zeros((capacity, dimensions), dtype=self.dtype)
+        vectors[:len(self._ids)] = self._vectors[:len(self._ids)]
+        self._vectors = vectors
+        if self._scales is not None:
+            scales = np.ones(capacity, dtype=np.float32)
+            scales[:len(self._ids)] = self._scales[:len(self._ids)]
+            self._scales = scales
+            
+    def add(self, ids, vectors, texts, metadatas):
+        if not ids:
+            return
+            
+        matrix = np.asarray(vectors, dtype=np.float32)
+        quantized, scales = quantize(normalize_rows(matrix), self.dtype)
+        
+        with self._lock:
+            self._reserve(len(self._ids) + len(ids), matrix.shape[1])
+            for i, chunk_id in enumerate(ids):
+                row = self._rows.get(chunk_id)
+                if row is None:
+                    row = len(self._ids)
+                    self._rows[chunk_id] = row
+                    self._ids.append(chunk_id)
+                    self._texts.append(texts[i])
+                    self._metadatas.append(dict(metadatas[i]))
+                else:
+                    self._texts[row] = texts[i]
+                    self._metadatas[row] = dict(metadatas[i])
+                self._vectors[row] = quantized[i]
+                if scales is not None:
+                    self._scales[row] = scales[i]
+            self._dirty = True
+            
+    def delete(self, ids):
+        with self._lock:
+            for chunk_id in ids:
+                row = self._rows.pop(chunk_id, None)
+                if row is None:
+                    continue
+                    
+                # Move the last row into the freed one to keep rows contiguous
+                last = len(self._ids) - 1
+                if row != last:
+                    moved_id = self._ids[last]
+                    self._vectors[row] = self._vectors[last]
+                    if self._scales is not None:
+                        self._scales[row] = self._scales[last]
+                    self._ids[row] = moved_id
+                    self._texts[row] = self._texts[last]
+                    self._metadatas[row] = self._metadatas[last]
+                    self._rows[moved_id] = row
+                self._ids.pop()
+                self._texts.pop()
+                self._metadatas.pop()
+                self._dirty = True
+                
+    def search(self, vector, k):
+        with self._lock:
+            vectors, scales, count = self._vectors, self._scales, len(self._ids)
+        rows, scores = top_k(vectors, scales, count, vector, k, self.block_rows)
+        with self._lock:
+            return [
+                (Document(page_content=self._texts[row], metadata=dict(self._metadatas[row])), score)
+                for row, score in zip(rows, scores) if row < len(self._ids)
+            ]
+            
+    def get(self, ids=None, include_text=True, limit=None, offset=0):
+        with self._lock:
+            if ids is None:
+                end = len(self._ids) if limit is None else offset + limit
+                rows = range(offset, min(end, len(self._ids)))
+            else:
+                rows = [self._rows[chunk_id] for chunk_id in ids if chunk_id in self._rows]
+            return {
+                "ids": [self._ids[row] for row in rows],
+                "documents": [self._texts[row] for row in rows] if include_text else [],
+                "metadatas": [dict(self._metadatas[row]) for row in rows] if include_text else [],
+            }
+            
+    def get_vectors(self, ids):
+        with self._lock:
+            rows = [self._rows[chunk_id] for chunk_id in ids]
+            vectors = self._vectors[rows].astype(np.float32)
+            if self._scales is not None:
+                vectors *= self._scales[rows][:, None]
+        return vectors
+        
+    @property
+    def count(self) -> int:
+        return len(self._ids)
+        
+    @property
+    def nbytes(self) -> int:
+        if self._vectors is None:
+            return 0
+        return self._vectors.nbytes + (self._scales.nbytes if self._scales is not None else 0)
+        
+    def persist(self):
+        if not self.path:
+            return
+            
+        with self._lock:
+            if not self._dirty:
+                return
+            count = len(self._ids)
+            chunks = json.dumps({"ids": self._ids, "texts": self._texts, "metadatas": self._metadatas})
+            arrays = {
+                "vectors": self._vectors[:count] if self._vectors is not None else np.zeros((0, 0), dtype=self.dtype),
+                "chunks": np.frombuffer(chunks.encode("utf-8"), dtype=np.uint8),
+            }
+            if self._scales is not None:
+                arrays["scales"] = self._scales[:count]
+                
+            # Replace the previous file atomically
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+# Version of the export layout written by export_mmap_index
+MMAP_FORMAT = 1
+
+def current_export(directory: str) -> Optional[str]:
+    """
+    Get the latest export in an export directory.
+    
+    Args:
+        directory: Export directory
+        
+    Returns:
+        Path of the export named by the CURRENT file, or None if there is none
+    """
+    try:
+        with open(os.path.join(directory, "CURRENT"), encoding="utf-8") as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return os.path.join(directory, version) if version else None
+
+def export_mmap_index(backend: VectorBackend, directory: str, dtype: str = "float16",
+                      metadata: Optional[Dict[str, Any]] = None, batch_size: int = 1000, keep: int = 2) -> str:
+    """
+    Write the chunks of a backend as a memory-mappable export and make it current.
+    
+    Each export is a subdirectory of directory holding:
+    
+        vectors.npy    normalized vectors in dtype, one row per chunk
+        scales.npy     per-row scales of int8 vectors
+        ids.npy        chunk IDs as fixed-width bytes, sorted, so rows are found by binary search
+        chunks.bin     JSON [text, metadata] of every chunk, concatenated
+        offsets.npy    start of each chunk in chunks.bin, plus the end of the last one
+        keyword_*.npy  BM25 postings (see BM25ArrayWriter)
+        meta.json      format, count, dimensions, dtype and the given metadata
+    
+    The export is written under a temporary name and renamed, and the CURRENT
+    file is replaced last, so readers never open a partial export. Processes
+    still mapping an older export keep reading it; only the keep most recent
+    exports are left on disk.
+    
+    Args:
+        backend: Backend to read the chunks from
+        directory: Export directory
+        dtype: Storage type of the vectors, "float32", "float16" or "int8"
+        metadata: Extra fields for meta.json, such as the embedding model
+        batch_size: Number of chunks read from the backend at a time
+        keep: Number of exports kept on disk, the new one included
+        
+    Returns:
+        Path of the new export
+    """
+    if dtype not in NumpyFlatBackend.DTYPES:
+        raise ValueError(f"Unsupported vector dtype: {dtype}")
+        
+    ids = sorted(backend.get(include_text=False)["ids"])
+    encoded_ids = np.array([chunk_id.encode("utf-8") for chunk_id in ids],
+                           dtype=f"S{max((len(chunk_id.encode('utf-8')) for chunk_id in ids), default=1)}")
+    version = f"{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 1_000_000_000:09d}"
+    path = os.path.join(directory, version)
+    tmp_path = f"{path}.tmp"
+    os.makedirs(tmp_path)
+    
+    count = len(ids)
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    vectors = None
+    scales = np.ones(count, dtype=np.float32) if dtype == "int8" else None
+    keywords = BM25ArrayWriter()
+    position = 0
+    with open(os.path.join(tmp_path, "chunks.bin"), "wb") as blob:
+        for start in range(0, count, batch_size):
+            batch_ids = ids[start:start + batch_size]
+            chunks = backend.get(ids=batch_ids)
+            texts = dict(zip(chunks["ids"], zip(chunks["documents"], chunks["metadatas"])))
+            quantized, batch_scales = quantize(normalize_rows(backend.get_vectors(batch_ids)), dtype)
+            if vectors is None:
+                vectors = open_memmap(os.path.join(tmp_path, "vectors.npy"), mode="w+", dtype=dtype,
+                                      shape=(count, quantized.shape[1]))
+            vectors[start:start + len(batch_ids)] = quantized
+            if scales is not None:
+                scales[start:start + len(batch_ids)] = batch_scales
+                
+            for i, chunk_id in enumerate(batch_ids):
+                text, chunk_metadata = texts[chunk_id]
+                record = json.dumps([text, chunk_metadata]).encode("utf-8")
+                blob.write(record)
+                position += len(record)
+                offsets[start + i + 1] = position
+                keywords.add(text)
+                
+    if vectors is None:
+        np.save(os.path.join(tmp_path, "vectors.npy"), np.zeros((0, 0), dtype=dtype))
+        dimensions = 0
+    else:
+        dimensions = vectors.shape[1]
+        vectors.flush()
+        del vectors
+    if scales is not None:
+        np.save(os.path.join(tmp_path, "scales.npy"), scales)
+    np.save(os.path.join(tmp_path, "ids.npy"), encoded_ids)
+    np.save(os.path.join(tmp_path, "offsets.npy"), offsets)
+    keywords.save(tmp_path)
+    with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"format": MMAP_FORMAT, "count": count, "dimensions": dimensions, "dtype": dtype,
+                   "created_at": time.time(), **(metadata or {})}, f)
+    os.replace(tmp_path, path)
+    
+    with open(os.path.join(directory, "CURRENT.tmp"), "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(os.path.join(directory, "CURRENT.tmp"), os.path.join(directory, "CURRENT"))
+    
+    # Version names sort by creation time
+    exports = sorted(name for name in os.listdir(directory)
+                     if os.path.isdir(os.path.join(directory, name)) and not name.endswith(".tmp"))
+    for name in exports[:-keep]:
+        if name != version:
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+        
+    logger.info(f"Exported {count} chunks ({dtype}) to {path}")
+    return path
+
+class MmapFlatBackend(VectorBackend):
+    """
+    Read-only flat index opened from an export with memory maps.
+    
+    The vectors, chunk IDs, chunk texts and keyword postings written by
+    export_mmap_index are mapped instead of read, so opening takes
+    milliseconds whatever the size of the index, and worker processes
+    opening the same export share one copy of it in the OS page cache
+    instead of each holding its own. Searches score the mapped vectors like
+    NumpyFlatBackend; chunks are decoded only for the rows returned.
+    """
+    
+    read_only = True
+    
+    def __init__(self, directory: str, block_rows: int = 4096):
+        """
+        Initialize the backend.
+        
+        Args:
+            directory: Export directory; load() opens its current export
+            block_rows: Rows converted to float32 at a time while searching
+        """
+        self.directory = directory
+        self.block_rows = block_rows
+        self.path = None
+        self.meta: Dict[str, Any] = {}
+        self._vectors: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._ids = np.zeros(0, dtype="S1")
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._chunks = b""
+        self._keyword_index: Optional[MmapBM25Index] = None
+        
+    def load(self):
+        path = current_export(self.directory)
+        if path is None:
+            return
+            
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != MMAP_FORMAT:
+            raise ValueError(f"{path} has export format {meta.get('format')}, expected {MMAP_FORMAT}")
+            
+        self._vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        scales_path = os.path.join(path, "scales.npy")
+        self._scales = np.load(scales_path, mmap_mode="r") if os.path.exists(scales_path) else None
+        self._ids = np.load(os.path.join(path, "ids.npy"), mmap_mode="r")
+        self._offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+        if meta["count"]:
+            with open(os.path.join(path, "chunks.bin"), "rb") as f:
+                self._chunks = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._keyword_index = MmapBM25Index(path, self._ids)
+        self.path = path
+        self.meta = meta
+        logger.info(f"Mapped {meta['count']} {meta['dtype']} vectors from {path}")
+        
+    def add(self, ids, vectors, texts, metadatas):
+        raise ReadOnlyIndexError(f"The index export in {self.directory} is read-only")
+        
+    def delete(self, ids):
+        raise ReadOnlyIndexError(f"The index export in {self.directory} is read-only")
+        
+    def _chunk(self, row: int) -> Tuple[str, Dict[str, Any]]:
+        """Decode the text and metadata of a row"""
+        text, metadata = json.loads(self._chunks[self._offsets[row]:self._offsets[row + 1]])
+        return text, metadata
+        
+    def _find(self, ids: List[str]) -> List[Tuple[str, int]]:
+        """Look up the rows of chunk IDs, skipping unknown ones"""
+        if not ids or not len(self._ids):
+            return []
+            
+        keys = np.array([chunk_id.encode("utf-8") for chunk_id in ids])
+        positions = np.minimum(np.searchsorted(self._ids, keys), len(self._ids) - 1)
+        return [(chunk_id, int(row)) for chunk_id, key, row in zip(ids, keys, positions) if self._ids[row] == key]
+        
+    def search(self, vector, k):
+        rows, scores = top_k(self._vectors, self._scales, self.count, vector, k, self.block_rows)
+        results = []
+        for row, score in zip(rows, scores):
+            text, metadata = self._chunk(row)
+            results.append((Document(page_content=text, metadata=metadata), score))
+        return results
+        
+    def get(self, ids=None, include_text=True, limit=None, offset=0):
+        if ids is None:
+            end = self.count if limit is None else offset + limit
+            rows = [(self._ids[row].decode("utf-8"), row) for row in range(offset, min(end, self.count))]
+        else:
+            rows = self._find(ids)
+        chunks = [self._chunk(row) for _, row in rows] if include_text else []
+        return {
+            "ids": [chunk_id for chunk_id, _ in rows],
+            "documents": [text for text, _ in chunks],
+            "metadatas": [metadata for _, metadata in chunks],
+        }
+        
+    def get_vectors(self, ids):
+        rows = [row for _, row in self._find(ids)]
+        if len(rows) != len(ids):
+            raise KeyError("Unknown chunk IDs")
+        vectors = self._vectors[rows].astype(np.float32)
+        if self._scales is not None:
+            vectors *= self._scales[rows][:, None]
+        return vectors
+        
+    @property
+    def count(self) -> int:
+        return len(self._ids)
+        
+    @property
+    def nbytes(self) -> int:
+        if self._vectors is None:
+            return 0
+        return self._vectors.nbytes + (self._scales.nbytes if self._scales is not None else 0)
+        
+    @property
+    def keyword_index(self) -> Optional[MmapBM25Index]:
+        return self._keyword_index
+
+BACKENDS = ("chroma", "numpy", "mmap")
+
+def create_backend(name: str, collection_name: str, embeddings: Any, persist_directory: Optional[str] = None,
+                   numpy_dtype: str = "float16", mmap_directory: Optional[str] = None) -> VectorBackend:
+    """
+    Create a vector backend by name.
+    
+    Args:
+        name: "chroma", "numpy" or "mmap"
+        collection_name: Name of the collection or index file
+        embeddings: Embedding function (used by Chroma)
+        persist_directory: Directory of the persistent index, or None to keep it in memory
+        numpy_dtype: Storage type of the NumPy backend's vectors
+        mmap_directory: Export directory opened by the mmap backend
+        
+    Returns:
+        Backend instance, not loaded yet
+    """
+    if name == "chroma":
+        return ChromaBackend(collection_name, embeddings, persist_directory)
+    if name == "numpy":
+        return NumpyFlatBackend(collection_name, persist_directory, numpy_dtype)
+    if name == "mmap":
+        return MmapFlatBackend(mmap_directory)
+    raise ValueError(f"Unknown vector backend: {name} (expected one of {', '.join(BACKENDS)})")
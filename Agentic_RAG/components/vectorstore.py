@@ -1,37 +1,476 @@
+import hashlib
 import logging
-from typing import List, Optional
-from langchain_community.vectorstores import Chroma
+import os
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+from langchain_core.documents import Document
+from components.bm25 import BM25Index
 from components.embeddings import EmbeddingManager
-from core.config import VECTOR_DB_COLLECTION
+from components.hybrid_retriever import HybridRetriever
+from components.index_manifest import IndexManifest
+from components.ingest import batched, run_in_background
+from components.vector_backends import (
+    MmapFlatBackend, ReadOnlyIndexError, VectorBackend, create_backend, export_mmap_index,
+)
+from core.config import (
+    VECTOR_DB_COLLECTION, VECTOR_DB_PERSIST_DIR, VECTOR_BACKEND, VECTOR_NUMPY_DTYPE, VECTOR_MMAP_DIR,
+    CHUNK_SIZE, CHUNK_OVERLAP, INGEST_BATCH_SIZE, INGEST_QUEUE_SIZE,
+)
 
 logger = logging.getLogger(__name__)
 
+def compute_chunk_id(text: str, chunk_size: int, chunk_overlap: int, model: str) -> str:
+    """
+    Compute the content-addressed ID of a chunk.
+    
+    The ID changes whenever the chunk text, the chunking parameters or the
+    embedding model change, so a stored vector is only reused when it would be
+    identical to a freshly computed one.
+    
+    Args:
+        text: Chunk text
+        chunk_size: Chunk size used to split the source document
+        chunk_overlap: Chunk overlap used to split the source document
+        model: Embedding model name
+        
+    Returns:
+        Hex digest identifying the chunk
+    """
+    key = f"{model}\x00{chunk_size}\x00{chunk_overlap}\x00{text}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
 class VectorStoreManager:
-    """Manager for vector store operations."""
+    """
+    Manager for vector store operations.
+    
+    Vectors are kept by a pluggable backend (see components.vector_backends):
+    a Chroma collection, a quantized NumPy flat index, or a read-only
+    memory-mapped export of either, shared by worker processes.
+    """
     
-    def __init__(self, collection_name: str = VECTOR_DB_COLLECTION, embedding_manager: Optional[EmbeddingManager] = None):
+    def __init__(self,
+                 collection_name: str = VECTOR_DB_COLLECTION,
+                 embedding_manager: Optional[EmbeddingManager] = None,
+                 persist_directory: Optional[str] = VECTOR_DB_PERSIST_DIR,
+                 chunk_size: int = CHUNK_SIZE,
+                 chunk_overlap: int = CHUNK_OVERLAP,
+                 batch_size: int = INGEST_BATCH_SIZE,
+                 queue_size: int = INGEST_QUEUE_SIZE,
+                 backend: str = VECTOR_BACKEND,
+                 numpy_dtype: str = VECTOR_NUMPY_DTYPE,
+                 mmap_directory: str = VECTOR_MMAP_DIR):
         """
         Initialize the vector store manager.
         
         Args:
             collection_name: Name of the vector store collection
             embedding_manager: Embedding manager to use
+            persist_directory: Directory of the persistent index, or None to keep it in memory
+            chunk_size: Chunk size the indexed documents were split with
+            chunk_overlap: Chunk overlap the indexed documents were split with
+            batch_size: Number of chunks embedded per request during ingest
+            queue_size: Number of batches buffered between ingest stages
+            backend: Vector backend, "chroma", "numpy" or "mmap"
+            numpy_dtype: Storage type of the NumPy backend's vectors, "float32", "float16" or "int8"
+            mmap_directory: Export directory opened by the mmap backend
         """
         self.collection_name = collection_name
         self.embedding_manager = embedding_manager or EmbeddingManager()
-        self._vectorstore = None
+        self.persist_directory = persist_directory or None
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.backend_name = backend
+        self.numpy_dtype = numpy_dtype
+        self.mmap_directory = mmap_directory
+        self._backend: Optional[VectorBackend] = None
         self._retriever = None
+        self._manifest = None
+        self.keyword_index = BM25Index()
+        
+    @property
+    def physical_collection_name(self) -> str:
+        """
+        Get the name of the underlying collection.
+        
+        Vectors from different embedding models cannot share a collection, so the
+        model name is folded into the collection name, as is the storage type
+        of a NumPy index.
+        
+        Returns:
+            Collection name scoped to the embedding model and backend
+        """
+        model_digest = hashlib.sha256(self.embedding_manager.model_name.encode("utf-8")).hexdigest()[:8]
+        if self.backend_name in ("chroma", "mmap"):
+            return f"{self.collection_name}-{model_digest}"
+        return f"{self.collection_name}-{model_digest}-{self.backend_name}-{self.numpy_dtype}"
+        
+    @property
+    def read_only(self) -> bool:
+        """Whether the index is a read-only export that cannot be synced"""
+        return self.backend_name == "mmap"
+        
+    @property
+    def chunk_config(self) -> str:
+        """
+        Get a key describing how chunks are produced and embedded.
+        
+        Returns:
+            String combining embedding model, chunk size and chunk overlap
+        """
+        return f"{self.embedding_manager.model_name}:{self.chunk_size}:{self.chunk_overlap}"
+        
+    @property
+    def manifest(self) -> IndexManifest:
+        """
+        Get the manifest of indexed sources, stored next to a persistent collection.
+        
+        Returns:
+            Index manifest
+        """
+        if self._manifest is None:
+            path = None
+            if self.persist_directory and not self.read_only:
+                path = os.path.join(self.persist_directory, f"{self.physical_collection_name}.manifest.json")
+            self._manifest = IndexManifest(path)
+            
+        return self._manifest
+        
+    def chunk_id(self, document) -> str:
+        """
+        Compute the content-addressed ID of a document chunk.
+        
+        Args:
+            document: Document chunk
+            
+        Returns:
+            Chunk ID
+        """
+        return compute_chunk_id(
+            document.page_content,
+            self.chunk_size,
+            self.chunk_overlap,
+            self.embedding_manager.model_name,
+        )
+        
+    def open(self):
+        """
+        Open the collection, creating it if it does not exist yet.
+        
+        Returns:
+            Self for method chaining
+        """
+        if self._backend is None:
+            logger.info(f"Opening vector store collection: {self.physical_collection_name}"
+                        f" ({self.backend_name}, {self.persist_directory or 'in-memory'})")
+            backend = create_backend(
+                self.backend_name,
+                self.physical_collection_name,
+                self.embedding_manager.embeddings,
+                self.persist_directory,
+                self.numpy_dtype,
+                self.mmap_directory,
+            )
+            backend.load()
+            
+            if isinstance(backend, MmapFlatBackend):
+                model = backend.meta.get("embedding_model")
+                if model and model != self.embedding_manager.model_name:
+                    raise ValueError(f"{backend.path} was embedded with {model}, "
+                                     f"not {self.embedding_manager.model_name}")
+                                     
+            self._backend = backend
+            self._retriever = None
+            if backend.keyword_index is not None:
+                self.keyword_index = backend.keyword_index
+            else:
+                self._load_keyword_index()
+            
+        return self
+        
+    def _load_keyword_index(self, batch_size: int = 1000):
+        """
+        Rebuild the keyword index from the chunks stored in the collection.
+        
+        Args:
+            batch_size: Number of chunks read from the collection at a time
+        """
+        self.keyword_index.clear()
+        offset = 0
+        while True:
+            batch = self._backend.get(limit=batch_size, offset=offset)
+            if not batch["ids"]:
+                break
+            self.keyword_index.add(batch["ids"], batch["documents"])
+            offset += len(batch["ids"])
+            
+        if offset:
+            logger.info(f"Built keyword index over {offset} chunks")
+        
+    def load_existing(self) -> bool:
+        """
+        Open a previously persisted index.
+        
+        Returns:
+            True if a persisted index with at least one chunk was found
+        """
+        if self.persist_directory is None and not self.read_only:
+            return False
+            
+        return self.open().count > 0
+        
+    @property
+    def count(self) -> int:
+        """
+        Get the number of chunks in the collection.
+        
+        Returns:
+            Number of indexed chunks
+        """
+        if self._backend is None:
+            return 0
+            
+        return self._backend.count
+        
+    def _keyed(self, documents: Iterable) -> Iterator:
+        """
+        Stamp each chunk with its content-addressed ID.
+        
+        Args:
+            documents: Document chunks
+            
+        Returns:
+            Generator of the same chunks with metadata["chunk_id"] set
+        """
+        for document in documents:
+            document.metadata["chunk_id"] = self.chunk_id(document)
+            yield document
+            
+    def _missing(self, documents: Iterable) -> Iterator:
+        """
+        Drop chunks that are already indexed or repeated within their batch.
+        
+        Only one batch of IDs is held at a time, so memory does not grow with
+        the stream. A chunk repeated in a later batch that is still in flight
+        is embedded again and upserted under the same ID, which the backends
+        and the keyword index treat as a no-op.
+        
+        Args:
+            documents: Keyed document chunks
+            
+        Returns:
+            Generator of chunks that still need to be embedded
+        """
+        for batch in batched(documents, self.batch_size):
+            ids = [document.metadata["chunk_id"] for document in batch]
+            skipped = set(self._backend.get(ids=ids, include_text=False)["ids"])
+            for chunk_id, document in zip(ids, batch):
+                if chunk_id not in skipped:
+                    skipped.add(chunk_id)
+                    yield document
+                    
+    def add_embedded(self, documents: List, vectors: List[List[float]]):
+        """
+        Insert chunks together with their precomputed embeddings.
+        
+        Args:
+            documents: Keyed document chunks
+            vectors: Embeddings of the chunks
+        """
+        ids = [document.metadata["chunk_id"] for document in documents]
+        texts = [document.page_content for document in documents]
+        self._backend.add(ids, vectors, texts, [document.metadata for document in documents])
+        self.keyword_index.add(ids, texts)
+        
+    def ingest(self, documents: Iterable) -> int:
+        """
+        Stream chunks into the index with bounded memory.
+        
+        Chunks are keyed, filtered against the index, grouped into fixed-size
+        batches, embedded and inserted. Producing chunks, embedding and
+        inserting run on separate threads connected by bounded queues, so a
+        lazily produced stream (e.g. pages still being fetched) is embedded
+        while it is being produced and memory does not grow with its length.
+        
+        Args:
+            documents: Iterable of document chunks, typically a generator
+            
+        Returns:
+            Number of chunks embedded
+        """
+        self.open()
+        
+        batches = batched(self._missing(self._keyed(documents)), self.batch_size)
+        embedded = self.embedding_manager.embed_batches(run_in_background(batches, self.queue_size))
+        
+        count = 0
+        for batch, vectors in run_in_background(embedded, self.queue_size):
+            self.add_embedded(batch, vectors)
+            count += len(batch)
+        return count
+        
+    def get_documents(self, chunk_ids: List[str]) -> Dict[str, Document]:
+        """
+        Load chunks from the collection by ID.
+        
+        Args:
+            chunk_ids: Chunk IDs
+            
+        Returns:
+            Dictionary mapping each found chunk ID to its document
+        """
+        result = self._backend.get(ids=chunk_ids)
+        return {
+            chunk_id: Document(page_content=text, metadata=metadata)
+            for chunk_id, text, metadata in zip(result["ids"], result["documents"], result["metadatas"])
+        }
+        
+    def _delete(self, chunk_ids: List[str]):
+        """
+        Delete chunks from the collection and the keyword index.
+        
+        Args:
+            chunk_ids: IDs of the chunks to delete
+        """
+        self._backend.delete(chunk_ids)
+        self.keyword_index.remove(chunk_ids)
+            
+    def _changed_chunks(self, document_loader, urls: List[str], summary: Dict[str, int],
+                        fetched: Set[str]) -> Iterator:
+        """
+        Fetch sources and yield the chunks of new or changed pages.
+        
+        The manifest and the summary are updated as pages arrive.
+        
+        Args:
+            document_loader: Document loader used to fetch and split pages
+            urls: Source URLs to fetch
+            summary: Counters updated in place
+            fetched: Set the URLs of successfully fetched pages are added to
+            
+        Returns:
+            Generator of keyed document chunks
+        """
+        manifest = self.manifest
+        config = self.chunk_config
+        
+        # Only send validators for pages indexed with the current configuration
+        validators = {}
+        for url in urls:
+            entry = manifest.get(url)
+            if entry and entry["config"] == config:
+                validators[url] = {"etag": entry["etag"], "last_modified": entry["last_modified"]}
+                
+        for page in document_loader.iter_fetch(urls, validators):
+            fetched.add(page.url)
+            entry = manifest.get(page.url)
+            current = entry is not None and entry["config"] == config
+            
+            if page.not_modified and current:
+                summary["unchanged"] += 1
+                continue
+                
+            content_hash = hashlib.sha256(
+                "\x00".join(doc.page_content for doc in page.documents).encode("utf-8")
+            ).hexdigest()
+            if current and entry["content_hash"] == content_hash:
+                manifest.set(page.url, entry["chunk_ids"], config, content_hash, page.etag, page.last_modified)
+                summary["unchanged"] += 1
+                continue
+                
+            chunks = list(self._keyed(document_loader.split_documents(page.documents)))
+            chunk_ids = list(dict.fromkeys(chunk.metadata["chunk_id"] for chunk in chunks))
+            manifest.set(page.url, chunk_ids, config, content_hash, page.etag, page.last_modified)
+            summary["updated" if entry else "added"] += 1
+            
+            yield from chunks
+            
+    def sync_sources(self, document_loader, urls: List[str]) -> Dict[str, int]:
+        """
+        Incrementally bring the index in line with a list of source URLs.
+        
+        Known pages are fetched with conditional requests; a page that answers
+        304 or whose content hash is unchanged is skipped. Changed and new
+        pages are streamed through the ingest pipeline so only their
+        never-seen chunks are embedded, chunks a page no longer has are
+        deleted, and the chunks of URLs that are not requested anymore are
+        removed. New chunks are added before old ones are deleted, so
+        concurrent queries never see a page disappear.
+        
+        Args:
+            document_loader: Document loader used to fetch and split pages
+            urls: Source URLs the index should contain
+            
+        Returns:
+            Counts of added, updated, unchanged, removed and failed sources and
+            of embedded and deleted chunks
+            
+        Raises:
+            ReadOnlyIndexError: If the index is a read-only export
+        """
+        if self.read_only:
+            raise ReadOnlyIndexError("A read-only index export cannot be synced; rebuild it in the indexing process")
+            
+        self.open()
+        manifest = self.manifest
+        requested = list(dict.fromkeys(urls))
+        summary = {"added": 0, "updated": 0, "unchanged": 0, "removed": 0, "failed": 0,
+                   "embedded_chunks": 0, "deleted_chunks": 0}
+        
+        previous_ids = manifest.referenced_ids()
+        fetched: Set[str] = set()
+        try:
+            summary["embedded_chunks"] = self.ingest(
+                self._changed_chunks(document_loader, requested, summary, fetched)
+            )
+        except Exception:
+            # The in-memory manifest may describe chunks that were never stored
+            self._manifest = None
+            raise
+            
+        summary["failed"] = len([url for url in requested if url not in fetched])
+        
+        for url in manifest.sources:
+            if url not in requested:
+                manifest.remove(url)
+                summary["removed"] += 1
+                
+        # Delete chunks no source refers to anymore. A fresh manifest knows
+        # nothing about what is in the collection, so reconcile everything.
+        referenced_ids = manifest.referenced_ids()
+        if manifest.is_new:
+            candidate_ids = set(self._backend.get(include_text=False)["ids"])
+        else:
+            candidate_ids = previous_ids
+        stale_ids = list(candidate_ids - referenced_ids)
+        if stale_ids:
+            self._delete(stale_ids)
+        summary["deleted_chunks"] = len(stale_ids)
+        
+        self._backend.persist()
+        manifest.save()
+        self._retriever = None
+        
+        logger.info(f"Synced index with {len(requested)} sources: {summary}")
+        return summary
         
     def create_from_documents(self, documents: List):
         """
         Create a vector store from documents.
         
+        Chunks already present in the collection are kept as they are, only
+        never-seen chunks are embedded, and chunks that are no longer part of
+        the documents are removed.
+        
         Args:
             documents: List of documents to add to the vector store
             
         Returns:
             Self for method chaining
         """
+        if self.read_only:
+            raise ReadOnlyIndexError("A read-only index export cannot be modified")
+            
         if not documents:
             logger.warning("No documents provided for vector store creation")
             return self
@@ -39,13 +478,29 @@ class VectorStoreManager:
         logger.info(f"Creating vector store with {len(documents)} documents")
         
         try:
-            self._vectorstore = Chroma.from_documents(
-                documents=documents,
-                collection_name=self.collection_name,
-                embedding=self.embedding_manager.embeddings,
-            )
-            logger.info(f"Vector store created with collection name: {self.collection_name}")
+            embedded = self.ingest(documents)
+            
+            # Group chunk IDs by source, dropping duplicates
+            sources = {}
+            for document in documents:
+                sources.setdefault(document.metadata.get("source", ""), {})[document.metadata["chunk_id"]] = None
+            chunk_ids = {chunk_id for ids in sources.values() for chunk_id in ids}
+            
+            existing_ids = set(self._backend.get(include_text=False)["ids"])
+            stale_ids = [chunk_id for chunk_id in existing_ids if chunk_id not in chunk_ids]
+            if stale_ids:
+                self._delete(stale_ids)
+                
+            # The collection now holds exactly these documents
+            self._backend.persist()
+            self.manifest.clear()
+            for source, ids in sources.items():
+                self.manifest.set(source, list(ids), self.chunk_config)
+            self.manifest.save()
             
+            logger.info(f"Vector store ready with collection name: {self.collection_name} "
+                        f"({embedded} embedded, {len(chunk_ids) - embedded} reused, {len(stale_ids)} removed)")
+                        
             # Reset retriever when vectorstore changes
             self._retriever = None
             
@@ -55,33 +510,65 @@ class VectorStoreManager:
             logger.error(f"Error creating vector store: {e}")
             raise
             
+    def export_mmap(self, directory: Optional[str] = None, dtype: Optional[str] = None) -> str:
+        """
+        Export the index for read-only memory-mapped use by worker processes.
+        
+        Args:
+            directory: Export directory, defaults to the mmap backend's directory
+            dtype: Storage type of the exported vectors, defaults to numpy_dtype
+            
+        Returns:
+            Path of the new export
+        """
+        return export_mmap_index(
+            self.open()._backend,
+            directory or self.mmap_directory,
+            dtype or self.numpy_dtype,
+            metadata={"embedding_model": self.embedding_manager.model_name, "chunk_config": self.chunk_config},
+        )
+        
+    def similarity_search(self, query: str, k: int) -> List[Document]:
+        """
+        Find the chunks closest to a query by vector similarity.
+        
+        Args:
+            query: Query text
+            k: Number of chunks to return
+            
+        Returns:
+            Chunks ordered by similarity, best first
+        """
+        vector = self.embedding_manager.embeddings.embed_query(query)
+        return [document for document, _ in self._backend.search(vector, k)]
+        
     @property
-    def vectorstore(self):
+    def backend(self) -> Optional[VectorBackend]:
         """
-        Get the vector store.
+        Get the vector backend.
         
         Returns:
-            Vector store instance
+            Backend instance, or None before the collection is opened
         """
-        if self._vectorstore is None:
+        if self._backend is None:
             logger.warning("Vector store not initialized")
             
-        return self._vectorstore
+        return self._backend
         
     @property
     def retriever(self):
         """
-        Get or create retriever from the vector store.
+        Get or create a vector similarity retriever.
         
         Returns:
             Retriever instance
         """
-        if self._vectorstore is None:
+        if self._backend is None:
             logger.warning("Vector store not initialized, cannot create retriever")
             return None
             
         if self._retriever is None:
             logger.info("Creating retriever from vector store")
-            self._retriever = self._vectorstore.as_retriever()
+            self._retriever = HybridRetriever(vector_store_manager=self, mode="vector")
             
-        return self._retriever
\ No newline at end of file
+        return self._retriever
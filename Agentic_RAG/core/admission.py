@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted because the server is saturated."""
+    
+    def __init__(self, queue_position: int, retry_after: float):
+        super().__init__("Server is busy, please retry later")
+        self.queue_position = queue_position
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """
+    Bound the number of requests processed concurrently.
+    
+    Up to max_concurrent requests run at once; further requests wait in a
+    FIFO queue of at most max_queued entries. A request arriving at a full
+    queue, or waiting longer than queue_timeout, is rejected with its queue
+    position so the caller can answer 429.
+    """
+    
+    def __init__(self, max_concurrent: int, max_queued: int, queue_timeout: float):
+        """
+        Initialize the admission controller.
+        
+        Args:
+            max_concurrent: Maximum number of requests in flight
+            max_queued: Maximum number of requests waiting for a slot
+            queue_timeout: Seconds a request may wait for a slot
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.rejected = 0
+        self._in_flight = 0
+        self._waiting = deque()
+        self._condition = threading.Condition()
+        
+    @contextmanager
+    def admit(self):
+        """
+        Hold a processing slot for the duration of the with block.
+        
+        Raises:
+            AdmissionRejected: If the queue is full or the wait timed out
+        """
+        with self._condition:
+            if self._in_flight >= self.max_concurrent or self._waiting:
+                if len(self._waiting) >= self.max_queued:
+                    self.rejected += 1
+                    raise AdmissionRejected(len(self._waiting) + 1, self.queue_timeout)
+                    
+                ticket = object()
+                self._waiting.append(ticket)
+                deadline = time.monotonic() + self.queue_timeout
+                try:
+                    while self._waiting[0] is not ticket or self._in_flight >= self.max_concurrent:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.rejected += 1
+                            raise AdmissionRejected(self._waiting.index(ticket) + 1, self.queue_timeout)
+                        self._condition.wait(remaining)
+                finally:
+                    self._waiting.remove(ticket)
+                    self._condition.notify_all()
+                    
+            self._in_flight += 1
+            
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
+                
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the current load.
+        
+        Returns:
+            Dictionary with in-flight, queued and rejected request counts
+        """
+        with self._condition:
+            return {
+                "in_flight": self._in_flight,
+                "queued": len(self._waiting),
+                "max_concurrent": self.max_concurrent,
+                "max_queued": self.max_queued,
+                "rejected": self.rejected,
+            }
\ No newline at end of file
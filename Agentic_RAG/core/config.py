@@ -4,6 +4,10 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
+# Application directories
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.environ.get("RAG_DATA_DIR", os.path.join(BASE_DIR, "data"))
+
 # API Configuration
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 
@@ -18,6 +22,41 @@ AGENT_MODEL = os.environ.get("AGENT_MODEL", "gpt-4-turbo")
 GRADER_MODEL = os.environ.get("GRADER_MODEL", "gpt-4o")
 REWRITE_MODEL = os.environ.get("REWRITE_MODEL", "gpt-4-0125-preview")
 GENERATOR_MODEL = os.environ.get("GENERATOR_MODEL", "gpt-4o-mini")
+GRADE_GENERATE_MODEL = os.environ.get("GRADE_GENERATE_MODEL", GENERATOR_MODEL)  # Grades and answers in one call (fused topology)
+EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "text-embedding-ada-002")
+LLM_MAX_CONNECTIONS = int(os.environ.get("LLM_MAX_CONNECTIONS", "20"))  # Pooled HTTP connections shared by all chat models
+
+# Embedding cache configuration; set the path to an empty string to disable caching
+EMBEDDING_CACHE_PATH = os.environ.get("EMBEDDING_CACHE_PATH", os.path.join(DATA_DIR, "embedding_cache.sqlite3"))
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.environ.get("EMBEDDING_CACHE_MAX_ENTRIES", "50000"))
+
+# Relevance grading configuration
+# "chunk" grades every retrieved chunk and generates from the relevant ones only,
+# "combined" grades all retrieved chunks together with a single yes/no
+GRADING_MODE = os.environ.get("GRADING_MODE", "chunk")
+GRADING_MAX_CONCURRENCY = int(os.environ.get("GRADING_MAX_CONCURRENCY", "8"))  # Chunks graded at the same time
+
+# Graph topology; "standard" grades the retrieved context and generates the answer in
+# separate model calls, "fused" gets the relevance verdict and the answer from a single
+# call and only rewrites on a "not relevant" verdict (GRADING_MODE does not apply)
+GRAPH_TOPOLOGY = os.environ.get("GRAPH_TOPOLOGY", "standard")
+
+# Per-request budget of the retrieve/rewrite loop; once exhausted an answer is
+# generated from the best chunks retrieved so far
+MAX_REWRITES = int(os.environ.get("MAX_REWRITES", "2"))
+REQUEST_DEADLINE_SECONDS = float(os.environ.get("REQUEST_DEADLINE_SECONDS", "60"))
+
+# Semantic answer cache configuration
+ANSWER_CACHE_ENABLED = os.environ.get("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.environ.get("ANSWER_CACHE_THRESHOLD", "0.95"))     # Minimum cosine similarity of a reused answer
+ANSWER_CACHE_TTL = float(os.environ.get("ANSWER_CACHE_TTL", "86400"))                # Seconds an answer stays valid, 0 for no expiry
+ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+
+# Prompt configuration
+PROMPTS_DIR = os.path.join(BASE_DIR, "prompts")
+RAG_PROMPT_HUB_REF = os.environ.get("RAG_PROMPT_HUB_REF", "rlm/rag-prompt")  # Pin a version with "rlm/rag-prompt:<commit>"
+PROMPT_HUB_REFRESH = os.environ.get("PROMPT_HUB_REFRESH", "false").lower() == "true"
+PROMPT_HUB_REFRESH_INTERVAL = float(os.environ.get("PROMPT_HUB_REFRESH_INTERVAL", "3600"))
 
 # Default URLs for document retrieval
 DEFAULT_URLS = [
@@ -26,10 +65,71 @@ DEFAULT_URLS = [
     "https://lilianweng.github.io/posts/2023-10-25-adv-attack-llm/",
 ]
 
+# Document fetching configuration
+FETCH_MAX_WORKERS = int(os.environ.get("FETCH_MAX_WORKERS", "16"))
+FETCH_PER_HOST_LIMIT = int(os.environ.get("FETCH_PER_HOST_LIMIT", "8"))
+FETCH_TIMEOUT = float(os.environ.get("FETCH_TIMEOUT", "15"))
+
 # Vector database configuration
 VECTOR_DB_COLLECTION = "rag-chroma"
+# Directory of the persistent Chroma index; set to an empty string to keep the index in memory
+VECTOR_DB_PERSIST_DIR = os.environ.get("VECTOR_DB_PERSIST_DIR", os.path.join(DATA_DIR, "chroma"))
+# "chroma" keeps vectors in a Chroma collection, "numpy" in a flat NumPy matrix searched with one product per block,
+# "mmap" opens the latest read-only export in VECTOR_MMAP_DIR with memory maps
+VECTOR_BACKEND = os.environ.get("VECTOR_BACKEND", "chroma")
+VECTOR_NUMPY_DTYPE = os.environ.get("VECTOR_NUMPY_DTYPE", "float16")  # "float32", "float16" or "int8"
+# Directory of memory-mappable index exports, shared by worker processes
+VECTOR_MMAP_DIR = os.environ.get("VECTOR_MMAP_DIR", os.path.join(DATA_DIR, "index-export"))
+# Whether each rebuild writes a new export to VECTOR_MMAP_DIR (in the process that indexes)
+VECTOR_MMAP_EXPORT = os.environ.get("VECTOR_MMAP_EXPORT", "false").lower() == "true"
 CHUNK_SIZE = 100
 CHUNK_OVERLAP = 50
+# Seconds a rebuild waits for queries still reading the index slot it is about to sync
+REBUILD_DRAIN_TIMEOUT = float(os.environ.get("REBUILD_DRAIN_TIMEOUT", "120"))
+
+# Retrieval configuration
+# "hybrid" fuses BM25 keyword and vector search, "vector" and "keyword" use one of them
+RETRIEVAL_MODE = os.environ.get("RETRIEVAL_MODE", "hybrid")
+RETRIEVAL_K = int(os.environ.get("RETRIEVAL_K", "4"))              # Chunks returned per retrieval
+RETRIEVAL_FETCH_K = int(os.environ.get("RETRIEVAL_FETCH_K", "20"))  # Candidates taken from each ranking before fusion
+RRF_K = int(os.environ.get("RRF_K", "60"))                          # Reciprocal rank fusion damping constant
+# Start retrieving for the question while the agent decides whether to call the retriever tool;
+# the result is used if the agent calls it with an equivalent query and discarded otherwise
+SPECULATIVE_RETRIEVAL = os.environ.get("SPECULATIVE_RETRIEVAL", "false").lower() == "true"
+# Minimum Jaccard similarity of the words of the agent's tool query and the question for the
+# speculative result to be used; the default 1.0 requires the same words, in any order, so
+# the result is what the agent's query would have retrieved
+SPECULATIVE_MATCH_THRESHOLD = float(os.environ.get("SPECULATIVE_MATCH_THRESHOLD", "1.0"))
+
+# Token budget of the packed context passed to the grader and the generator
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "2000"))
+
+# Ingest pipeline configuration
+INGEST_BATCH_SIZE = int(os.environ.get("INGEST_BATCH_SIZE", "64"))  # Chunks per embedding request
+INGEST_QUEUE_SIZE = int(os.environ.get("INGEST_QUEUE_SIZE", "4"))   # Batches buffered between pipeline stages
+
+# Query serving configuration
+QUERY_MAX_CONCURRENCY = int(os.environ.get("QUERY_MAX_CONCURRENCY", "8"))  # Queries processed at the same time
+QUERY_MAX_QUEUE = int(os.environ.get("QUERY_MAX_QUEUE", "32"))             # Queries waiting before answering 429
+QUERY_QUEUE_TIMEOUT = float(os.environ.get("QUERY_QUEUE_TIMEOUT", "30"))   # Seconds a query may wait for a slot
+
+# UI state configuration; history and debug entries are kept in ring buffers
+UI_HISTORY_MAX_MESSAGES = int(os.environ.get("UI_HISTORY_MAX_MESSAGES", "500"))  # Messages kept for /history
+UI_HISTORY_PAGE_SIZE = int(os.environ.get("UI_HISTORY_PAGE_SIZE", "50"))         # Default page size of /history and /debug
+UI_DEBUG_MAX_ENTRIES = int(os.environ.get("UI_DEBUG_MAX_ENTRIES", "200"))        # Workflow steps kept for /debug
+UI_DEBUG_MAX_CHARS = int(os.environ.get("UI_DEBUG_MAX_CHARS", "2000"))           # Characters kept of each debug entry
+
+# Response configuration; step payloads are truncated and large responses gzip-compressed
+STEP_CONTENT_MAX_CHARS = int(os.environ.get("STEP_CONTENT_MAX_CHARS", "500"))          # Characters of content per step
+RESPONSE_GZIP = os.environ.get("RESPONSE_GZIP", "true").lower() == "true"              # Compress JSON responses
+RESPONSE_GZIP_MIN_BYTES = int(os.environ.get("RESPONSE_GZIP_MIN_BYTES", "1024"))       # Smaller responses are sent as-is
+
+# Session configuration; each browser session gets its own history and debug log
+SESSION_COOKIE_NAME = os.environ.get("SESSION_COOKIE_NAME", "rag_session")    # Cookie carrying the session ID
+SESSION_HEADER = os.environ.get("SESSION_HEADER", "X-Session-ID")             # Header API clients may send instead
+SESSION_IDLE_TIMEOUT = float(os.environ.get("SESSION_IDLE_TIMEOUT", "1800"))  # Seconds of inactivity before a session is evicted
+SESSION_MAX_SESSIONS = int(os.environ.get("SESSION_MAX_SESSIONS", "1000"))    # Sessions kept before evicting the least recently used
+SESSION_MAX_MEMORY_MB = float(os.environ.get("SESSION_MAX_MEMORY_MB", "256")) # Approximate memory cap for the state of all sessions
 
 # Set environment variables
 def setup_environment():
@@ -0,0 +1,363 @@
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import ToolMessage
+from langchain_core.outputs import LLMResult
+
+# Bucket upper bounds, in seconds, tokens and chunks
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (16, 64, 256, 1024, 4096, 16384)
+COUNT_BUCKETS = (0, 1, 2, 4, 8, 16, 32)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric(ABC):
+    """Base of a metric family with a fixed set of label names."""
+    
+    kind = "untyped"
+    
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+        
+    def _labels(self, key: Tuple[str, ...], *extra: Tuple[str, str]) -> str:
+        return _format_labels(list(zip(self.label_names, key)) + list(extra))
+        
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+        
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """Render the sample lines of the metric family"""
+
+class Counter(_Metric):
+    """Monotonically increasing count, one series per label combination."""
+    
+    kind = "counter"
+    
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        
+    def inc(self, amount: float = 1, **labels):
+        """
+        Increase the counter.
+        
+        Args:
+            amount: Non-negative amount to add
+            **labels: Label values of the series
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+            
+    def value(self, **labels) -> float:
+        """Get the current value of a series"""
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+            
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{self._labels(key)} {_format_value(value)}" for key, value in values]
+
+class Gauge(_Metric):
+    """Value read from a callable whenever the metrics are rendered."""
+    
+    kind = "gauge"
+    
+    def __init__(self, name: str, documentation: str, function: Callable[[], Optional[float]]):
+        super().__init__(name, documentation)
+        self.function = function
+        
+    def _samples(self) -> List[str]:
+        value = self.function()
+        return [] if value is None else [f"{self.name} {_format_value(value)}"]
+
+class Histogram(_Metric):
+    """Distribution of observations in cumulative buckets, one series per label combination."""
+    
+    kind = "histogram"
+    
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series: Dict[Tuple[str, ...], List[float]] = {}  # bucket counts, then sum and count
+        
+    def observe(self, value: float, **labels):
+        """
+        Record an observation.
+        
+        Args:
+            value: Observed value
+            **labels: Label values of the series
+        """
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+            
+    def _samples(self) -> List[str]:
+        with self._lock:
+            series = [(key, list(values)) for key, values in self._series.items()]
+            
+        lines = []
+        for key, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{self._labels(key, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_format_value(values[-2])}")
+            lines.append(f"{self.name}_count{self._labels(key)} {values[-1]}")
+        return lines
+
+class MetricsRegistry:
+    """Collection of metrics rendered together in the Prometheus text format."""
+    
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        
+    def _register(self, metric: _Metric) -> Any:
+        with self._lock:
+            # Registering the same name twice returns the existing metric
+            return self._metrics.setdefault(metric.name, metric)
+            
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, label_names))
+        
+    def histogram(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, label_names, buckets))
+        
+    def gauge(self, name: str, documentation: str, function: Callable[[], Optional[float]]) -> Gauge:
+        with self._lock:
+            # Gauges are re-registered when the pipeline is rebuilt, the newest function wins
+            self._metrics[name] = Gauge(name, documentation, function)
+            return self._metrics[name]
+            
+    def render(self) -> str:
+        """
+        Render all metrics.
+        
+        Returns:
+            Metrics in the Prometheus text exposition format
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+# Registry exposed on /metrics
+registry = MetricsRegistry()
+
+node_duration = registry.histogram(
+    "rag_node_duration_seconds", "Wall time of a workflow node.", ["node"])
+llm_tokens = registry.histogram(
+    "rag_llm_tokens", "Tokens per LLM call.", ["node", "kind"], TOKEN_BUCKETS)
+retrieval_duration = registry.histogram(
+    "rag_retrieval_duration_seconds", "Wall time of the retriever tool, search and packing.", ["mode"])
+retrieved_chunks = registry.histogram(
+    "rag_retrieved_chunks", "Chunks returned per retrieval.", ["mode"], COUNT_BUCKETS)
+graded_chunks = registry.counter(
+    "rag_graded_chunks_total", "Chunks graded one by one, by relevance.", ["relevant"])
+grade_decisions = registry.counter(
+    "rag_grade_decisions_total", "Routing decisions taken after relevance grading.", ["decision"])
+speculative_retrievals = registry.counter(
+    "rag_speculative_retrievals_total", "Retrievals started during the agent call, by outcome.", ["outcome"])
+query_rewrites = registry.histogram(
+    "rag_query_rewrites", "Query rewrites per request.", buckets=(0, 1, 2, 3, 5, 8))
+query_duration = registry.histogram(
+    "rag_query_duration_seconds", "Wall time of a query request.", ["endpoint", "cached"])
+
+class RequestMetrics(BaseCallbackHandler):
+    """
+    Metrics of a single workflow run.
+    
+    Node timings and routing decisions are recorded by the workflow; LLM
+    token usage is collected as a callback handler attached to the run.
+    Everything is added to the global histograms as it is recorded and kept
+    for the per-request breakdown.
+    """
+    
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.nodes: List[Dict[str, Any]] = []
+        self.tokens: Dict[str, Dict[str, int]] = {}  # node -> {"prompt", "completion"}
+        self.retrieved_chunks = 0
+        self.decisions: List[str] = []
+        self.rewrites = 0
+        self._llm_nodes: Dict[UUID, str] = {}
+        self._finished = False
+        self._lock = threading.Lock()
+        
+    def record_node(self, node: str, seconds: float, state: Dict[str, Any], update: Any):
+        """
+        Record a finished node.
+        
+        Args:
+            node: Node name
+            seconds: Wall time of the node
+            state: State the node was run on
+            update: State update returned by the node
+        """
+        node_duration.observe(seconds, node=node)
+        update = update if isinstance(update, dict) else {}
+        
+        if node == "grade":
+            # The grade node keeps the relevant chunks of the latest retrieval
+            graded = getattr(state["messages"][-1], "artifact", None) or [None]
+            relevant = len(update.get("documents", []))
+            graded_chunks.inc(relevant, relevant="yes")
+            graded_chunks.inc(len(graded) - relevant, relevant="no")
+            
+        with self._lock:
+            self.nodes.append({"node": node, "seconds": round(seconds, 6)})
+            if node == "retrieve":
+                self.retrieved_chunks += sum(
+                    len(message.artifact or []) for message in update.get("messages", [])
+                    if isinstance(message, ToolMessage)
+                )
+            elif node == "rewrite":
+                self.rewrites += 1
+                
+    def node_seconds(self, node: str) -> Optional[float]:
+        """
+        Get the wall time of the latest run of a node.
+        
+        Args:
+            node: Node name
+            
+        Returns:
+            Seconds, or None if the node has not finished yet
+        """
+        with self._lock:
+            for entry in reversed(self.nodes):
+                if entry["node"] == node:
+                    return entry["seconds"]
+        return None
+        
+    def record_decision(self, decision: str):
+        """
+        Record the routing decision taken after grading.
+        
+        Args:
+            decision: Next node, "generate", "rewrite" or "best_effort"
+        """
+        grade_decisions.inc(decision=decision)
+        with self._lock:
+            self.decisions.append(decision)
+            
+    def finish(self):
+        """Record the per-request totals once the run is over."""
+        with self._lock:
+            if self._finished:
+                return
+            self._finished = True
+        query_rewrites.observe(self.rewrites)
+        
+    def breakdown(self) -> Dict[str, Any]:
+        """
+        Summarize the run for the query response.
+        
+        Returns:
+            Dictionary with total and per-node wall time, token usage, retrieved
+            chunk count, grade decisions and rewrite count
+        """
+        with self._lock:
+            per_node: Dict[str, float] = {}
+            for entry in self.nodes:
+                per_node[entry["node"]] = round(per_node.get(entry["node"], 0.0) + entry["seconds"], 6)
+            return {
+                "total_seconds": round(time.perf_counter() - self.started, 6),
+                "steps": list(self.nodes),
+                "node_seconds": per_node,
+                "tokens": {node: dict(counts) for node, counts in self.tokens.items()},
+                "retrieved_chunks": self.retrieved_chunks,
+                "grade_decisions": list(self.decisions),
+                "rewrites": self.rewrites,
+            }
+            
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *,
+                            run_id: UUID, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any):
+        with self._lock:
+            self._llm_nodes[run_id] = (metadata or {}).get("langgraph_node", "")
+            
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *,
+                     run_id: UUID, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any):
+        with self._lock:
+            self._llm_nodes[run_id] = (metadata or {}).get("langgraph_node", "")
+            
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        with self._lock:
+            node = self._llm_nodes.pop(run_id, "")
+            
+        prompt, completion = _token_usage(response)
+        if prompt is None:
+            return
+            
+        llm_tokens.observe(prompt, node=node, kind="prompt")
+        llm_tokens.observe(completion, node=node, kind="completion")
+        with self._lock:
+            counts = self.tokens.setdefault(node, {"prompt": 0, "completion": 0})
+            counts["prompt"] += prompt
+            counts["completion"] += completion
+            
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        with self._lock:
+            self._llm_nodes.pop(run_id, None)
+
+def _token_usage(response: LLMResult) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Read the token usage of an LLM call.
+    
+    Args:
+        response: Result passed to on_llm_end
+        
+    Returns:
+        Prompt and completion tokens, or (None, None) if the model did not report usage
+    """
+    prompt = completion = 0
+    found = False
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                prompt += usage.get("input_tokens", 0)
+                completion += usage.get("output_tokens", 0)
+                found = True
+                
+    if not found:
+        usage = (response.llm_output or {}).get("token_usage")
+        if not usage:
+            return None, None
+        prompt, completion = usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+        
+    return prompt, completion
@@ -0,0 +1,447 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Set, Tuple
+from components.answer_cache import SemanticAnswerCache
+from components.document_loader import DocumentLoader
+from components.embeddings import EmbeddingManager
+from components.retriever import RetrieverToolFactory
+from components.vectorstore import VectorStoreManager
+from core.config import (
+    DEFAULT_URLS, VECTOR_DB_COLLECTION, VECTOR_DB_PERSIST_DIR, REBUILD_DRAIN_TIMEOUT,
+    VECTOR_MMAP_DIR, VECTOR_MMAP_EXPORT,
+    ANSWER_CACHE_ENABLED, ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_TTL, ANSWER_CACHE_MAX_ENTRIES,
+)
+from graph.workflow import RAGWorkflow
+
+logger = logging.getLogger(__name__)
+
+# The index alternates between two collections: queries read the active one
+# while a rebuild syncs the other, which is then swapped in
+SLOTS = ("blue", "green")
+
+class RAGPipeline:
+    """
+    A fully built pipeline: document loader, index, retriever tool and compiled workflow.
+    
+    A pipeline is never modified after it is built; a rebuild builds a new
+    one and swaps it in. Queries hold the pipeline they run on (see
+    PipelineManager.acquire), so a rebuild knows when an old index is no
+    longer read.
+    """
+    
+    def __init__(self, slot: str, document_loader: DocumentLoader, vector_store_manager: VectorStoreManager,
+                 retriever_factory: RetrieverToolFactory, workflow: RAGWorkflow):
+        """
+        Initialize the pipeline.
+        
+        Args:
+            slot: Index slot ("blue" or "green") the pipeline reads
+            document_loader: Loader the index was built with
+            vector_store_manager: Vector store manager of the slot
+            retriever_factory: Factory of the retriever tool
+            workflow: Compiled workflow using the retriever tool
+        """
+        self.slot = slot
+        self.document_loader = document_loader
+        self.vector_store_manager = vector_store_manager
+        self.retriever_factory = retriever_factory
+        self.workflow = workflow
+        self._users = 0
+        self._idle = threading.Condition()
+        
+    @contextmanager
+    def use(self):
+        """Mark the pipeline as in use by a query for the duration of the with block"""
+        self._hold()
+        try:
+            yield self
+        finally:
+            self._release()
+            
+    def _hold(self):
+        """Count a query using the pipeline"""
+        with self._idle:
+            self._users += 1
+            
+    def _release(self):
+        """Count a query no longer using the pipeline, waking up wait_idle once none is left"""
+        with self._idle:
+            self._users -= 1
+            if not self._users:
+                self._idle.notify_all()
+                    
+    def wait_idle(self, timeout: float) -> bool:
+        """
+        Wait until no query uses the pipeline anymore.
+        
+        Args:
+            timeout: Maximum seconds to wait
+            
+        Returns:
+            True if the pipeline is idle, False if the wait timed out
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._users, timeout)
+
+class RebuildInProgress(Exception):
+    """Raised when a rebuild is requested while a different one is running."""
+    
+    def __init__(self, job: "RebuildJob"):
+        super().__init__("An index rebuild is already running")
+        self.job = job
+
+class RebuildJob:
+    """Progress and outcome of one background rebuild."""
+    
+    def __init__(self, urls: Optional[List[str]], loader: Optional[DocumentLoader] = None,
+                 embedding_manager: Optional[EmbeddingManager] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.urls = list(dict.fromkeys(urls)) if urls is not None else None
+        self.loader = loader
+        self.embedding_manager = embedding_manager
+        self.state = "running"  # "running", "succeeded" or "failed"
+        self.stage = "starting"
+        self.slot = None
+        self.summary = None
+        self.error = None
+        self.started_at = time.time()
+        self.finished_at = None
+        self.vector_store_manager = None
+        self._done = threading.Event()
+        
+    @property
+    def done(self) -> bool:
+        """Whether the job has finished, successfully or not"""
+        return self._done.is_set()
+        
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for the job to finish.
+        
+        Args:
+            timeout: Maximum seconds to wait, None to wait indefinitely
+            
+        Returns:
+            True if the job finished successfully
+        """
+        self._done.wait(timeout)
+        return self.state == "succeeded"
+        
+    def finish(self, state: str, error: Optional[str] = None):
+        """Record the outcome of the job and wake up waiting requests"""
+        self.state = state
+        self.stage = "done" if state == "succeeded" else "failed"
+        self.error = error
+        self.finished_at = time.time()
+        self.vector_store_manager = None
+        self._done.set()
+        
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Describe the job for the status endpoint.
+        
+        Returns:
+            Dictionary with the job ID, state, current stage, target slot,
+            number of URLs, chunks indexed so far, timings, sync summary and error
+        """
+        manager = self.vector_store_manager
+        return {
+            "id": self.id,
+            "state": self.state,
+            "stage": self.stage,
+            "slot": self.slot,
+            "urls": len(self.urls) if self.urls is not None else None,
+            "indexed_chunks": manager.count if manager is not None else None,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed_seconds": round((self.finished_at or time.time()) - self.started_at, 3),
+            "summary": self.summary,
+            "error": self.error,
+        }
+
+class PipelineManager:
+    """
+    Builds pipelines in the background and swaps them in atomically.
+    
+    Queries always run on the current pipeline, which is replaced by a
+    single reference assignment once a rebuild has finished, so re-indexing
+    causes no query downtime and a query never sees a half-built pipeline.
+    The index lives in two slots: a rebuild incrementally syncs the slot
+    that is not active (after the queries still reading it have finished),
+    builds a workflow on it and makes it the active one. At most one rebuild
+    runs at a time; requesting the same rebuild again joins the running job.
+    
+    With a read-only index (the mmap backend), a rebuild does not sync
+    anything: it opens the latest export, written by the process that
+    indexes with export_directory set.
+    """
+    
+    def __init__(self,
+                 persist_directory: Optional[str] = VECTOR_DB_PERSIST_DIR,
+                 collection_name: str = VECTOR_DB_COLLECTION,
+                 drain_timeout: float = REBUILD_DRAIN_TIMEOUT,
+                 answer_cache_enabled: bool = ANSWER_CACHE_ENABLED,
+                 export_directory: Optional[str] = VECTOR_MMAP_DIR if VECTOR_MMAP_EXPORT else None):
+        """
+        Initialize the pipeline manager.
+        
+        Args:
+            persist_directory: Directory of the persistent index, or None to keep it in memory
+            collection_name: Base name of the vector store collections
+            drain_timeout: Seconds a rebuild waits for queries still reading the slot it syncs
+            answer_cache_enabled: Whether to keep a semantic answer cache across pipelines
+            export_directory: Directory each rebuilt index is exported to for memory-mapped
+                use by other processes, or None to not export
+        """
+        self.persist_directory = persist_directory or None
+        self.collection_name = collection_name
+        self.drain_timeout = drain_timeout
+        self.answer_cache_enabled = answer_cache_enabled
+        self.export_directory = export_directory
+        self.answer_cache: Optional[SemanticAnswerCache] = None
+        self._current: Optional[RAGPipeline] = None
+        self._retired: Optional[RAGPipeline] = None
+        self._job: Optional[RebuildJob] = None
+        self._lock = threading.Lock()
+        
+    @property
+    def current(self) -> Optional[RAGPipeline]:
+        """The pipeline new queries run on, or None before the first build"""
+        return self._current
+        
+    def collection_for(self, slot: str) -> str:
+        """Get the collection name of a slot; the blue slot keeps the plain name"""
+        return self.collection_name if slot == SLOTS[0] else f"{self.collection_name}-{slot}"
+        
+    @property
+    def _slot_path(self) -> Optional[str]:
+        if not self.persist_directory:
+            return None
+        return os.path.join(self.persist_directory, f"{self.collection_name}.active")
+        
+    def _persisted_slot(self) -> str:
+        """Get the slot that was active when the process last swapped pipelines"""
+        path = self._slot_path
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                slot = f.read().strip()
+            if slot in SLOTS:
+                return slot
+        return SLOTS[0]
+        
+    def _persist_slot(self, slot: str):
+        """Record the active slot, replacing the previous file atomically"""
+        path = self._slot_path
+        if not path:
+            return
+        os.makedirs(self.persist_directory, exist_ok=True)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            f.write(slot)
+        os.replace(f"{path}.tmp", path)
+        
+    def start_rebuild(self, urls: Optional[List[str]] = None, loader: Optional[DocumentLoader] = None,
+                      embedding_manager: Optional[EmbeddingManager] = None) -> Tuple[RebuildJob, bool]:
+        """
+        Start rebuilding the pipeline in the background.
+        
+        Without URLs, the first build opens the persisted index if there is
+        one; otherwise the index is synced with the URLs (or the default URLs).
+        
+        Args:
+            urls: Source URLs the index should contain
+            loader: Document loader to use instead of the current one
+            embedding_manager: Embedding manager to use instead of the current one
+            
+        Returns:
+            The rebuild job and whether it was started by this call (False when
+            the same rebuild was already running)
+            
+        Raises:
+            RebuildInProgress: If a rebuild with different URLs is running
+        """
+        with self._lock:
+            job = self._job
+            if job is not None and not job.done:
+                if urls is None or job.urls == list(dict.fromkeys(urls)):
+                    return job, False
+                raise RebuildInProgress(job)
+                
+            job = self._job = RebuildJob(urls, loader, embedding_manager)
+            
+        threading.Thread(target=self._run, args=(job,), name=f"rebuild-{job.id}", daemon=True).start()
+        return job, True
+        
+    @contextmanager
+    def acquire(self):
+        """
+        Use the current pipeline for the duration of the with block.
+        
+        The pipeline is read and marked in use under the swap lock, so a
+        rebuild either sees the query as a user of the pipeline it retires
+        or the query runs on the pipeline swapped in. Call it once the query
+        is admitted, so queries waiting in the admission queue do not hold
+        the pipeline they would have started on.
+        
+        Yields:
+            Current pipeline, or None before the first build
+        """
+        with self._lock:
+            pipeline = self._current
+            if pipeline is not None:
+                pipeline._hold()
+        try:
+            yield pipeline
+        finally:
+            if pipeline is not None:
+                pipeline._release()
+                
+    def ensure_ready(self) -> Optional[RAGPipeline]:
+        """
+        Get the current pipeline, building it first if there is none yet.
+        
+        Returns:
+            Current pipeline, or None if the build failed
+        """
+        pipeline = self._current
+        if pipeline is not None:
+            return pipeline
+            
+        try:
+            job, _ = self.start_rebuild()
+        except RebuildInProgress as e:
+            job = e.job
+        job.wait()
+        return self._current
+        
+    def status(self) -> Dict[str, Any]:
+        """
+        Get the state of the current pipeline and of the latest rebuild.
+        
+        Returns:
+            Dictionary with readiness, active slot, indexed chunks and the latest job
+        """
+        pipeline = self._current
+        job = self._job
+        return {
+            "ready": pipeline is not None,
+            "active_slot": pipeline.slot if pipeline else None,
+            "indexed_chunks": pipeline.vector_store_manager.count if pipeline else None,
+            "rebuilding": job is not None and not job.done,
+            "job": job.to_dict() if job else None,
+        }
+        
+    def _run(self, job: RebuildJob):
+        """Run a rebuild job on its background thread"""
+        try:
+            self._swap(self._build(job))
+            job.finish("succeeded")
+            logger.info(f"Rebuild {job.id} finished in {time.time() - job.started_at:.1f}s, "
+                        f"slot {job.slot} is active")
+        except Exception as e:
+            logger.error(f"Rebuild {job.id} failed: {e}")
+            job.finish("failed", str(e))
+            
+    def _build(self, job: RebuildJob) -> RAGPipeline:
+        """
+        Build a pipeline on the inactive slot.
+        
+        Args:
+            job: Job to report progress to
+            
+        Returns:
+            New pipeline, not yet swapped in
+        """
+        current = self._current
+        loader = job.loader or (current.document_loader if current else DocumentLoader())
+        embedding_manager = job.embedding_manager or (
+            current.vector_store_manager.embedding_manager if current else EmbeddingManager())
+            
+        if current is None:
+            slot = self._persisted_slot()
+        else:
+            slot = SLOTS[1 - SLOTS.index(current.slot)]
+        job.slot = slot
+        
+        # The slot to sync may still be read by queries that started before the last swap
+        retired = self._retired
+        if retired is not None and retired.slot == slot:
+            job.stage = "draining"
+            if not retired.wait_idle(self.drain_timeout):
+                logger.warning(f"Queries still read slot {slot} after {self.drain_timeout}s, syncing it anyway")
+            self._retired = None
+            
+        job.stage = "indexing"
+        vector_store_manager = VectorStoreManager(
+            collection_name=self.collection_for(slot),
+            embedding_manager=embedding_manager,
+            persist_directory=self.persist_directory,
+            chunk_size=loader.chunk_size,
+            chunk_overlap=loader.chunk_overlap,
+        )
+        job.vector_store_manager = vector_store_manager
+        
+        if vector_store_manager.read_only:
+            # The sources are synced by the process writing the exports
+            if not vector_store_manager.load_existing():
+                raise RuntimeError(f"No index export found in {vector_store_manager.mmap_directory}")
+            logger.info(f"Opened index export {vector_store_manager.backend.path} with "
+                        f"{vector_store_manager.count} chunks (slot {slot})")
+            job.summary = {"opened_chunks": vector_store_manager.count,
+                           "export": os.path.basename(vector_store_manager.backend.path)}
+        elif current is None and job.urls is None and vector_store_manager.load_existing():
+            logger.info(f"Opened persisted index with {vector_store_manager.count} chunks (slot {slot})")
+            job.summary = {"opened_chunks": vector_store_manager.count}
+        else:
+            # Use default URLs if none provided; only new or changed pages are embedded
+            job.summary = vector_store_manager.sync_sources(loader, job.urls or DEFAULT_URLS)
+            
+        if self.export_directory and not vector_store_manager.read_only:
+            job.stage = "exporting"
+            job.summary["export"] = os.path.basename(vector_store_manager.export_mmap(self.export_directory))
+            
+        job.stage = "building workflow"
+        retriever_factory = RetrieverToolFactory(vector_store_manager=vector_store_manager)
+        workflow = RAGWorkflow(tools=[retriever_factory.create_retriever_tool()]).build_graph()
+        
+        if self.answer_cache_enabled and self.answer_cache is None:
+            self.answer_cache = SemanticAnswerCache(
+                embedding_manager,
+                threshold=ANSWER_CACHE_THRESHOLD,
+                ttl=ANSWER_CACHE_TTL,
+                max_entries=ANSWER_CACHE_MAX_ENTRIES,
+            )
+            
+        return RAGPipeline(slot, loader, vector_store_manager, retriever_factory, workflow)
+        
+    @staticmethod
+    def _chunk_ids(pipeline: RAGPipeline) -> Set[str]:
+        """Get the IDs of the chunks a pipeline's index holds"""
+        vector_store_manager = pipeline.vector_store_manager
+        if vector_store_manager.read_only:
+            # An opened export has no manifest, its chunks are listed by the index itself
+            return set(vector_store_manager.backend.get(include_text=False)["ids"])
+        return vector_store_manager.manifest.referenced_ids()
+        
+    def _swap(self, pipeline: RAGPipeline):
+        """
+        Make a newly built pipeline the current one.
+        
+        Args:
+            pipeline: Pipeline to swap in
+        """
+        with self._lock:
+            previous, self._current = self._current, pipeline
+            self._retired = previous
+        # Processes reading an export must not move the slot of the process writing it
+        if not pipeline.vector_store_manager.read_only:
+            self._persist_slot(pipeline.slot)
+        
+        # Answers are dropped from the cache when a chunk they used left the index
+        if previous is not None and self.answer_cache is not None:
+            removed = self._chunk_ids(previous) - self._chunk_ids(pipeline)
+            if removed:
+                self.answer_cache.invalidate_chunks(removed)
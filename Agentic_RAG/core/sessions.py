@@ -0,0 +1,143 @@
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+from core.state import UIState
+
+# Session IDs chosen by clients must look like the ones we hand out
+_VALID_SESSION_ID = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+class SessionStore:
+    """
+    Conversation state per browser session, bounded in count and memory.
+    
+    Each session owns a UIState, created on first use. Sessions idle for
+    longer than idle_timeout are evicted, and when the store holds more than
+    max_sessions sessions or more than max_bytes of history and debug
+    entries, the least recently used sessions are evicted first. Memory is
+    therefore proportional to the active sessions only. A session that is
+    still processing a query is never considered idle.
+    """
+    
+    def __init__(self,
+                 idle_timeout: float,
+                 max_sessions: int,
+                 max_bytes: int,
+                 state_factory: Callable[[], UIState] = UIState,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the session store.
+        
+        Args:
+            idle_timeout: Seconds after the last request before a session is evicted
+            max_sessions: Maximum number of sessions kept
+            max_bytes: Approximate memory cap for the state of all sessions
+            state_factory: Creates the state of a new session
+            clock: Time source, monotonic seconds
+        """
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.state_factory = state_factory
+        self.clock = clock
+        self.evicted = {"idle": 0, "capacity": 0}
+        self._sessions: "OrderedDict[str, Tuple[UIState, float]]" = OrderedDict()  # LRU order
+        self._lock = threading.Lock()
+        
+    @staticmethod
+    def new_session_id() -> str:
+        """Generate an unguessable session ID"""
+        return uuid.uuid4().hex
+        
+    @staticmethod
+    def is_valid_session_id(session_id: Optional[str]) -> bool:
+        """Whether a client-supplied session ID is well-formed"""
+        return bool(session_id) and _VALID_SESSION_ID.match(session_id) is not None
+        
+    def get(self, session_id: str) -> UIState:
+        """
+        Get the state of a session, creating it if needed, and mark it as used.
+        
+        Args:
+            session_id: ID of the session
+            
+        Returns:
+            UIState of the session
+        """
+        now = self.clock()
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            state = entry[0] if entry else self.state_factory()
+            self._sessions[session_id] = (state, now)
+            self._evict(now, keep=session_id)
+            return state
+            
+    def resume(self, session_id: Optional[str]) -> Optional[UIState]:
+        """
+        Get the state of an existing session and mark it as used.
+        
+        Args:
+            session_id: ID of the session
+            
+        Returns:
+            UIState of the session, or None if the store does not hold it
+        """
+        now = self.clock()
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            if entry is None:
+                return None
+            self._sessions[session_id] = (entry[0], now)
+            self._evict(now, keep=session_id)
+            return entry[0]
+            
+    def peek(self, session_id: Optional[str]) -> Optional[UIState]:
+        """Get the state of a session without creating or touching it"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            return entry[0] if entry else None
+            
+    def drop(self, session_id: str):
+        """Forget a session"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            
+    def __len__(self) -> int:
+        return len(self._sessions)
+        
+    def stats(self) -> Dict[str, Any]:
+        """Get the number of sessions, their approximate memory and evictions so far"""
+        with self._lock:
+            states = [state for state, _ in self._sessions.values()]
+            evicted = dict(self.evicted)
+        return {
+            "sessions": len(states),
+            "bytes": sum(state.size for state in states),
+            "evicted": evicted,
+        }
+        
+    def _evict(self, now: float, keep: str):
+        """Evict idle sessions, then least recently used ones until the store fits its caps"""
+        # Sessions are in order of last use, so idle ones are at the front
+        while self._sessions:
+            session_id, (state, last_used) = next(iter(self._sessions.items()))
+            if now - last_used < self.idle_timeout or session_id == keep:
+                break
+            if state.processing:
+                # A long-running query keeps its session alive
+                self._sessions.move_to_end(session_id)
+                self._sessions[session_id] = (state, now)
+                continue
+            del self._sessions[session_id]
+            self.evicted["idle"] += 1
+            
+        total = sum(state.size for state, _ in self._sessions.values())
+        while len(self._sessions) > 1 and (len(self._sessions) > self.max_sessions or total > self.max_bytes):
+            session_id, (state, _) = next(iter(self._sessions.items()))
+            if session_id == keep:
+                break
+            del self._sessions[session_id]
+            total -= state.size
+            self.evicted["capacity"] += 1
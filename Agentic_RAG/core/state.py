@@ -1,7 +1,12 @@
-from typing import Annotated, Sequence
+import threading
+import uuid
+from collections import deque
+from itertools import islice
+from typing import Annotated, Any, Dict, List, Optional, Sequence, Tuple
 from typing_extensions import TypedDict
 from langchain_core.messages import BaseMessage
 from langgraph.graph.message import add_messages
+from core.config import UI_HISTORY_MAX_MESSAGES, UI_HISTORY_PAGE_SIZE, UI_DEBUG_MAX_ENTRIES, UI_DEBUG_MAX_CHARS
 
 class AgentState(TypedDict):
     """
@@ -12,33 +17,209 @@ class AgentState(TypedDict):
     """
     messages: Annotated[Sequence[BaseMessage], add_messages]
     tools: list  # List of tools available to the agent
+    documents: list  # Retrieved chunks that passed relevance grading
+    context_relevant: bool  # Verdict of the fused grade_and_generate node
+    rewrite_count: int  # Number of query rewrites so far
+    max_rewrites: int  # Rewrites allowed before answering from the best chunks seen
+    deadline: float  # Wall-clock time (time.time()) after which no more rewrites start
+
+class RingLog:
+    """
+    Append-only log keeping only its most recent entries.
+    
+    Every entry gets an increasing ID that serves as a pagination cursor;
+    IDs are never reused, also not after clear(), so a cursor handed out
+    earlier always refers to the same position in the log. Not thread-safe,
+    the owner must serialize access.
+    """
+    
+    def __init__(self, max_entries: int):
+        """
+        Initialize the log.
+        
+        Args:
+            max_entries: Number of entries kept; older entries are dropped
+        """
+        self._entries = deque(maxlen=max_entries)
+        self._sizes = deque(maxlen=max_entries)
+        self.size = 0  # Sum of the sizes of the entries in the log
+        self._next_id = 1
+        self._dropped_through = 0  # Highest ID that is no longer available
+        self._clears = 0
+        
+    @property
+    def version(self) -> Tuple[int, int]:
+        """Changes whenever an entry is added or the log is cleared"""
+        return self._clears, self._next_id
+        
+    def append(self, entry: Dict[str, Any], size: int = 0) -> int:
+        """
+        Add an entry, dropping the oldest one when the log is full.
+        
+        Args:
+            entry: Entry to add; its "id" is set by the log
+            size: Approximate size of the entry, added to the size of the log
+            
+        Returns:
+            ID of the entry
+        """
+        if len(self._entries) == self._entries.maxlen:
+            self._dropped_through = self._entries[0]["id"]
+            self.size -= self._sizes[0]
+        entry["id"] = self._next_id
+        self._next_id += 1
+        self._entries.append(entry)
+        self._sizes.append(size)
+        self.size += size
+        return entry["id"]
+        
+    def clear(self):
+        """Drop all entries, keeping the ID sequence"""
+        self._entries.clear()
+        self._sizes.clear()
+        self.size = 0
+        self._dropped_through = self._next_id - 1
+        self._clears += 1
+        
+    def entries(self) -> List[Dict[str, Any]]:
+        """Get all entries still in the log, oldest first"""
+        return list(self._entries)
+        
+    def page(self, since: Optional[int] = None, limit: int = 50) -> Dict[str, Any]:
+        """
+        Get a page of entries.
+        
+        Args:
+            since: Cursor of the last entry already seen, or None for the latest entries
+            limit: Maximum number of entries to return
+            
+        Returns:
+            Dictionary with the entries (oldest first), the cursor to pass as
+            since for the next page, whether more entries follow, and whether
+            entries after since were dropped before they could be read
+        """
+        limit = max(limit, 1)
+        if since is None:
+            entries = list(islice(self._entries, max(len(self._entries) - limit, 0), None))
+            return {
+                "entries": entries,
+                "cursor": self._next_id - 1,
+                "has_more": False,
+                "truncated": False,
+            }
+            
+        # IDs are consecutive, so the position of since follows from the first ID
+        first_id = self._entries[0]["id"] if self._entries else self._next_id
+        start = max(since + 1 - first_id, 0)
+        entries = list(islice(self._entries, start, start + limit))
+        return {
+            "entries": entries,
+            "cursor": entries[-1]["id"] if entries else max(since, self._dropped_through),
+            "has_more": start + limit < len(self._entries),
+            "truncated": since < self._dropped_through,
+        }
+
+# Rough per-entry memory of the entry dict and its keys, on top of the content
+_ENTRY_OVERHEAD = 200
+
+def _render(content: Any, max_chars: int) -> str:
+    """Render debug content as text of at most max_chars characters"""
+    text = content if isinstance(content, str) else str(content)
+    if len(text) > max_chars:
+        text = f"{text[:max_chars]}... [{len(text) - max_chars} more characters]"
+    return text
 
-# Additional state classes can be defined here if needed for UI state management
 class UIState:
-    """State management for the UI layer"""
-    def __init__(self):
-        self.current_step = None  # Current step in the workflow
-        self.processing = False   # Whether processing is ongoing
-        self.history = []         # Chat history
-        self.debug_info = []      # Debug information for each step
+    """
+    State management for the UI layer, safe to share between request threads
+    
+    Chat history and debug entries live in ring buffers of fixed size, so
+    memory stays flat however long the instance runs. Debug content is only
+    rendered to (truncated) text when it is read.
+    """
+    def __init__(self,
+                 max_messages: int = UI_HISTORY_MAX_MESSAGES,
+                 max_debug_entries: int = UI_DEBUG_MAX_ENTRIES,
+                 debug_max_chars: int = UI_DEBUG_MAX_CHARS):
+        self.current_step = None                    # Current step in the workflow
+        self._history = RingLog(max_messages)       # Chat history
+        self._debug = RingLog(max_debug_entries)    # Debug information for each step
+        self.debug_max_chars = debug_max_chars
+        self.instance_id = uuid.uuid4().hex[:8]     # Distinguishes cursors and ETags across restarts
+        self._active = 0                            # Number of requests being processed
+        self._lock = threading.Lock()
+        
+    @property
+    def processing(self):
+        """Whether processing is ongoing for at least one request"""
+        return self._active > 0
         
+    @property
+    def history_version(self):
+        """Changes whenever the chat history changes"""
+        with self._lock:
+            return self._history.version
+            
+    @property
+    def debug_version(self):
+        """Changes whenever debug information is added or cleared"""
+        with self._lock:
+            return self._debug.version
+            
+    @property
+    def size(self):
+        """Approximate memory held by the history and debug entries, in bytes"""
+        with self._lock:
+            return self._history.size + self._debug.size
+            
     def add_message(self, role, content):
         """Add a message to the chat history"""
-        self.history.append({"role": role, "content": content})
-        
+        with self._lock:
+            self._history.append({"role": role, "content": content}, _ENTRY_OVERHEAD + len(content))
+            
     def add_debug_info(self, step, content):
-        """Add debug information for a step"""
-        self.debug_info.append({"step": step, "content": content})
-        
+        """Add debug information for a step; content other than text is rendered when read"""
+        if isinstance(content, str):
+            content = _render(content, self.debug_max_chars)
+        # Unrendered content is counted at its rendered size
+        size = _ENTRY_OVERHEAD + (len(content) if isinstance(content, str) else self.debug_max_chars)
+        with self._lock:
+            self._debug.append({"step": step, "content": content}, size)
+            
     def clear_history(self):
         """Clear the chat history"""
-        self.history = []
-        self.debug_info = []
-        
+        with self._lock:
+            self._history.clear()
+            self._debug.clear()
+            
     def set_processing(self, processing):
-        """Set the processing state"""
-        self.processing = processing
-        
+        """Mark the start (True) or end (False) of processing a request"""
+        with self._lock:
+            self._active = max(self._active + (1 if processing else -1), 0)
+            
     def set_current_step(self, step):
         """Set the current step"""
-        self.current_step = step
\ No newline at end of file
+        self.current_step = step
+        
+    def get_history(self):
+        """Get a snapshot of the chat history kept in the buffer"""
+        with self._lock:
+            return [dict(message) for message in self._history.entries()]
+            
+    def history_page(self, since=None, limit=UI_HISTORY_PAGE_SIZE):
+        """Get a page of the chat history, see RingLog.page"""
+        with self._lock:
+            page = self._history.page(since, limit)
+        page["history"] = [dict(message) for message in page.pop("entries")]
+        return page
+        
+    def debug_page(self, since=None, limit=UI_HISTORY_PAGE_SIZE):
+        """Get a page of debug information with rendered content, see RingLog.page"""
+        with self._lock:
+            page = self._debug.page(since, limit)
+            # Render each entry once, replacing the raw node output it held
+            for entry in page["entries"]:
+                if not isinstance(entry["content"], str):
+                    entry["content"] = _render(entry["content"], self.debug_max_chars)
+        page["debug"] = [dict(entry) for entry in page.pop("entries")]
+        return page
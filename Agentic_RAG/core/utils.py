@@ -1,7 +1,9 @@
 import getpass
+import json
 import os
 import logging
 from typing import List, Dict, Any, Optional
+from core.config import STEP_CONTENT_MAX_CHARS
 
 # Configure logging
 logging.basicConfig(
@@ -90,4 +92,108 @@ def truncate_text(text: str, max_length: int = 300) -> str:
     if len(text) <= max_length:
         return text
         
-    return text[:max_length] + "..."
\ No newline at end of file
+    return text[:max_length] + "..."
+
+def chunk_sources(docs: List[Any]) -> List[Dict[str, Any]]:
+    """
+    Describe document chunks for API responses and the answer cache.
+    
+    Args:
+        docs: Document chunks
+        
+    Returns:
+        List of dictionaries with the chunk ID, source and content of each chunk
+    """
+    chunks = []
+    for doc in docs:
+        metadata = getattr(doc, "metadata", {})
+        chunks.append({
+            "chunk_id": metadata.get("chunk_id"),
+            "source": metadata.get("source", "Unknown source"),
+            "content": doc.page_content,
+        })
+        
+    return chunks
+
+def source_chunks(messages: List[Any]) -> List[Dict[str, Any]]:
+    """
+    Collect the retrieved chunks attached to tool messages.
+    
+    Args:
+        messages: Messages of a workflow run or update
+        
+    Returns:
+        List of dictionaries with the chunk ID, source and content of each chunk
+    """
+    chunks = []
+    for message in messages:
+        chunks.extend(chunk_sources(getattr(message, "artifact", None) or []))
+        
+    return chunks
+
+def message_text(message: Any) -> str:
+    """
+    Get the text of a message, describing tool calls when it has no content.
+    
+    Args:
+        message: Message of a workflow update, or a plain string
+        
+    Returns:
+        Message content, or the tool calls as name(arguments)
+    """
+    # The generate node returns the answer as a plain string
+    if isinstance(message, str):
+        return message
+        
+    content = getattr(message, "content", "")
+    if not isinstance(content, str):
+        content = json.dumps(content)
+    if content or not getattr(message, "tool_calls", None):
+        return content
+        
+    return "; ".join(f"{call['name']}({json.dumps(call['args'])})" for call in message.tool_calls)
+
+def step_summary(node: str, update: Any, seconds: Optional[float] = None,
+                 max_chars: int = STEP_CONTENT_MAX_CHARS) -> Dict[str, Any]:
+    """
+    Describe a workflow step compactly for API responses and the debug log.
+    
+    Instead of the whole state update, only the latest message is kept, its
+    content truncated to max_chars, and retrieved or selected chunks are
+    referenced by their IDs.
+    
+    Args:
+        node: Node name
+        update: State update returned by the node
+        seconds: Wall time of the node, if known
+        max_chars: Characters of content kept
+        
+    Returns:
+        Dictionary with the step name, duration in milliseconds, message type,
+        content, whether the content was truncated, and the chunk IDs
+    """
+    update = update if isinstance(update, dict) else {}
+    messages = update.get("messages") or []
+    documents = update.get("documents")
+    
+    if messages:
+        message_type = getattr(messages[-1], "type", None)
+        content = message_text(messages[-1])
+    elif documents is not None:
+        message_type = None
+        content = f"{len(documents)} chunks selected"
+    else:
+        message_type = None
+        content = ""
+        
+    if documents is None:
+        documents = [doc for message in messages for doc in getattr(message, "artifact", None) or []]
+        
+    return {
+        "step": node,
+        "duration_ms": round(seconds * 1000, 1) if seconds is not None else None,
+        "message_type": message_type,
+        "content": content[:max_chars],
+        "truncated": len(content) > max_chars,
+        "chunk_ids": [getattr(doc, "metadata", {}).get("chunk_id") for doc in documents],
+    }
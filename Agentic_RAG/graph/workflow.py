@@ -1,15 +1,54 @@
 import logging
-from typing import Dict, Any, List, Optional
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
 from langgraph.graph import END, StateGraph, START
 from langgraph.prebuilt import ToolNode, tools_condition
 from nodes.agent_node import agent
-from nodes.grade_node import grade_documents
+from nodes.grade_node import grade_documents, grade_chunks, route_after_grading
 from nodes.rewrite_node import rewrite
 from nodes.generate_node import generate
+from nodes.best_effort_node import best_effort
+from nodes.grade_generate_node import grade_and_generate, route_after_grade_and_generate
+from components.bm25 import tokenize
+from core.config import (
+    GRADING_MODE, GRAPH_TOPOLOGY, MAX_REWRITES, REQUEST_DEADLINE_SECONDS, SPECULATIVE_RETRIEVAL,
+    SPECULATIVE_MATCH_THRESHOLD, QUERY_MAX_CONCURRENCY,
+)
+from core.metrics import RequestMetrics, speculative_retrievals
 from core.state import AgentState
+from core.utils import chunk_sources, message_text, source_chunks, step_summary
 
 logger = logging.getLogger(__name__)
 
+# Graph topologies: grade and generate in separate model calls, or in one
+TOPOLOGIES = ("standard", "fused")
+
+# Runs speculative retrievals; each query has at most one in flight
+_speculation_executor = ThreadPoolExecutor(max_workers=QUERY_MAX_CONCURRENCY,
+                                           thread_name_prefix="speculative-retrieval")
+
+def same_query(a: str, b: str, threshold: float = SPECULATIVE_MATCH_THRESHOLD) -> bool:
+    """
+    Check whether two retrieval queries are close enough to share a retrieval.
+    
+    Queries are compared as sets of words, ignoring case, punctuation and
+    word order, by their Jaccard similarity (shared words over all words).
+    
+    Args:
+        a: First query
+        b: Second query
+        threshold: Minimum similarity, 1.0 requiring the same words
+        
+    Returns:
+        True if the queries are similar enough
+    """
+    words_a, words_b = set(tokenize(a)), set(tokenize(b))
+    if not words_a or not words_b:
+        return words_a == words_b
+    return len(words_a & words_b) / len(words_a | words_b) >= threshold
+
 class RAGWorkflow:
     """
     Workflow for the RAG agent system.
@@ -19,14 +58,37 @@ class RAGWorkflow:
     and answer generation.
     """
     
-    def __init__(self, tools: Optional[List] = None):
+    def __init__(self, tools: Optional[List] = None, grading_mode: str = GRADING_MODE,
+                 max_rewrites: int = MAX_REWRITES, deadline_seconds: float = REQUEST_DEADLINE_SECONDS,
+                 speculative_retrieval: bool = SPECULATIVE_RETRIEVAL,
+                 speculative_match_threshold: float = SPECULATIVE_MATCH_THRESHOLD, topology: str = GRAPH_TOPOLOGY):
         """
         Initialize the RAG workflow.
         
         Args:
             tools: List of tools to use in the workflow (e.g., retriever tools)
+            grading_mode: "chunk" to grade retrieved chunks one by one and generate
+                from the relevant ones, "combined" to grade them all at once
+            max_rewrites: Default number of query rewrites allowed per request
+            deadline_seconds: Default seconds after which a request stops rewriting
+            speculative_retrieval: Whether to start retrieving for the question while the
+                agent decides whether to call the retriever tool
+            speculative_match_threshold: Minimum word overlap (see same_query) between the
+                agent's tool query and the question for the speculative result to be used
+            topology: "standard" to grade the context and generate the answer in separate
+                nodes, "fused" to get both from one grade_and_generate call (grading_mode
+                does not apply)
         """
+        if topology not in TOPOLOGIES:
+            raise ValueError(f"Unknown graph topology: {topology} (expected one of {', '.join(TOPOLOGIES)})")
+            
         self.tools = tools or []
+        self.grading_mode = grading_mode
+        self.max_rewrites = max_rewrites
+        self.deadline_seconds = deadline_seconds
+        self.speculative_retrieval = speculative_retrieval
+        self.speculative_match_threshold = speculative_match_threshold
+        self.topology = topology
         self.graph = None
         
     def build_graph(self):
@@ -45,11 +107,24 @@ class RAGWorkflow:
         retriever_tools = self.tools
         retrieve = ToolNode(retriever_tools)
         
-        # Define the nodes
-        workflow.add_node("agent", agent)           # Agent decides whether to use tools or answer directly
-        workflow.add_node("retrieve", retrieve)     # Document retrieval
-        workflow.add_node("rewrite", rewrite)       # Query reformulation
-        workflow.add_node("generate", generate)     # Answer generation
+        # Define the nodes, each timed into the request metrics
+        nodes = {
+            "agent": agent,              # Agent decides whether to use tools or answer directly
+            "retrieve": retrieve,        # Document retrieval
+            "rewrite": rewrite,          # Query reformulation
+            "generate": generate,        # Answer generation
+            "best_effort": best_effort,  # Best chunks seen once the budget is exhausted
+        }
+        if self.topology == "fused":
+            nodes["grade_and_generate"] = grade_and_generate  # Relevance verdict and answer in one call
+        elif self.grading_mode == "chunk":
+            nodes["grade"] = grade_chunks  # Per-chunk relevance filtering
+        if self.speculative_retrieval and len(retriever_tools) == 1:
+            # Retrieval for the question overlaps the agent call
+            nodes["agent"] = self._speculative_agent(agent, retriever_tools[0], self.speculative_match_threshold)
+            nodes["retrieve"] = self._prefetched_retrieve(retrieve)
+        for name, node in nodes.items():
+            workflow.add_node(name, self._instrument_node(name, node))
         
         # Set up graph edges
         
@@ -70,20 +145,54 @@ class RAGWorkflow:
         )
         
         # After retrieval, decide if documents are relevant
-        workflow.add_conditional_edges(
-            "retrieve",
-            # Use grade_documents function to evaluate document relevance
-            grade_documents,
-            {
-                # If documents are relevant, generate an answer
-                "generate": "generate",
-                # If documents aren't relevant, rewrite the query and try again
-                "rewrite": "rewrite"
-            }
-        )
+        if self.topology == "fused":
+            # Grade the context and answer from it in one call
+            workflow.add_edge("retrieve", "grade_and_generate")
+            workflow.add_conditional_edges(
+                "grade_and_generate",
+                self._instrument_router(route_after_grade_and_generate),
+                {
+                    # If the context is relevant, the answer has been generated already
+                    "generate": END,
+                    # If it isn't relevant, rewrite the query and try again
+                    "rewrite": "rewrite",
+                    # If the request budget is exhausted, answer from the best chunks seen
+                    "best_effort": "best_effort"
+                }
+            )
+        elif self.grading_mode == "chunk":
+            # Grade each chunk, then generate from the relevant ones
+            workflow.add_edge("retrieve", "grade")
+            workflow.add_conditional_edges(
+                "grade",
+                self._instrument_router(route_after_grading),
+                {
+                    # If any chunk is relevant, generate an answer from those chunks
+                    "generate": "generate",
+                    # If no chunk is relevant, rewrite the query and try again
+                    "rewrite": "rewrite",
+                    # If the request budget is exhausted, answer from the best chunks seen
+                    "best_effort": "best_effort"
+                }
+            )
+        else:
+            workflow.add_conditional_edges(
+                "retrieve",
+                # Use grade_documents function to evaluate document relevance
+                self._instrument_router(grade_documents),
+                {
+                    # If documents are relevant, generate an answer
+                    "generate": "generate",
+                    # If documents aren't relevant, rewrite the query and try again
+                    "rewrite": "rewrite",
+                    # If the request budget is exhausted, answer from the best chunks seen
+                    "best_effort": "best_effort"
+                }
+            )
         
         # Connect generate node to end of workflow
         workflow.add_edge("generate", END)
+        workflow.add_edge("best_effort", "generate")
         
         # Connect rewrite node back to agent to restart the process with improved query
         workflow.add_edge("rewrite", "agent")
@@ -94,12 +203,165 @@ class RAGWorkflow:
         
         return self
         
-    def invoke(self, input_dict: Dict[str, Any]) -> Dict[str, Any]:
+    @staticmethod
+    def _request_metrics(config: RunnableConfig) -> RequestMetrics:
+        """
+        Get the metrics of the run a node belongs to.
+        
+        Args:
+            config: Configuration passed to the node
+            
+        Returns:
+            Request metrics of the run, or a detached instance for runs started
+            without one (its observations still reach the global histograms)
+        """
+        return config.get("configurable", {}).get("request_metrics") or RequestMetrics()
+        
+    def _instrument_node(self, name: str, node: Any) -> Callable:
+        """
+        Wrap a node to record its wall time and outcome.
+        
+        Args:
+            name: Node name
+            node: Node function or runnable
+            
+        Returns:
+            Node function taking the state and run configuration
+        """
+        def run(state, config: RunnableConfig):
+            start = time.perf_counter()
+            update = node.invoke(state, config) if isinstance(node, Runnable) else node(state)
+            self._request_metrics(config).record_node(name, time.perf_counter() - start, state, update)
+            return update
+            
+        return run
+        
+    @staticmethod
+    def _speculative_agent(agent_node: Callable, tool: Any, match_threshold: float) -> Runnable:
+        """
+        Wrap the agent node to retrieve for the latest question while the agent runs.
+        
+        The retriever tool is started on a background thread with the latest
+        message (the user's question, or the rewritten one) as query. When the
+        agent calls the tool with a similar enough query, the running retrieval
+        is handed to the retrieve node through the run configuration, in place
+        of retrieving for the agent's own wording; otherwise it is cancelled,
+        or its result dropped if it already started.
+        
+        Args:
+            agent_node: Agent node function
+            tool: Retriever tool the agent may call
+            match_threshold: Minimum similarity of the agent's query to the question
+            
+        Returns:
+            Node runnable taking the state and run configuration
+        """
+        def run(state, config: RunnableConfig):
+            question = message_text(state["messages"][-1])
+            speculation = _speculation_executor.submit(
+                tool.invoke, {"name": tool.name, "args": {"query": question}, "id": "speculative", "type": "tool_call"})
+            try:
+                update = agent_node(state)
+            except BaseException:
+                speculation.cancel()
+                raise
+                
+            calls = getattr(update["messages"][-1], "tool_calls", None) or []
+            prefetched = config.get("configurable", {}).get("prefetched_retrievals")
+            if (prefetched is not None and len(calls) == 1 and calls[0]["name"] == tool.name
+                    and same_query(str(calls[0]["args"].get("query", "")), question, match_threshold)):
+                prefetched[calls[0]["id"]] = speculation
+            else:
+                speculation.cancel()
+                speculative_retrievals.inc(outcome="discarded")
+            return update
+            
+        return RunnableLambda(run)
+        
+    @staticmethod
+    def _prefetched_retrieve(retrieve: Runnable) -> Runnable:
+        """
+        Wrap the retrieve node to use a retrieval the agent node started speculatively.
+        
+        Falls back to running the tool when there is no matching speculation,
+        when it has not started yet (its thread pool was busy) or when it failed.
+        
+        Args:
+            retrieve: Tool node running the retriever tool
+            
+        Returns:
+            Node runnable taking the state and run configuration
+        """
+        def run(state, config: RunnableConfig):
+            prefetched = config.get("configurable", {}).get("prefetched_retrievals") or {}
+            calls = getattr(state["messages"][-1], "tool_calls", None) or []
+            speculation: Optional[Future] = prefetched.pop(calls[0]["id"], None) if len(calls) == 1 else None
+            
+            if speculation is not None and not speculation.cancel():
+                try:
+                    message = speculation.result()
+                except Exception as e:
+                    logger.warning(f"Speculative retrieval failed, retrieving again: {e}")
+                else:
+                    speculative_retrievals.inc(outcome="used")
+                    return {"messages": [message.model_copy(update={"tool_call_id": calls[0]["id"]})]}
+                    
+            if speculation is not None:
+                speculative_retrievals.inc(outcome="missed")
+            return retrieve.invoke(state, config)
+            
+        return RunnableLambda(run)
+        
+    def _instrument_router(self, router: Callable) -> Callable:
+        """
+        Wrap a grading router to record its decisions.
+        
+        Args:
+            router: Conditional edge function
+            
+        Returns:
+            Conditional edge function taking the state and run configuration
+        """
+        def route(state, config: RunnableConfig):
+            decision = router(state)
+            self._request_metrics(config).record_decision(decision)
+            return decision
+            
+        return route
+        
+    def _prepare(self, enriched_input: Dict[str, Any], request_metrics: RequestMetrics) -> Dict[str, Any]:
+        """
+        Start the request budget and derive the run configuration from it.
+        
+        Args:
+            enriched_input: Workflow input, updated in place with the budget
+            request_metrics: Metrics collecting node timings and token usage of the run
+            
+        Returns:
+            Run configuration with a recursion limit covering the allowed rewrites
+        """
+        enriched_input.setdefault("rewrite_count", 0)
+        enriched_input.setdefault("max_rewrites", self.max_rewrites)
+        enriched_input.setdefault("deadline", time.time() + self.deadline_seconds)
+        
+        # agent, retrieve, grade (or grade_and_generate) and rewrite per loop, then
+        # best_effort and generate; combined grading routes without a node of its own
+        steps_per_loop = 3 if self.topology == "standard" and self.grading_mode != "chunk" else 4
+        return {
+            "recursion_limit": steps_per_loop * (enriched_input["max_rewrites"] + 1) + 3,
+            "callbacks": [request_metrics],
+            # prefetched_retrievals maps tool call IDs to speculative retrievals of the run
+            "configurable": {"request_metrics": request_metrics, "prefetched_retrievals": {}},
+        }
+        
+    def invoke(self, input_dict: Dict[str, Any],
+               request_metrics: Optional[RequestMetrics] = None) -> Dict[str, Any]:
         """
         Invoke the workflow with the given input.
         
         Args:
             input_dict: Dictionary containing input messages
+            request_metrics: Optional metrics to collect the run's timings into
             
         Returns:
             Output from the workflow
@@ -114,10 +376,15 @@ class RAGWorkflow:
         enriched_input = input_dict.copy()
         if "tools" not in enriched_input or not enriched_input["tools"]:
             enriched_input["tools"] = self.tools
+        request_metrics = request_metrics or RequestMetrics()
+        config = self._prepare(enriched_input, request_metrics)
         
-        return self.graph.invoke(enriched_input)
+        try:
+            return self.graph.invoke(enriched_input, config=config)
+        finally:
+            request_metrics.finish()
     
-    def stream(self, input_dict: Dict[str, Any]):
+    def stream(self, input_dict: Dict[str, Any], request_metrics: Optional[RequestMetrics] = None):
         """
         Stream the workflow execution with the given input.
         
@@ -126,6 +393,7 @@ class RAGWorkflow:
         
         Args:
             input_dict: Dictionary containing input messages
+            request_metrics: Optional metrics to collect the run's timings into
             
         Returns:
             Generator yielding outputs from each step of the workflow
@@ -139,9 +407,100 @@ class RAGWorkflow:
         # Add tools to the input
         enriched_input = input_dict.copy()
         enriched_input["tools"] = self.tools
+        request_metrics = request_metrics or RequestMetrics()
+        config = self._prepare(enriched_input, request_metrics)
         
-        yield from self.graph.stream(enriched_input)
-    
+        # Closing the generator early (a client disconnect) still records the run
+        try:
+            yield from self.graph.stream(enriched_input, config=config)
+        finally:
+            request_metrics.finish()
+        
+    def stream_events(self, input_dict: Dict[str, Any],
+                      request_metrics: Optional[RequestMetrics] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Stream node transitions and answer tokens as they happen.
+        
+        Events are (event, data) tuples:
+        - ("step", {"step", "status": "started"}) when a node starts
+        - ("step", {"step", "status": "completed", ...}) when it finishes, with
+          the compact step description of step_summary (duration, message type,
+          truncated content and chunk IDs)
+        - ("sources", {"step", "sources"}) after retrieve, grade and best_effort,
+          listing the chunks involved with their content; meant for the caller
+          to keep the answer's sources, not to be forwarded step by step
+        - ("answer", {"content"}) after generate, or grade_and_generate when it
+          answered, with the full answer text
+        - ("step", {"step": "grade_documents", "status": "completed", "decision"})
+          once the relevance grade has routed to generate or rewrite
+        - ("token", {"content"}) for each token produced by the generate node; the
+          fused grade_and_generate node produces structured output, its answer
+          is sent as a single token
+        
+        Args:
+            input_dict: Dictionary containing input messages
+            request_metrics: Optional metrics to collect the run's timings into
+            
+        Returns:
+            Generator yielding (event, data) tuples
+        """
+        if self.graph is None:
+            logger.error("Graph not built. Call build_graph() first.")
+            raise ValueError("Graph not built. Call build_graph() first.")
+            
+        logger.info("Streaming RAG workflow events")
+        
+        # Add tools to the input
+        enriched_input = input_dict.copy()
+        enriched_input["tools"] = self.tools
+        request_metrics = request_metrics or RequestMetrics()
+        config = self._prepare(enriched_input, request_metrics)
+        
+        last_completed = None
+        # Closing the generator early (a client disconnect) still records the run
+        try:
+            for mode, chunk in self.graph.stream(enriched_input, config=config,
+                                                 stream_mode=["debug", "updates", "messages"]):
+                if mode == "messages":
+                    # Only the answer is streamed token by token, not grader or agent output
+                    message, metadata = chunk
+                    if metadata.get("langgraph_node") == "generate" and message.content:
+                        yield "token", {"content": message.content}
+                        
+                elif mode == "debug":
+                    if chunk.get("type") != "task":
+                        continue
+                        
+                    node = chunk["payload"]["name"]
+                    
+                    # Relevance grading routes to generate or rewrite, its decision is the next node
+                    if (last_completed in ("retrieve", "grade", "grade_and_generate")
+                            and node in ("generate", "rewrite", "best_effort")):
+                        yield "step", {"step": "grade_documents", "status": "completed", "decision": node}
+                        
+                    yield "step", {"step": node, "status": "started"}
+                    
+                else:
+                    for node, value in chunk.items():
+                        last_completed = node
+                        data = step_summary(node, value, request_metrics.node_seconds(node))
+                        data["status"] = "completed"
+                        yield "step", data
+                        
+                        if node == "retrieve":
+                            yield "sources", {"step": node, "sources": source_chunks(value.get("messages", []))}
+                        elif node in ("grade", "best_effort"):
+                            yield "sources", {"step": node, "sources": chunk_sources(value.get("documents", []))}
+                        elif node == "generate":
+                            yield "answer", {"content": message_text(value["messages"][-1])}
+                        elif node == "grade_and_generate" and value.get("context_relevant"):
+                            answer = message_text(value["messages"][-1])
+                            yield "step", {"step": "grade_documents", "status": "completed", "decision": "generate"}
+                            yield "token", {"content": answer}
+                            yield "answer", {"content": answer}
+        finally:
+            request_metrics.finish()
+                    
     def get_graph_visualization(self) -> Optional[str]:
         """
         Generate a visualization of the workflow graph.
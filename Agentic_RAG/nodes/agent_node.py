@@ -1,6 +1,6 @@
 import logging
-from langchain_openai import ChatOpenAI
 from core.config import AGENT_MODEL
+from nodes.model_registry import model_registry
 
 logger = logging.getLogger(__name__)
 
@@ -21,16 +21,11 @@ def agent(state):
     # Get tools from state if available, otherwise use empty list
     tools = state["tools"]
     
-    # Create ChatOpenAI model
-    model = ChatOpenAI(
-        temperature=0, 
-        streaming=True, 
-        model=AGENT_MODEL
-    )
-    
-    # Bind tools if available
+    # Get the shared model, with tools bound if available
     if tools:
-        model = model.bind_tools(tools)
+        model = model_registry.tool_model(AGENT_MODEL, tools, temperature=0, streaming=True)
+    else:
+        model = model_registry.chat_model(AGENT_MODEL, temperature=0, streaming=True)
     
     # Invoke model
     response = model.invoke(messages)
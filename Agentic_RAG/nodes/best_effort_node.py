@@ -0,0 +1,59 @@
+import logging
+import time
+from langchain_core.documents import Document
+from langchain_core.messages import ToolMessage
+
+logger = logging.getLogger(__name__)
+
+def budget_exhausted(state) -> bool:
+    """
+    Checks whether the request may not start another rewrite.
+
+    Args:
+        state (messages): The current state with the request budget
+
+    Returns:
+        bool: True if the rewrite limit or the deadline has been reached
+    """
+    if state.get("rewrite_count", 0) >= state.get("max_rewrites", float("inf")):
+        logger.info("Rewrite limit reached")
+        return True
+    
+    if time.time() >= state.get("deadline", float("inf")):
+        logger.info("Request deadline reached")
+        return True
+    
+    return False
+
+def best_effort(state):
+    """
+    Selects the best chunks retrieved so far when the request budget runs out.
+
+    Every retrieval ranks its chunks by similarity, so the chunks are taken
+    rank by rank across all retrievals, without duplicates, up to the size
+    of one retrieval.
+
+    Args:
+        state (messages): The current state containing messages
+
+    Returns:
+        dict: The updated state with the selected chunks as documents
+    """
+    # The retriever tool attaches its documents as the message artifact
+    retrievals = []
+    for message in state["messages"]:
+        if isinstance(message, ToolMessage):
+            retrievals.append(message.artifact or [Document(page_content=message.content)])
+            
+    limit = max((len(docs) for docs in retrievals), default=0)
+    
+    selected = {}
+    for rank in range(limit):
+        for docs in retrievals:
+            if rank < len(docs) and len(selected) < limit:
+                doc = docs[rank]
+                selected.setdefault(doc.metadata.get("chunk_id", doc.page_content), doc)
+                
+    logger.info(f"Budget exhausted, answering from the best {len(selected)} chunks retrieved")
+    
+    return {"documents": list(selected.values())}
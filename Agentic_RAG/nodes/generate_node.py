@@ -1,8 +1,9 @@
 import logging
-from langchain import hub
-from langchain_openai import ChatOpenAI
 from langchain_core.output_parsers import StrOutputParser
+from components.context_packer import context_packer
 from core.config import GENERATOR_MODEL
+from nodes.model_registry import model_registry
+from nodes.prompt_registry import prompt_registry
 
 logger = logging.getLogger(__name__)
 
@@ -22,17 +23,19 @@ def generate(state):
     messages = state["messages"]
     question = messages[0].content
     last_message = messages[-1]
-    docs = last_message.content
     
-    # Load RAG prompt from hub
-    prompt = hub.pull("rlm/rag-prompt")
+    # Generate from the chunks that passed grading, merged and fitted to the
+    # token budget, or from the packed tool output if they were graded together
+    if state.get("documents"):
+        docs = context_packer.pack_text(state["documents"])
+    else:
+        docs = last_message.content
     
-    # Create ChatOpenAI model
-    llm = ChatOpenAI(
-        model_name=GENERATOR_MODEL, 
-        temperature=0, 
-        streaming=True
-    )
+    # Get the RAG prompt, loaded once at startup
+    prompt = prompt_registry.get("rag")
+    
+    # Get the shared model
+    llm = model_registry.chat_model(GENERATOR_MODEL, temperature=0, streaming=True)
     
     # Document formatting function for the prompt
     def format_docs(docs):
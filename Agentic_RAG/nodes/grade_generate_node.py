@@ -0,0 +1,71 @@
+import logging
+from typing import Literal
+from pydantic import BaseModel, Field
+from core.config import GRADE_GENERATE_MODEL
+from nodes.best_effort_node import budget_exhausted
+from nodes.model_registry import model_registry
+from nodes.prompt_registry import prompt_registry
+
+logger = logging.getLogger(__name__)
+
+class GradedAnswer(BaseModel):
+    """Relevance verdict on the retrieved context and the answer generated from it."""
+    binary_score: str = Field(description="Relevance score 'yes' or 'no'")
+    answer: str = Field(description="Concise answer to the question from the context, empty if the context is not relevant")
+
+def grade_and_generate(state):
+    """
+    Grades the retrieved context and answers the question from it in a single model call.
+    
+    Replaces the separate grade and generate calls of the happy path, saving
+    one model round trip. The answer is only kept when the context is graded
+    as relevant.
+    
+    Args:
+        state (messages): The current state containing messages
+        
+    Returns:
+        dict: The updated state with the relevance verdict, and the answer if relevant
+    """
+    logger.info("Grading context and generating answer")
+    
+    # Shared LLM with structured output validation
+    llm_with_tool = model_registry.structured_model(
+        GRADE_GENERATE_MODEL, GradedAnswer, temperature=0, streaming=True
+    )
+    
+    # Create chain
+    chain = prompt_registry.get("grade_generate") | llm_with_tool
+    
+    # Get messages and extract question and context
+    messages = state["messages"]
+    question = messages[0].content
+    docs = messages[-1].content
+    
+    # Invoke chain
+    result = chain.invoke({"question": question, "context": docs})
+    
+    # A relevant verdict without an answer is treated as not relevant
+    if result.binary_score == "yes" and result.answer.strip():
+        logger.info(f"Context graded as relevant, generated answer: {result.answer[:100]}...")
+        return {"messages": [result.answer], "context_relevant": True}
+        
+    logger.info("Context graded as not relevant")
+    return {"context_relevant": False}
+
+def route_after_grade_and_generate(state) -> Literal["generate", "rewrite", "best_effort"]:
+    """
+    Ends with the generated answer when the context was relevant, rewrites the
+    query otherwise, or answers from the best chunks seen once the request
+    budget is exhausted.
+    
+    Args:
+        state (messages): The current state with the relevance verdict
+        
+    Returns:
+        str: "generate" if the answer is already generated, "rewrite" or "best_effort" otherwise
+    """
+    if state.get("context_relevant"):
+        return "generate"
+    
+    return "best_effort" if budget_exhausted(state) else "rewrite"
@@ -1,9 +1,11 @@
 import logging
 from typing import Literal
+from langchain_core.documents import Document
 from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import PromptTemplate
-from core.config import GRADER_MODEL
+from core.config import GRADER_MODEL, GRADING_MAX_CONCURRENCY
+from nodes.best_effort_node import budget_exhausted
+from nodes.model_registry import model_registry
+from nodes.prompt_registry import prompt_registry
 
 logger = logging.getLogger(__name__)
 
@@ -11,7 +13,7 @@ class DocumentRelevanceGrade(BaseModel):
     """Binary score for relevance check."""
     binary_score: str = Field(description="Relevance score 'yes' or 'no'")
 
-def grade_documents(state) -> Literal["generate", "rewrite"]:
+def grade_documents(state) -> Literal["generate", "rewrite", "best_effort"]:
     """
     Determines whether the retrieved documents are relevant to the question.
 
@@ -23,21 +25,13 @@ def grade_documents(state) -> Literal["generate", "rewrite"]:
     """
     logger.info("Grading document relevance")
     
-    # LLM
-    model = ChatOpenAI(temperature=0, model=GRADER_MODEL, streaming=True)
-    
-    # LLM with structured output validation
-    llm_with_tool = model.with_structured_output(DocumentRelevanceGrade)
+    # Shared LLM with structured output validation
+    llm_with_tool = model_registry.structured_model(
+        GRADER_MODEL, DocumentRelevanceGrade, temperature=0, streaming=True
+    )
     
     # Prompt for document relevance grading
-    prompt = PromptTemplate(
-        template="""You are a grader assessing relevance of a retrieved document to a user question. \n 
-        Here is the retrieved document: \n\n {context} \n\n
-        Here is the user question: {question} \n
-        If the document contains keyword(s) or semantic meaning related to the user question, grade it as relevant. \n
-        Give a binary score 'yes' or 'no' score to indicate whether the document is relevant to the question.""",
-        input_variables=["context", "question"],
-    )
+    prompt = prompt_registry.get("grade")
     
     # Create chain
     chain = prompt | llm_with_tool
@@ -58,4 +52,67 @@ def grade_documents(state) -> Literal["generate", "rewrite"]:
         return "generate"
     else:
         logger.info("Document graded as not relevant")
-        return "rewrite"
\ No newline at end of file
+        return "best_effort" if budget_exhausted(state) else "rewrite"
+
+def grade_chunks(state):
+    """
+    Grades each retrieved chunk independently and keeps the relevant ones.
+
+    Chunks are graded in concurrent calls, so one irrelevant chunk neither
+    hides the relevant ones nor reaches the generator.
+
+    Args:
+        state (messages): The current state containing messages
+
+    Returns:
+        dict: The updated state with the relevant chunks as documents
+    """
+    # Shared LLM with structured output validation
+    llm_with_tool = model_registry.structured_model(
+        GRADER_MODEL, DocumentRelevanceGrade, temperature=0, streaming=True
+    )
+    
+    # Prompt for document relevance grading
+    prompt = prompt_registry.get("grade")
+    
+    # Create chain
+    chain = prompt | llm_with_tool
+    
+    # Get messages and extract question and retrieved chunks
+    messages = state["messages"]
+    question = messages[0].content
+    last_message = messages[-1]
+    
+    # The retriever tool attaches its documents as the message artifact;
+    # without it the whole tool output is graded as one chunk
+    docs = getattr(last_message, "artifact", None) or [Document(page_content=last_message.content)]
+    
+    logger.info(f"Grading relevance of {len(docs)} chunks")
+    
+    # Grade all chunks concurrently
+    scored_results = chain.batch(
+        [{"question": question, "context": doc.page_content} for doc in docs],
+        config={"max_concurrency": GRADING_MAX_CONCURRENCY},
+    )
+    relevant = [doc for doc, result in zip(docs, scored_results) if result.binary_score == "yes"]
+    
+    logger.info(f"{len(relevant)} of {len(docs)} chunks graded as relevant")
+    
+    return {"documents": relevant}
+
+def route_after_grading(state) -> Literal["generate", "rewrite", "best_effort"]:
+    """
+    Generates when at least one chunk is relevant, rewrites the query otherwise,
+    or answers from the best chunks seen once the request budget is exhausted.
+
+    Args:
+        state (messages): The current state with the graded documents
+
+    Returns:
+        str: A decision for whether to generate, rewrite or answer best effort
+    """
+    if state.get("documents"):
+        return "generate"
+    
+    logger.info("No chunk graded as relevant")
+    return "best_effort" if budget_exhausted(state) else "rewrite"
@@ -0,0 +1,129 @@
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+import httpx
+from langchain_openai import ChatOpenAI
+from core.config import LLM_MAX_CONNECTIONS
+
+logger = logging.getLogger(__name__)
+
+class ModelRegistry:
+    """
+    Registry of chat models shared by the workflow nodes.
+    
+    Each configured model is built once, together with its bind_tools and
+    with_structured_output variants, and reused across requests and threads.
+    All OpenAI models share one pair of HTTP clients, so connections are kept
+    alive and pooled instead of being opened per step.
+    """
+    
+    def __init__(self, factory: Optional[Callable[..., Any]] = None):
+        """
+        Initialize the model registry.
+        
+        Args:
+            factory: Optional callable building a chat model from a model name
+                and keyword arguments; defaults to ChatOpenAI on the shared pool
+        """
+        self._factory = factory
+        self._models: Dict[Tuple[Hashable, ...], Any] = {}
+        self._lock = threading.RLock()
+        self._http_client = None
+        self._http_async_client = None
+        
+    def _create_openai(self, model: str, **kwargs) -> ChatOpenAI:
+        """
+        Build a ChatOpenAI model on the shared connection pool.
+        
+        Args:
+            model: OpenAI model name
+            **kwargs: Additional ChatOpenAI arguments
+            
+        Returns:
+            ChatOpenAI instance
+        """
+        if self._http_client is None:
+            limits = httpx.Limits(max_connections=LLM_MAX_CONNECTIONS,
+                                  max_keepalive_connections=LLM_MAX_CONNECTIONS)
+            self._http_client = httpx.Client(limits=limits)
+            self._http_async_client = httpx.AsyncClient(limits=limits)
+            
+        # Streamed calls only report token usage when asked to
+        kwargs.setdefault("stream_usage", True)
+        return ChatOpenAI(
+            model=model,
+            http_client=self._http_client,
+            http_async_client=self._http_async_client,
+            **kwargs
+        )
+        
+    def _get_or_create(self, key: Tuple[Hashable, ...], create: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key not in self._models:
+                logger.info(f"Building model {key}")
+                self._models[key] = create()
+            return self._models[key]
+            
+    def chat_model(self, model: str, **kwargs) -> Any:
+        """
+        Get the shared chat model for a model name and settings.
+        
+        Args:
+            model: Model name
+            **kwargs: Model settings such as temperature and streaming
+            
+        Returns:
+            Chat model
+        """
+        key = ("chat", model, tuple(sorted(kwargs.items())))
+        factory = self._factory or self._create_openai
+        return self._get_or_create(key, lambda: factory(model, **kwargs))
+        
+    def tool_model(self, model: str, tools: List, **kwargs) -> Any:
+        """
+        Get the shared chat model with tools bound.
+        
+        Bindings only depend on the tool schemas, so they are keyed by tool
+        name and description and survive rebuilding the tool objects.
+        
+        Args:
+            model: Model name
+            tools: Tools to bind
+            **kwargs: Model settings such as temperature and streaming
+            
+        Returns:
+            Chat model with tools bound
+        """
+        tool_key = tuple((tool.name, tool.description) for tool in tools)
+        key = ("tools", model, tuple(sorted(kwargs.items())), tool_key)
+        return self._get_or_create(key, lambda: self.chat_model(model, **kwargs).bind_tools(tools))
+        
+    def structured_model(self, model: str, schema: type, **kwargs) -> Any:
+        """
+        Get the shared chat model producing structured output.
+        
+        Args:
+            model: Model name
+            schema: Pydantic model describing the output
+            **kwargs: Model settings such as temperature and streaming
+            
+        Returns:
+            Runnable returning instances of the schema
+        """
+        key = ("structured", model, tuple(sorted(kwargs.items())), schema)
+        return self._get_or_create(key, lambda: self.chat_model(model, **kwargs).with_structured_output(schema))
+        
+    def set_factory(self, factory: Optional[Callable[..., Any]]):
+        """
+        Replace the model factory and drop all cached models.
+        
+        Args:
+            factory: Callable building a chat model from a model name and keyword
+                arguments, or None to go back to ChatOpenAI
+        """
+        with self._lock:
+            self._factory = factory
+            self._models = {}
+
+# Registry shared by all workflow nodes
+model_registry = ModelRegistry()
\ No newline at end of file
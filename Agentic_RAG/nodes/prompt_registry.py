@@ -0,0 +1,101 @@
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional
+from langchain import hub
+from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
+from core.config import PROMPTS_DIR, RAG_PROMPT_HUB_REF
+
+logger = logging.getLogger(__name__)
+
+# Prompt name -> (vendored template file, template type, hub reference to refresh from)
+PROMPTS = {
+    "rag": ("rag.txt", "chat", RAG_PROMPT_HUB_REF),
+    "grade": ("grade.txt", "text", None),
+    "rewrite": ("rewrite.txt", "text", None),
+    "grade_generate": ("grade_generate.txt", "text", None),
+}
+
+class PromptRegistry:
+    """
+    Registry of the prompt templates used by the workflow nodes.
+    
+    Templates are loaded and compiled once from the vendored files in the
+    prompts directory, so no node depends on the LangChain hub at query time.
+    Prompts with a hub reference can optionally be refreshed from the hub in
+    the background; the reference may pin a commit ("owner/name:commit").
+    """
+    
+    def __init__(self, prompts_dir: str = PROMPTS_DIR, definitions: Optional[Dict[str, tuple]] = None):
+        """
+        Initialize the prompt registry and load all prompts.
+        
+        Args:
+            prompts_dir: Directory containing the vendored prompt files
+            definitions: Prompt definitions, defaults to PROMPTS
+        """
+        self.prompts_dir = prompts_dir
+        self.definitions = definitions or PROMPTS
+        self._prompts: Dict[str, Any] = {}
+        self._refresh_thread = None
+        self._stop = threading.Event()
+        
+        for name, (filename, kind, _) in self.definitions.items():
+            with open(os.path.join(self.prompts_dir, filename), "r", encoding="utf-8") as f:
+                template = f.read().strip("\n")
+                
+            if kind == "chat":
+                self._prompts[name] = ChatPromptTemplate.from_messages([("human", template)])
+            else:
+                self._prompts[name] = PromptTemplate.from_template(template)
+                
+        logger.info(f"Loaded prompts: {', '.join(self._prompts)}")
+        
+    def get(self, name: str):
+        """
+        Get a compiled prompt template.
+        
+        Args:
+            name: Prompt name
+            
+        Returns:
+            Prompt template
+        """
+        return self._prompts[name]
+        
+    def refresh(self):
+        """Pull the prompts that have a hub reference, keeping the local copy on failure."""
+        for name, (_, _, hub_ref) in self.definitions.items():
+            if not hub_ref:
+                continue
+                
+            try:
+                self._prompts[name] = hub.pull(hub_ref)
+                logger.info(f"Refreshed prompt {name} from hub: {hub_ref}")
+            except Exception as e:
+                logger.warning(f"Could not refresh prompt {name} from hub ({hub_ref}): {e}")
+                
+    def start_refresh(self, interval: float):
+        """
+        Refresh hub prompts on a background thread.
+        
+        Args:
+            interval: Seconds between refreshes
+        """
+        if self._refresh_thread is not None:
+            return
+            
+        def run():
+            while not self._stop.is_set():
+                self.refresh()
+                self._stop.wait(interval)
+                
+        self._refresh_thread = threading.Thread(target=run, name="prompt-refresh", daemon=True)
+        self._refresh_thread.start()
+        
+    def stop_refresh(self):
+        """Stop the background refresh."""
+        self._stop.set()
+
+# Registry shared by all workflow nodes
+prompt_registry = PromptRegistry()
\ No newline at end of file
@@ -1,7 +1,8 @@
 import logging
-from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage
 from core.config import REWRITE_MODEL
+from nodes.model_registry import model_registry
+from nodes.prompt_registry import prompt_registry
 
 logger = logging.getLogger(__name__)
 
@@ -13,7 +14,7 @@ def rewrite(state):
         state (messages): The current state containing messages
 
     Returns:
-        dict: The updated state with re-phrased question
+        dict: The updated state with re-phrased question and rewrite count
     """
     logger.info("Rewriting query for better retrieval")
     
@@ -23,28 +24,16 @@ def rewrite(state):
     
     # Create message for rewriting
     msg = [
-        HumanMessage(
-            content=f""" \n 
-    Look at the input and try to reason about the underlying semantic intent / meaning. \n 
-    Here is the initial question:
-    \n ------- \n
-    {question} 
-    \n ------- \n
-    Formulate an improved question: """,
-        )
+        HumanMessage(content=prompt_registry.get("rewrite").format(question=question))
     ]
     
-    # Create ChatOpenAI model
-    model = ChatOpenAI(
-        temperature=0, 
-        model=REWRITE_MODEL, 
-        streaming=True
-    )
+    # Get the shared model
+    model = model_registry.chat_model(REWRITE_MODEL, temperature=0, streaming=True)
     
     # Invoke model
     response = model.invoke(msg)
     
     logger.info(f"Rewritten query: {response.content[:100]}...")
     
-    # Return response
-    return {"messages": [response]}
\ No newline at end of file
+    # Return response, counting the rewrite against the request budget
+    return {"messages": [response], "rewrite_count": state.get("rewrite_count", 0) + 1}
\ No newline at end of file
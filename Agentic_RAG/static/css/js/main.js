@@ -52,9 +52,6 @@ document.addEventListener('DOMContentLoaded', () => {
         
         // Set up event listeners
         setupEventListeners();
-        
-        // Poll for status updates
-        setInterval(checkPipelineStatus, 5000);
     }
     
     /**
@@ -104,8 +101,8 @@ document.addEventListener('DOMContentLoaded', () => {
         resetStepStatuses();
         
         try {
-            // Send query to server
-            const response = await fetch('/query', {
+            // Send query to server and follow its progress as it streams back
+            const response = await fetch('/query/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -113,18 +110,47 @@ document.addEventListener('DOMContentLoaded', () => {
                 body: JSON.stringify({ query }),
             });
             
-            const data = await response.json();
-            
-            if (data.status === 'success') {
-                // Add assistant message to chat
-                addMessage('assistant', data.answer);
+            if (!response.ok) {
+                const data = await response.json();
                 
-                // Update debug logs
-                updateDebugLogs(data.steps);
-            } else {
-                // Show error message
-                addErrorMessage(data.message || 'An error occurred');
+                if (response.status === 429) {
+                    // Server is saturated, tell the user where they would have been queued
+                    addErrorMessage(`${data.message} (queue position ${data.queue_position})`);
+                } else {
+                    addErrorMessage(data.message || 'An error occurred');
+                }
+                return;
             }
+            
+            elements.debugLogs.innerHTML = '';
+            let answerEl = null;
+            let answer = '';
+            
+            await readEvents(response, (event, data) => {
+                if (event === 'step') {
+                    updateStepStatus(data.step, data.status === 'started' ? 'active' : 'completed');
+                    if (data.status === 'completed') {
+                        addDebugLog(data.step, data.content || `decision: ${data.decision}`);
+                    }
+                } else if (event === 'token') {
+                    // Show the answer as it is generated
+                    if (!answerEl) {
+                        toggleTypingIndicator(false);
+                        answerEl = addMessage('assistant', '');
+                    }
+                    answer += data.content;
+                    answerEl.innerHTML = formatContent(answer);
+                    elements.chatHistory.scrollTop = elements.chatHistory.scrollHeight;
+                } else if (event === 'done') {
+                    if (answerEl) {
+                        answerEl.innerHTML = formatContent(data.answer);
+                    } else {
+                        addMessage('assistant', data.answer);
+                    }
+                } else if (event === 'error') {
+                    addErrorMessage(data.message || 'An error occurred');
+                }
+            });
         } catch (error) {
             console.error('Error:', error);
             addErrorMessage('Failed to process query');
@@ -209,6 +235,7 @@ document.addEventListener('DOMContentLoaded', () => {
      * Add a message to the chat history
      * @param {string} role - Message role (user or assistant)
      * @param {string} content - Message content
+     * @returns {HTMLElement} Element holding the message content
      */
     function addMessage(role, content) {
         const messageDiv = document.createElement('div');
@@ -232,6 +259,8 @@ document.addEventListener('DOMContentLoaded', () => {
         
         elements.chatHistory.appendChild(messageDiv);
         elements.chatHistory.scrollTop = elements.chatHistory.scrollHeight;
+        
+        return messageDiv.querySelector('.mt-1');
     }
     
     /**
@@ -371,40 +400,57 @@ document.addEventListener('DOMContentLoaded', () => {
     }
     
     /**
-     * Update debug logs with step information
-     * @param {Array} steps - Array of step information objects
+     * Read a Server-Sent Events response, calling the handler for each event
+     * @param {Response} response - Streaming fetch response
+     * @param {Function} onEvent - Called with the event name and parsed data
      */
-    function updateDebugLogs(steps) {
-        if (!steps || steps.length === 0) return;
-        
-        elements.debugLogs.innerHTML = '';
-        
-        steps.forEach((step, index) => {
-            const stepDiv = document.createElement('div');
-            stepDiv.className = 'mb-2 pb-2 border-b border-gray-200';
+    async function readEvents(response, onEvent) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
             
-            // Get step name from the step object
-            const stepName = step.step;
+            buffer += decoder.decode(value, { stream: true });
             
-            // Update step status
-            if (index === steps.length - 1) {
-                updateStepStatus(stepName, 'active');
-            } else {
-                updateStepStatus(stepName, 'completed');
+            // Events are separated by a blank line
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const raw = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                
+                let event = 'message';
+                let data = '';
+                raw.split('\n').forEach(line => {
+                    if (line.startsWith('event: ')) {
+                        event = line.slice(7);
+                    } else if (line.startsWith('data: ')) {
+                        data += line.slice(6);
+                    }
+                });
+                
+                onEvent(event, data ? JSON.parse(data) : {});
             }
-            
-            // Format the step content
-            const content = step.content || 'No content';
-            
-            stepDiv.innerHTML = `
-                <div class="font-bold text-xs text-blue-600 mb-1">${stepName}</div>
-                <pre class="text-xs whitespace-pre-wrap">${content}</pre>
-            `;
-            
-            elements.debugLogs.appendChild(stepDiv);
-        });
+        }
+    }
+    
+    /**
+     * Append one step to the debug logs
+     * @param {string} stepName - Step name
+     * @param {string} content - Step output
+     */
+    function addDebugLog(stepName, content) {
+        const stepDiv = document.createElement('div');
+        stepDiv.className = 'mb-2 pb-2 border-b border-gray-200';
+        
+        stepDiv.innerHTML = `
+            <div class="font-bold text-xs text-blue-600 mb-1">${stepName}</div>
+            <pre class="text-xs whitespace-pre-wrap">${content || 'No content'}</pre>
+        `;
         
-        // Scroll to the bottom of the debug logs
+        elements.debugLogs.appendChild(stepDiv);
         elements.debugLogs.scrollTop = elements.debugLogs.scrollHeight;
     }
     
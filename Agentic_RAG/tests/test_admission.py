@@ -0,0 +1,85 @@
+import threading
+import time
+import pytest
+from core.admission import AdmissionController, AdmissionRejected
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.005)
+
+def queue_request(controller, name, admitted, rejected):
+    def run():
+        try:
+            with controller.admit():
+                admitted.append(name)
+        except AdmissionRejected as e:
+            rejected.append((name, e.queue_position))
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+def test_waiting_requests_are_admitted_in_arrival_order():
+    controller = AdmissionController(max_concurrent=1, max_queued=5, queue_timeout=5)
+    admitted, rejected, threads = [], [], []
+    
+    with controller.admit():
+        for i, name in enumerate("abcde"):
+            threads.append(queue_request(controller, name, admitted, rejected))
+            # Start the next request only once this one holds its ticket
+            wait_until(lambda: controller.stats()["queued"] == i + 1)
+        assert controller.stats()["in_flight"] == 1
+        assert admitted == []
+        
+    for thread in threads:
+        thread.join()
+    assert admitted == list("abcde")
+    assert rejected == []
+    assert controller.stats() == {"in_flight": 0, "queued": 0, "max_concurrent": 1, "max_queued": 5, "rejected": 0}
+
+def test_full_queue_is_rejected_immediately_with_its_position():
+    controller = AdmissionController(max_concurrent=2, max_queued=2, queue_timeout=5)
+    admitted, rejected, threads = [], [], []
+    
+    with controller.admit(), controller.admit():
+        for i in range(2):
+            threads.append(queue_request(controller, i, admitted, rejected))
+            wait_until(lambda: controller.stats()["queued"] == i + 1)
+            
+        started = time.monotonic()
+        with pytest.raises(AdmissionRejected) as excinfo:
+            with controller.admit():
+                pass
+        assert time.monotonic() - started < 1
+        assert excinfo.value.queue_position == 3
+        assert excinfo.value.retry_after == 5
+        
+    for thread in threads:
+        thread.join()
+    assert sorted(admitted) == [0, 1]
+    assert controller.stats()["rejected"] == 1
+
+def test_timed_out_request_leaves_the_queue():
+    controller = AdmissionController(max_concurrent=1, max_queued=5, queue_timeout=0.2)
+    admitted, rejected = [], []
+    
+    with controller.admit():
+        with pytest.raises(AdmissionRejected) as excinfo:
+            with controller.admit():
+                pass
+        assert excinfo.value.queue_position == 1
+        assert controller.stats()["queued"] == 0
+        
+        # A request timing out behind another one reports its place in the queue
+        controller.queue_timeout = 5
+        first = queue_request(controller, "first", admitted, rejected)
+        wait_until(lambda: controller.stats()["queued"] == 1)
+        controller.queue_timeout = 0.2
+        second = queue_request(controller, "second", admitted, rejected)
+        second.join()
+        assert rejected == [("second", 2)]
+        
+    first.join()
+    assert admitted == ["first"]
+    assert controller.stats()["rejected"] == 2
@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+from components.answer_cache import SemanticAnswerCache
+
+DIMENSIONS = 8
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+        
+    def __call__(self):
+        return self.now
+
+def unit(*components):
+    vector = np.zeros(DIMENSIONS, dtype=np.float32)
+    vector[:len(components)] = components
+    return vector / np.linalg.norm(vector)
+
+def sources(*chunk_ids):
+    return [{"chunk_id": chunk_id, "source": "page"} for chunk_id in chunk_ids]
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+@pytest.fixture
+def cache(clock):
+    return SemanticAnswerCache(None, threshold=0.9, ttl=60, max_entries=3, clock=clock)
+
+def test_lookup_reuses_answers_above_the_threshold(cache):
+    cache.put(unit(1, 0), "what is an agent", "an answer", sources("chunk-1"))
+    
+    # cos = 0.95 and 0.8
+    hit = cache.lookup(unit(0.95, np.sqrt(1 - 0.95 ** 2)))
+    assert hit.answer == "an answer"
+    assert hit.query == "what is an agent"
+    assert hit.sources == sources("chunk-1")
+    assert hit.similarity == pytest.approx(0.95, abs=1e-6)
+    assert cache.lookup(unit(0.8, 0.6)) is None
+    
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+def test_answers_without_sources_are_not_cached(cache):
+    cache.put(unit(1, 0), "query", "answer", [{"source": "page"}])
+    
+    assert cache.lookup(unit(1, 0)) is None
+    assert cache.stats()["entries"] == 0
+
+def test_entries_expire_after_the_ttl(cache, clock):
+    cache.put(unit(1, 0), "old", "old answer", sources("chunk-1"))
+    clock.now = 30
+    cache.put(unit(0, 1), "new", "new answer", sources("chunk-2"))
+    
+    clock.now = 61
+    assert cache.lookup(unit(1, 0)) is None
+    assert cache.lookup(unit(0, 1)).answer == "new answer"
+    assert cache.stats()["expirations"] == 1
+    
+    # No expiry with a TTL of 0
+    forever = SemanticAnswerCache(None, threshold=0.9, ttl=0, max_entries=3, clock=clock)
+    forever.put(unit(1, 0), "old", "old answer", sources("chunk-1"))
+    clock.now = 1e9
+    assert forever.lookup(unit(1, 0)).answer == "old answer"
+
+def test_full_cache_reuses_the_least_recently_used_slot(cache):
+    for i, vector in enumerate([unit(1, 0, 0), unit(0, 1, 0), unit(0, 0, 1)]):
+        cache.put(vector, f"query {i}", f"answer {i}", sources(f"chunk-{i}"))
+    # A hit makes query 0 the most recently used
+    assert cache.lookup(unit(1, 0, 0)).answer == "answer 0"
+    
+    cache.put(unit(0, 0, 0, 1), "query 3", "answer 3", sources("chunk-3"))
+    assert cache.lookup(unit(0, 1, 0)) is None
+    assert [cache.lookup(vector).answer for vector in [unit(1, 0, 0), unit(0, 0, 1), unit(0, 0, 0, 1)]] \
+        == ["answer 0", "answer 2", "answer 3"]
+        
+    stats = cache.stats()
+    assert (stats["entries"], stats["evictions"]) == (3, 1)
+    # The evicted answer no longer holds its chunk in the index
+    assert cache.invalidate_chunks(["chunk-1"]) == 0
+
+def test_invalidating_a_chunk_drops_every_answer_built_on_it(cache):
+    cache.put(unit(1, 0, 0), "query 0", "answer 0", sources("chunk-a", "chunk-b"))
+    cache.put(unit(0, 1, 0), "query 1", "answer 1", sources("chunk-b"))
+    cache.put(unit(0, 0, 1), "query 2", "answer 2", sources("chunk-c"))
+    
+    assert cache.invalidate_chunks(["chunk-b", "unknown"]) == 2
+    assert cache.lookup(unit(1, 0, 0)) is None
+    assert cache.lookup(unit(0, 1, 0)) is None
+    assert cache.lookup(unit(0, 0, 1)).answer == "answer 2"
+    # chunk-a only indexed a dropped answer
+    assert cache.invalidate_chunks(["chunk-a"]) == 0
+    assert cache.stats()["invalidations"] == 2
+    
+    # Freed slots are reused without evicting the remaining answer
+    cache.put(unit(1, 0, 0), "query 3", "answer 3", sources("chunk-a"))
+    cache.put(unit(0, 1, 0), "query 4", "answer 4", sources("chunk-b"))
+    assert cache.stats()["evictions"] == 0
+    assert cache.lookup(unit(0, 0, 1)).answer == "answer 2"
+
+def test_answers_started_before_an_invalidation_are_not_stored(cache):
+    generation = cache.generation
+    cache.invalidate_chunks(["chunk-1"])
+    
+    cache.put(unit(1, 0), "query", "stale answer", sources("chunk-1"), generation=generation)
+    assert cache.lookup(unit(1, 0)) is None
+    
+    cache.put(unit(1, 0), "query", "fresh answer", sources("chunk-1"), generation=cache.generation)
+    assert cache.lookup(unit(1, 0)).answer == "fresh answer"
+    
+    generation = cache.generation
+    cache.clear()
+    assert cache.lookup(unit(1, 0)) is None
+    cache.put(unit(1, 0), "query", "stale answer", sources("chunk-1"), generation=generation)
+    assert cache.stats()["entries"] == 0
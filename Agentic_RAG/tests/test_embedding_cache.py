@@ -0,0 +1,50 @@
+import pytest
+from components.embedding_cache import EmbeddingCache
+
+def vector(i):
+    return [float(i), 0.5]
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "embeddings.sqlite3")
+
+def cached_keys(cache, keys):
+    return [key for key, found in zip(keys, cache.get_many(keys)) if found is not None]
+
+def test_least_recently_used_entries_are_evicted(path):
+    cache = EmbeddingCache(path, max_entries=3, flush_size=100, flush_interval=3600)
+    cache.set_many([(f"key-{i}", vector(i)) for i in range(3)])
+    # The hit on key-0 is only pending, the next insert writes it before evicting
+    assert cache.get_many(["key-0"]) == [vector(0)]
+    
+    cache.set_many([("key-3", vector(3))])
+    assert cached_keys(cache, [f"key-{i}" for i in range(4)]) == ["key-0", "key-2", "key-3"]
+    assert cache.stats()["entries"] == 3
+    assert cache.stats()["evictions"] == 1
+
+def test_caches_sharing_a_file_keep_its_cap_and_recency(path):
+    first = EmbeddingCache(path, max_entries=4, flush_size=1, flush_interval=3600)
+    second = EmbeddingCache(path, max_entries=4, flush_size=1, flush_interval=3600)
+    first.set_many([(f"first-{i}", vector(i)) for i in range(3)])
+    second.set_many([(f"second-{i}", vector(i)) for i in range(3)])
+    
+    # The second cache counted the entries of the first one and evicted the oldest
+    assert second.stats()["entries"] == 4
+    assert cached_keys(second, ["first-0", "first-1", "first-2"]) == ["first-2"]
+    
+    # The first cache sees both, and the hit the second one wrote for first-2
+    first.set_many([("first-3", vector(3))])
+    assert first.stats()["entries"] == 4
+    assert cached_keys(first, ["first-2", "first-3"]) == ["first-2", "first-3"]
+    assert len(cached_keys(first, ["second-0", "second-1", "second-2"])) == 2
+
+def test_flush_writes_pending_hits(path):
+    cache = EmbeddingCache(path, max_entries=10, flush_size=100, flush_interval=3600)
+    cache.set_many([("key", vector(1))])
+    cache.get_many(["key"])
+    reader = EmbeddingCache(path, max_entries=10)
+    query = "SELECT accessed_at FROM embeddings WHERE key = 'key'"
+    
+    assert reader._conn.execute(query).fetchone() == (1,)
+    cache.flush()
+    assert reader._conn.execute(query).fetchone() == (2,)
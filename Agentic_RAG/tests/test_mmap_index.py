@@ -0,0 +1,129 @@
+import os
+import random
+import numpy as np
+import pytest
+from components.bm25 import BM25ArrayWriter, BM25Index, MmapBM25Index
+from components.vector_backends import (
+    MmapFlatBackend, NumpyFlatBackend, ReadOnlyIndexError, current_export, export_mmap_index,
+)
+
+DIMENSIONS = 16
+
+WORDS = ("agent memory planning tool retrieval prompt chain reasoning model context vector "
+         "index query answer graph node reflection task search embedding").split()
+
+def corpus(count, seed=0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(WORDS, k=rng.randint(5, 40))).capitalize() + "." for _ in range(count)]
+
+def ranked(results):
+    # Order ties by chunk ID, the two indexes may break them differently
+    return sorted(((chunk_id, round(score, 4)) for chunk_id, score in results), key=lambda r: (-r[1], r[0]))
+
+@pytest.fixture
+def source():
+    rng = np.random.default_rng(0)
+    texts = corpus(300)
+    ids = [f"chunk-{i:03d}" for i in range(len(texts))]
+    backend = NumpyFlatBackend("source", dtype="float32")
+    backend.add(ids, rng.standard_normal((len(ids), DIMENSIONS)).tolist(), texts,
+                [{"chunk_id": chunk_id, "source": f"page-{i % 7}"} for i, chunk_id in enumerate(ids)])
+    # Rows out of ID order, export_mmap_index sorts them
+    backend.delete(ids[:20])
+    return backend
+
+def test_mmap_bm25_ranks_like_bm25_index(tmp_path):
+    texts = corpus(200)
+    ids = [f"chunk-{i:03d}" for i in range(len(texts))]
+    reference = BM25Index()
+    reference.add(ids, texts)
+    writer = BM25ArrayWriter()
+    for text in texts:
+        writer.add(text)
+    writer.save(str(tmp_path))
+    index = MmapBM25Index(str(tmp_path), np.array([chunk_id.encode("utf-8") for chunk_id in ids]))
+    
+    assert len(index) == len(reference)
+    for query in ["agent memory", "vector index search", "reflection", "Planning, planning and TOOLS", "unknown"]:
+        assert ranked(index.search(query, 10)) == ranked(reference.search(query, 10))
+        assert ranked(index.search(query, len(texts))) == ranked(reference.search(query, len(texts)))
+
+@pytest.mark.parametrize("dtype", ["float32", "float16", "int8"])
+def test_export_round_trip(source, tmp_path, dtype):
+    directory = str(tmp_path / "export")
+    path = export_mmap_index(source, directory, dtype=dtype, metadata={"embedding_model": "test"})
+    assert current_export(directory) == path
+    
+    backend = MmapFlatBackend(directory, block_rows=32)
+    backend.load()
+    assert backend.path == path
+    assert backend.meta["embedding_model"] == "test"
+    assert backend.count == source.count
+    assert backend.get(include_text=False)["ids"] == sorted(source.get(include_text=False)["ids"])
+    
+    # Chunks are found by ID, unknown and deleted ones are skipped
+    ids = ["chunk-150", "chunk-005", "missing", "chunk-299", "chunk-020"]
+    assert backend.get(ids=ids) == source.get(ids=ids)
+    np.testing.assert_allclose(backend.get_vectors(["chunk-150", "chunk-020"]),
+                               source.get_vectors(["chunk-150", "chunk-020"]), atol=2e-2)
+    with pytest.raises(KeyError):
+        backend.get_vectors(["chunk-005"])
+        
+    rng = np.random.default_rng(1)
+    for vector in rng.standard_normal((10, DIMENSIONS)).tolist():
+        expected = [(document.metadata, score) for document, score in source.search(vector, 5)]
+        found = [(document.metadata, score) for document, score in backend.search(vector, 5)]
+        if dtype == "float32":
+            assert [metadata for metadata, _ in found] == [metadata for metadata, _ in expected]
+        assert [score for _, score in found] == pytest.approx([score for _, score in expected], abs=5e-2)
+        
+    # The keyword index of the export ranks like one built from the source chunks
+    chunks = source.get()
+    reference = BM25Index()
+    reference.add(chunks["ids"], chunks["documents"])
+    assert ranked(backend.keyword_index.search("agent planning", 10)) == ranked(reference.search("agent planning", 10))
+    
+    with pytest.raises(ReadOnlyIndexError):
+        backend.add(["chunk-new"], [[0.0] * DIMENSIONS], ["text"], [{}])
+    with pytest.raises(ReadOnlyIndexError):
+        backend.delete(["chunk-150"])
+
+def test_new_exports_replace_current_and_prune_old_ones(source, tmp_path):
+    directory = str(tmp_path / "export")
+    first = export_mmap_index(source, directory, keep=2)
+    reader = MmapFlatBackend(directory)
+    reader.load()
+    
+    source.delete(["chunk-100"])
+    second = export_mmap_index(source, directory, keep=2)
+    third = export_mmap_index(source, directory, keep=2)
+    
+    assert current_export(directory) == third
+    assert sorted(os.listdir(directory)) == sorted(["CURRENT", os.path.basename(second), os.path.basename(third)])
+    # A reader of a pruned export keeps its mapped files
+    assert reader.count == source.count + 1
+    assert reader.get(ids=["chunk-100"])["ids"] == ["chunk-100"]
+    
+    latest = MmapFlatBackend(directory)
+    latest.load()
+    assert latest.count == source.count
+    assert latest.get(ids=["chunk-100"])["ids"] == []
+    assert first != second != third
+
+def test_empty_export(tmp_path):
+    directory = str(tmp_path / "export")
+    export_mmap_index(NumpyFlatBackend("empty"), directory)
+    backend = MmapFlatBackend(directory)
+    backend.load()
+    
+    assert backend.count == 0
+    assert backend.search([1.0] * DIMENSIONS, 4) == []
+    assert backend.get(ids=["chunk-000"])["ids"] == []
+    assert backend.keyword_index.search("agent", 4) == []
+
+def test_missing_export_leaves_the_backend_empty(tmp_path):
+    backend = MmapFlatBackend(str(tmp_path / "export"))
+    backend.load()
+    
+    assert backend.path is None
+    assert backend.count == 0
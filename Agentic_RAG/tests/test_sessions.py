@@ -0,0 +1,84 @@
+import pytest
+from core.sessions import SessionStore
+
+class State:
+    def __init__(self, size=0):
+        self.size = size
+        self.processing = False
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+        
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+def store(clock, idle_timeout=10, max_sessions=10, max_bytes=1000, size=0):
+    return SessionStore(idle_timeout, max_sessions, max_bytes, state_factory=lambda: State(size), clock=clock)
+
+def held(sessions, *session_ids):
+    return [session_id for session_id in session_ids if sessions.peek(session_id) is not None]
+
+def test_idle_sessions_are_evicted(clock):
+    sessions = store(clock)
+    sessions.get("a")
+    clock.now = 5
+    sessions.get("b")
+    
+    clock.now = 12
+    sessions.get("c")
+    assert held(sessions, "a", "b", "c") == ["b", "c"]
+    assert sessions.evicted == {"idle": 1, "capacity": 0}
+
+def test_processing_sessions_are_not_idle(clock):
+    sessions = store(clock)
+    sessions.get("a").processing = True
+    sessions.get("b")
+    
+    clock.now = 12
+    sessions.get("c")
+    assert held(sessions, "a", "b", "c") == ["a", "c"]
+    
+    # Its idle time restarts once it was skipped
+    sessions.peek("a").processing = False
+    clock.now = 21
+    sessions.get("d")
+    assert held(sessions, "a", "c", "d") == ["a", "c", "d"]
+    clock.now = 22
+    sessions.get("d")
+    assert held(sessions, "a", "c", "d") == ["d"]
+    assert sessions.evicted == {"idle": 3, "capacity": 0}
+
+def test_least_recently_used_sessions_are_evicted_beyond_max_sessions(clock):
+    sessions = store(clock, max_sessions=2)
+    sessions.get("a")
+    sessions.get("b")
+    sessions.resume("a")
+    
+    sessions.get("c")
+    assert held(sessions, "a", "b", "c") == ["a", "c"]
+    assert len(sessions) == 2
+    assert sessions.evicted == {"idle": 0, "capacity": 1}
+
+def test_sessions_are_evicted_beyond_max_bytes_but_the_current_one_is_kept(clock):
+    sessions = store(clock, max_bytes=100, size=40)
+    for session_id in "abc":
+        sessions.get(session_id)
+    assert held(sessions, "a", "b", "c") == ["b", "c"]
+    
+    sessions.peek("c").size = 150
+    sessions.get("c")
+    assert held(sessions, "a", "b", "c") == ["c"]
+    assert sessions.stats() == {"sessions": 1, "bytes": 150, "evicted": {"idle": 0, "capacity": 2}}
+
+def test_resume_does_not_create_sessions(clock):
+    sessions = store(clock)
+    assert sessions.resume("unknown") is None
+    assert len(sessions) == 0
+    
+    state = sessions.get("a")
+    assert sessions.resume("a") is state
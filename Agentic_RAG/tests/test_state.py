@@ -0,0 +1,56 @@
+from core.state import RingLog
+
+def filled(count, max_entries=5):
+    log = RingLog(max_entries)
+    for i in range(count):
+        log.append({"text": f"entry {i + 1}"}, size=10)
+    return log
+
+def ids(page):
+    return [entry["id"] for entry in page["entries"]]
+
+def test_pages_follow_the_cursor():
+    log = filled(5)
+    
+    latest = log.page(limit=2)
+    assert (ids(latest), latest["cursor"], latest["has_more"], latest["truncated"]) == ([4, 5], 5, False, False)
+    
+    first = log.page(since=0, limit=2)
+    assert (ids(first), first["cursor"], first["has_more"]) == ([1, 2], 2, True)
+    second = log.page(since=first["cursor"], limit=2)
+    assert (ids(second), second["cursor"], second["has_more"]) == ([3, 4], 4, True)
+    last = log.page(since=second["cursor"], limit=2)
+    assert (ids(last), last["cursor"], last["has_more"]) == ([5], 5, False)
+    
+    # Nothing new yet, the cursor stays put
+    assert log.page(since=5) == {"entries": [], "cursor": 5, "has_more": False, "truncated": False}
+    log.append({"text": "entry 6"})
+    assert ids(log.page(since=5)) == [6]
+
+def test_dropped_entries_mark_the_page_truncated():
+    log = filled(8)
+    assert [entry["id"] for entry in log.entries()] == [4, 5, 6, 7, 8]
+    assert log.size == 50
+    
+    behind = log.page(since=1, limit=2)
+    assert (ids(behind), behind["cursor"], behind["truncated"]) == ([4, 5], 5, True)
+    # Only the entries up to 3 were dropped
+    assert log.page(since=3, limit=2)["truncated"] is False
+    assert log.page(since=3, limit=2)["entries"] == behind["entries"]
+
+def test_clear_keeps_the_id_sequence():
+    log = filled(4)
+    version = log.version
+    log.clear()
+    assert log.version != version
+    assert log.size == 0
+    
+    # A reader that saw everything is not truncated, one that lagged behind is
+    assert log.page(since=4) == {"entries": [], "cursor": 4, "has_more": False, "truncated": False}
+    assert log.page(since=2) == {"entries": [], "cursor": 4, "has_more": False, "truncated": True}
+    assert log.page() == {"entries": [], "cursor": 4, "has_more": False, "truncated": False}
+    
+    assert log.append({"text": "after clear"}) == 5
+    assert ids(log.page(since=4)) == [5]
+    after = log.page(since=2)
+    assert (ids(after), after["cursor"], after["truncated"]) == ([5], 5, True)
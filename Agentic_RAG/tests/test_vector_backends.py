@@ -0,0 +1,128 @@
+import numpy as np
+import pytest
+from components.vector_backends import NumpyFlatBackend, normalize_rows, quantize, top_k
+
+DIMENSIONS = 32
+
+def random_vectors(rng, count):
+    return rng.standard_normal((count, DIMENSIONS)).astype(np.float32)
+
+def exact_search(reference, vector, k):
+    """Top-k chunk IDs and scores by float32 cosine similarity"""
+    ids = sorted(reference)
+    matrix = normalize_rows(np.array([reference[chunk_id] for chunk_id in ids], dtype=np.float32))
+    query = np.asarray(vector, dtype=np.float32)
+    scores = matrix @ (query / np.linalg.norm(query))
+    order = np.argsort(-scores)[:k]
+    return [ids[i] for i in order], scores[order]
+
+def add(backend, reference, rng, ids):
+    vectors = random_vectors(rng, len(ids))
+    backend.add(ids, vectors.tolist(), [f"text of {chunk_id}" for chunk_id in ids],
+                [{"chunk_id": chunk_id} for chunk_id in ids])
+    reference.update(zip(ids, vectors))
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+@pytest.mark.parametrize("dtype,min_agreement,tolerance", [
+    ("float32", 1.0, 1e-5),
+    ("float16", 0.95, 2e-3),
+    ("int8", 0.9, 2e-2),
+])
+def test_search_after_add_replace_delete_matches_exact_search(rng, dtype, min_agreement, tolerance):
+    backend = NumpyFlatBackend("test", dtype=dtype, block_rows=64)
+    reference = {}
+    # More rows than the initial capacity, so the matrix grows
+    add(backend, reference, rng, [f"chunk-{i}" for i in range(1500)])
+    # Replace some chunks in place
+    add(backend, reference, rng, [f"chunk-{i}" for i in range(0, 1500, 7)])
+    # Delete chunks from the middle and the end, which moves the last rows around
+    deleted = [f"chunk-{i}" for i in list(range(3, 1500, 5)) + list(range(1490, 1500))]
+    backend.delete(deleted + ["unknown"])
+    for chunk_id in deleted:
+        reference.pop(chunk_id, None)
+        
+    assert backend.count == len(reference)
+    assert sorted(backend.get(include_text=False)["ids"]) == sorted(reference)
+    
+    agreement = []
+    for vector in random_vectors(rng, 30):
+        expected_ids, expected_scores = exact_search(reference, vector, 8)
+        results = backend.search(vector.tolist(), 8)
+        found_ids = [document.metadata["chunk_id"] for document, _ in results]
+        agreement.append(len(set(found_ids) & set(expected_ids)) / 8)
+        # Each returned chunk keeps its own text and is scored like its exact vector
+        for document, score in results:
+            chunk_id = document.metadata["chunk_id"]
+            assert document.page_content == f"text of {chunk_id}"
+            exact = normalize_rows(reference[chunk_id][None])[0] @ (vector / np.linalg.norm(vector))
+            assert score == pytest.approx(float(exact), abs=tolerance)
+        if dtype == "float32":
+            assert found_ids == expected_ids
+            
+    assert np.mean(agreement) >= min_agreement
+
+def test_get_and_get_vectors_follow_moved_rows(rng):
+    backend = NumpyFlatBackend("test", dtype="float32")
+    reference = {}
+    add(backend, reference, rng, [f"chunk-{i}" for i in range(10)])
+    # Deleting chunk-2 moves chunk-9 into its row
+    backend.delete(["chunk-2"])
+    
+    result = backend.get(ids=["chunk-9", "chunk-2", "chunk-4"])
+    assert result["ids"] == ["chunk-9", "chunk-4"]
+    assert result["documents"] == ["text of chunk-9", "text of chunk-4"]
+    assert result["metadatas"] == [{"chunk_id": "chunk-9"}, {"chunk_id": "chunk-4"}]
+    np.testing.assert_allclose(backend.get_vectors(["chunk-9"])[0],
+                               normalize_rows(reference["chunk-9"][None])[0], rtol=1e-6)
+
+def test_nbytes_counts_allocated_rows(rng):
+    backend = NumpyFlatBackend("test", dtype="int8")
+    assert backend.nbytes == 0
+    
+    reference = {}
+    add(backend, reference, rng, [f"chunk-{i}" for i in range(10)])
+    # The matrix starts with room for 1024 rows, each with a float32 scale
+    assert backend.nbytes == 1024 * (DIMENSIONS + 4)
+    add(backend, reference, rng, [f"chunk-{i}" for i in range(10, 1500)])
+    assert backend.nbytes == 2048 * (DIMENSIONS + 4)
+
+def test_persist_and_load_round_trip(rng, tmp_path):
+    backend = NumpyFlatBackend("test", persist_directory=str(tmp_path), dtype="int8")
+    reference = {}
+    add(backend, reference, rng, [f"chunk-{i}" for i in range(50)])
+    backend.delete(["chunk-7"])
+    backend.persist()
+    
+    loaded = NumpyFlatBackend("test", persist_directory=str(tmp_path), dtype="int8")
+    loaded.load()
+    assert loaded.count == 49
+    query = random_vectors(rng, 1)[0].tolist()
+    assert ([document.metadata for document, _ in loaded.search(query, 5)]
+            == [document.metadata for document, _ in backend.search(query, 5)])
+            
+    with pytest.raises(ValueError):
+        NumpyFlatBackend("test", persist_directory=str(tmp_path), dtype="float16").load()
+
+def test_int8_quantization_error_is_within_half_a_step(rng):
+    matrix = normalize_rows(random_vectors(rng, 100))
+    quantized, scales = quantize(matrix, "int8")
+    
+    assert quantized.dtype == np.int8
+    assert np.abs(quantized).max() == 127
+    error = np.abs(quantized * scales[:, None] - matrix)
+    assert (error <= scales[:, None] / 2 + 1e-7).all()
+
+def test_top_k_is_independent_of_the_block_size(rng):
+    vectors, scales = quantize(normalize_rows(random_vectors(rng, 1000)), "int8")
+    query = random_vectors(rng, 1)[0].tolist()
+    
+    rows, scores = top_k(vectors, scales, 1000, query, 10, block_rows=4096)
+    block_rows, block_scores = top_k(vectors, scales, 1000, query, 10, block_rows=7)
+    assert block_rows == rows
+    assert block_scores == pytest.approx(scores, abs=1e-6)
+    # Rows past count are not searched
+    assert max(top_k(vectors, scales, 100, query, 10, block_rows=7)[0]) < 100
+    assert top_k(vectors, scales, 0, query, 10, block_rows=7) == ([], [])